@@ -0,0 +1,436 @@
+"""
+Benchmark - Retrieval quality and latency of the RAG pipeline
+
+Builds a throwaway local-store index from the parsed books in ../src/data and
+runs the golden questions in benchmark_golden.json through the same retriever
+the server uses, for every combination of the given collection layouts, chunk
+sizes, top_k values and hybrid on/off. Reports recall@k, MRR, p50/p95
+retrieval latency and index build time per configuration.
+
+By default it needs neither Ollama nor a network: documents and queries are
+embedded with a hashing embedding and the LLM is a MockLLM, so it runs in CI.
+The hashing embedding only matches words and their fragments, so its recall is
+a baseline for catching regressions, not the quality of the real model; pass
+--embedding ollama to measure EMBEDDING_MODEL instead.
+
+    python benchmark.py --chunk-sizes 256,512 --top-k 5,10 --hybrid on,off
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+import zlib
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.llms import MockLLM
+from llama_index.core.schema import MetadataMode
+from pydantic import PrivateAttr
+
+from config import settings
+from embedding_cache import build_embed_model
+from hybrid_retriever import LexicalIndex, tokenize
+from indexer import build_node_parser, chunking_signature, verse_to_document
+from language_routing import LAYOUTS, collection_name, index_languages, lexical_index_path
+from local_vector_store import LocalClient, LocalVectorStore
+from rag_engine import VedavoiceRAG
+from verse_lookup import VerseKey, _verse_numbers, parse_verse_reference
+
+console = Console()
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "data")
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_golden.json")
+
+# Parsed books the benchmark index is built from: (file, book slug)
+DEFAULT_CORPUS = [
+    ("bbt-parsed.json", "bg"),
+    ("sb-canto2-combined.json", "sb"),
+    ("iso-parsed.json", "iso"),
+    ("noi-parsed.json", "noi"),
+]
+
+# Dimensions of the hashing embedding
+HASHING_DIMENSIONS = 512
+
+
+class HashingEmbedding(BaseEmbedding):
+    """
+    Offline stand-in for the embedding model
+
+    Hashes the diacritic-folded words of a text and their character trigrams
+    into a fixed number of buckets and L2-normalizes the counts. Deterministic
+    across runs and machines, and needs no model.
+    """
+
+    _dimensions: int = PrivateAttr()
+
+    def __init__(self, dimensions: int = HASHING_DIMENSIONS, **kwargs):
+        super().__init__(model_name=f"hashing-{dimensions}", **kwargs)
+        self._dimensions = dimensions
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "HashingEmbedding"
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self._dimensions, dtype=np.float32)
+        for token in tokenize(text):
+            vector[zlib.crc32(token.encode("utf-8")) % self._dimensions] += 2.0
+            padded = f"#{token}#"
+            for start in range(len(padded) - 2):
+                vector[zlib.crc32(padded[start:start + 3].encode("utf-8")) % self._dimensions] += 1.0
+        norm = float(np.linalg.norm(vector))
+        return (vector / norm if norm else vector).tolist()
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._embed(query)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._embed(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed(text)
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+
+@dataclass
+class GoldenQuestion:
+    question: str
+    language: str
+    references: List[str]
+    keys: Set[VerseKey] = field(default_factory=set)
+
+
+@dataclass
+class BenchmarkResult:
+    layout: str
+    chunk_size: int
+    hybrid: bool
+    top_k: int
+    questions: int
+    recall: float
+    mrr: float
+    recall_by_language: Dict[str, float]
+    retrieval_p50_ms: float
+    retrieval_p95_ms: float
+    answer_p50_ms: Optional[float]
+    chunks: int
+    embed_seconds: float
+    lexical_seconds: float
+
+
+@contextmanager
+def override_settings(**values):
+    """Temporarily change settings, restoring the previous values on exit"""
+    previous = {name: getattr(settings, name) for name in values}
+    for name, value in values.items():
+        setattr(settings, name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(settings, name, value)
+
+
+def load_golden(path: str) -> List[GoldenQuestion]:
+    """Read the golden questions and resolve their references to verse keys"""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    questions = []
+    for entry in data["questions"]:
+        question = GoldenQuestion(entry["question"], entry["language"], entry["references"])
+        for reference in question.references:
+            parsed = parse_verse_reference(reference)
+            if parsed is None:
+                raise ValueError(f"Cannot parse reference {reference!r} of {question.question!r}")
+            question.keys.add(parsed.key)
+        questions.append(question)
+    return questions
+
+
+def load_corpus(data_dir: str = DATA_DIR) -> List[Tuple[dict, dict, dict]]:
+    """
+    Read the parsed books into (verse, book, chapter) rows for verse_to_document
+
+    Books without chapters (Ішопанішад, Нектар настанов) are one chapter, as in
+    the database. Verse ids are stable and VerseNodeParser derives chunk ids
+    from them, so chunk ids match between runs.
+    """
+    rows = []
+    for file_name, slug in DEFAULT_CORPUS:
+        with open(os.path.join(data_dir, file_name), encoding="utf-8") as f:
+            data = json.load(f)
+
+        book = {"slug": slug, "title": data.get("title_uk", slug), "title_en": data.get("title_en", "")}
+        canto = data.get("canto")
+        chapters = data.get("chapters") or [{"chapter_number": 1, "verses": data.get("verses", [])}]
+        for chapter_data in chapters:
+            chapter = {
+                "chapter_number": chapter_data["chapter_number"],
+                "title_uk": chapter_data.get("chapter_title_uk", ""),
+                "title_en": chapter_data.get("chapter_title_en", ""),
+            }
+            for verse_data in chapter_data["verses"]:
+                verse = dict(verse_data)
+                verse["canto_number"] = canto
+                verse["chapter_number"] = chapter["chapter_number"]
+                prefix = f"{slug}-{canto}" if canto else slug
+                verse["id"] = f"{prefix}-{chapter['chapter_number']}-{verse['verse_number']}"
+                rows.append((verse, book, chapter))
+    return rows
+
+
+def build_index(rows: List[Tuple[dict, dict, dict]], embed_model: BaseEmbedding) -> Tuple[int, float, float]:
+    """
+    Index the corpus into the configured local store and lexical index paths
+
+    Returns:
+        (chunks, embedding seconds, lexical index seconds); embedding time
+        includes chunking and writing the vectors
+    """
+    client = LocalClient(settings.local_store_dir, settings.local_store_dtype)
+    node_parser = build_node_parser()
+    chunks = 0
+    embed_seconds = 0.0
+    lexical_seconds = 0.0
+
+    for language in index_languages():
+        documents = [verse_to_document(verse, book, chapter, language) for verse, book, chapter in rows]
+        documents = [document for document in documents if document is not None]
+
+        started = time.perf_counter()
+        metadata = {"embedding_model": embed_model.model_name, "chunking": chunking_signature()}
+        if language is not None:
+            metadata["language"] = language
+        collection = client.create_collection(collection_name(language), metadata=metadata)
+        vector_store = LocalVectorStore(collection)
+
+        nodes = node_parser.get_nodes_from_documents(documents)
+        for start in range(0, len(nodes), settings.embed_batch_size):
+            batch = nodes[start:start + settings.embed_batch_size]
+            texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in batch]
+            for node, embedding in zip(batch, embed_model.get_text_embedding_batch(texts)):
+                node.embedding = embedding
+            vector_store.add(batch)
+        collection.persist()
+        embed_seconds += time.perf_counter() - started
+        chunks += len(nodes)
+
+        started = time.perf_counter()
+        LexicalIndex.from_collection(collection).save(lexical_index_path(language), collection.count())
+        lexical_seconds += time.perf_counter() - started
+
+    return chunks, embed_seconds, lexical_seconds
+
+
+def retrieved_keys(nodes) -> List[VerseKey]:
+    """Verse keys of retrieved chunks in rank order, each verse once"""
+    keys: List[VerseKey] = []
+    for node in nodes:
+        metadata = node.node.metadata
+        canto = metadata.get("canto_number")
+        for verse_number in _verse_numbers(metadata.get("verse_number", "")):
+            key = (
+                metadata.get("book_slug"),
+                int(canto) if canto not in (None, "") else None,
+                int(metadata.get("chapter_number") or 0),
+                verse_number,
+            )
+            if key not in keys:
+                keys.append(key)
+    return keys
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+def evaluate(
+    questions: List[GoldenQuestion],
+    embed_model: BaseEmbedding,
+    top_k: int,
+    answers: bool,
+) -> Tuple[float, float, Dict[str, float], List[float], Optional[float]]:
+    """Run the golden questions through a fresh engine over the built index"""
+    engine = VedavoiceRAG(llm=MockLLM(max_tokens=32), embed_model=embed_model)
+    engine.initialize()
+    retriever = engine._get_retriever(top_k)
+
+    # The first query pays for loading the matrices; keep it out of the timings
+    retriever.retrieve(questions[0].question)
+
+    recalls: Dict[str, List[float]] = {}
+    reciprocal_ranks = []
+    latencies = []
+    for question in questions:
+        started = time.perf_counter()
+        nodes = retriever.retrieve(question.question)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+        keys = retrieved_keys(nodes)
+        found = question.keys.intersection(keys)
+        recalls.setdefault(question.language, []).append(len(found) / len(question.keys))
+        ranks = [rank for rank, key in enumerate(keys, 1) if key in question.keys]
+        reciprocal_ranks.append(1.0 / ranks[0] if ranks else 0.0)
+
+    answer_p50 = None
+    if answers:
+        answer_latencies = []
+        for question in questions:
+            started = time.perf_counter()
+            engine.query(question.question)
+            answer_latencies.append((time.perf_counter() - started) * 1000)
+        answer_p50 = percentile(answer_latencies, 0.5)
+
+    all_recalls = [value for values in recalls.values() for value in values]
+    return (
+        sum(all_recalls) / len(all_recalls),
+        sum(reciprocal_ranks) / len(reciprocal_ranks),
+        {language: sum(values) / len(values) for language, values in recalls.items()},
+        latencies,
+        answer_p50,
+    )
+
+
+def run_benchmark(
+    questions: List[GoldenQuestion],
+    embed_model: BaseEmbedding,
+    layouts: List[str],
+    chunk_sizes: List[int],
+    top_ks: List[int],
+    hybrid_modes: List[bool],
+    answers: bool = False,
+) -> List[BenchmarkResult]:
+    """Build one index per layout and chunk size, then evaluate every top_k and hybrid mode on it"""
+    rows = load_corpus()
+    console.print(f"[dim]Corpus: {len(rows)} verses, {len(questions)} golden questions, "
+                  f"embedding {embed_model.model_name}[/dim]")
+
+    results = []
+    for layout in layouts:
+        for chunk_size in chunk_sizes:
+            with tempfile.TemporaryDirectory(prefix="vedavoice-benchmark-") as workdir, override_settings(
+                vector_store_backend="local",
+                local_store_dir=os.path.join(workdir, "local_store"),
+                lexical_index_path=os.path.join(workdir, "lexical_index.npz"),
+                collection_layout=layout,
+                chunk_size=chunk_size,
+                # Each answer must reach the (mock) LLM to be timed
+                answer_cache_enabled=False,
+            ):
+                console.print(f"[cyan]Building {layout} index, chunk size {chunk_size}...[/cyan]")
+                chunks, embed_seconds, lexical_seconds = build_index(rows, embed_model)
+
+                for hybrid in hybrid_modes:
+                    for top_k in top_ks:
+                        with override_settings(hybrid_enabled=hybrid):
+                            recall, mrr, by_language, latencies, answer_p50 = evaluate(
+                                questions, embed_model, top_k, answers
+                            )
+                        results.append(BenchmarkResult(
+                            layout=layout,
+                            chunk_size=chunk_size,
+                            hybrid=hybrid,
+                            top_k=top_k,
+                            questions=len(questions),
+                            recall=recall,
+                            mrr=mrr,
+                            recall_by_language=by_language,
+                            retrieval_p50_ms=percentile(latencies, 0.5),
+                            retrieval_p95_ms=percentile(latencies, 0.95),
+                            answer_p50_ms=answer_p50,
+                            chunks=chunks,
+                            embed_seconds=embed_seconds,
+                            lexical_seconds=lexical_seconds,
+                        ))
+    return results
+
+
+def print_results(results: List[BenchmarkResult]):
+    table = Table(title="Retrieval benchmark")
+    for column in ("layout", "chunk", "hybrid", "k", "recall@k", "uk", "en", "MRR",
+                   "p50 ms", "p95 ms", "answer p50 ms", "chunks", "build s"):
+        table.add_column(column, justify="left" if column == "layout" else "right")
+
+    for result in results:
+        table.add_row(
+            result.layout,
+            str(result.chunk_size),
+            "on" if result.hybrid else "off",
+            str(result.top_k),
+            f"{result.recall:.3f}",
+            f"{result.recall_by_language.get('uk', 0.0):.3f}",
+            f"{result.recall_by_language.get('en', 0.0):.3f}",
+            f"{result.mrr:.3f}",
+            f"{result.retrieval_p50_ms:.1f}",
+            f"{result.retrieval_p95_ms:.1f}",
+            f"{result.answer_p50_ms:.1f}" if result.answer_p50_ms is not None else "-",
+            str(result.chunks),
+            f"{result.embed_seconds:.1f} + {result.lexical_seconds:.1f}",
+        )
+    console.print(table)
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Vedavoice retrieval quality and latency")
+    parser.add_argument("--golden", default=GOLDEN_PATH, help="Golden question set")
+    parser.add_argument("--layouts", default=",".join(LAYOUTS), help="Collection layouts, comma-separated")
+    parser.add_argument("--chunk-sizes", type=_int_list, default=[settings.chunk_size], help="e.g. 256,512")
+    parser.add_argument("--top-k", type=_int_list, default=[settings.similarity_top_k], help="e.g. 5,10")
+    parser.add_argument("--hybrid", default="on,off", help="Hybrid retrieval modes: on, off or on,off")
+    parser.add_argument("--embedding", default="hashing", choices=["hashing", "ollama"],
+                        help="hashing: offline baseline; ollama: EMBEDDING_MODEL")
+    parser.add_argument("--answers", action="store_true", help="Also time full answers with the mock LLM")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--min-recall", type=float, help="Exit with status 1 if any recall@k is below this")
+    args = parser.parse_args()
+
+    questions = load_golden(args.golden)
+    if args.embedding == "ollama":
+        embed_model = build_embed_model()
+    else:
+        embed_model = HashingEmbedding()
+
+    results = run_benchmark(
+        questions,
+        embed_model,
+        layouts=[layout for layout in args.layouts.split(",") if layout],
+        chunk_sizes=args.chunk_sizes,
+        top_ks=args.top_k,
+        hybrid_modes=[mode == "on" for mode in args.hybrid.split(",") if mode],
+        answers=args.answers,
+    )
+    print_results(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump([asdict(result) for result in results], f, ensure_ascii=False, indent=2)
+        console.print(f"[dim]Results written to {args.json}[/dim]")
+
+    if args.min_recall is not None:
+        failed = [result for result in results if result.recall < args.min_recall]
+        if failed:
+            console.print(f"[red]{len(failed)} configurations below recall {args.min_recall}[/red]")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
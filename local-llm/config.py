@@ -10,24 +10,83 @@ class Settings(BaseSettings):
     # Supabase
     supabase_url: str = Field(default="https://qeplxgqadcbwlrbgydlb.supabase.co")
     supabase_anon_key: str = Field(default="")
+    supabase_page_size: int = Field(default=1000)  # PostgREST default max-rows
 
     # Ollama
     ollama_base_url: str = Field(default="http://localhost:11434")
     llm_model: str = Field(default="qwen2.5:14b")  # Good for multilingual (Ukrainian/Sanskrit/English)
     embedding_model: str = Field(default="nomic-embed-text")  # Multilingual embeddings
+    embedding_cache_enabled: bool = Field(default=True)
+    embedding_cache_path: str = Field(default="./embedding_cache.sqlite")
 
     # RAG Settings
+    chunking_strategy: str = Field(default="verse")  # "verse" (structure-aware) or "sentence"
     chunk_size: int = Field(default=512)
     chunk_overlap: int = Field(default=50)
     similarity_top_k: int = Field(default=5)
+    chat_engine_pool_size: int = Field(default=8)  # Idle chat engines kept for reuse
+    verse_lookup_enabled: bool = Field(default=True)  # "БГ 2.14" resolved without vector search
+
+    # Hybrid retrieval (BM25 + vector, reciprocal rank fusion)
+    hybrid_enabled: bool = Field(default=True)
+    hybrid_vector_weight: float = Field(default=1.0)
+    hybrid_lexical_weight: float = Field(default=1.0)
+    hybrid_rrf_k: int = Field(default=60)
+    hybrid_candidate_k: int = Field(default=20)  # Candidates taken from each retriever
+    lexical_index_path: str = Field(default="./lexical_index.npz")
+    sanskrit_expansion_enabled: bool = Field(default=True)  # Krishna / Крішна / Kṛṣṇa / кр̣шн̣а match each other
+    sanskrit_max_variants: int = Field(default=2)  # Other spellings per term added to the embedded query
+
+    # Reranking (over-retrieve, rerank on CPU within a time budget)
+    rerank_enabled: bool = Field(default=False)
+    rerank_method: str = Field(default="lexical")  # "lexical" or "cross-encoder"
+    rerank_model: str = Field(default="cross-encoder/mmarco-mMiniLMv2-L12-H384-v1")  # Multilingual
+    rerank_candidates: int = Field(default=40)
+    rerank_budget_ms: float = Field(default=250.0)
+
+    # Prompt budget
+    context_token_budget: int = Field(default=2048)  # Retrieved text and metadata per answer
+    chat_memory_token_limit: int = Field(default=2048)  # Chat history per answer
+    context_tokenizer: str = Field(default="")  # HF tokenizer matching LLM_MODEL (needs transformers)
+
+    # Query caches
+    search_cache_size: int = Field(default=1024)
+    search_cache_ttl: float = Field(default=3600.0)  # Seconds
+    answer_cache_enabled: bool = Field(default=True)  # Only for /chat without history
+    answer_cache_size: int = Field(default=256)
+    answer_cache_ttl: float = Field(default=3600.0)  # Seconds
 
     # Vector Store
+    vector_store_backend: str = Field(default="chroma")  # "chroma" or "local" (memory-mapped NumPy)
     chroma_persist_dir: str = Field(default="./chroma_db")
+    local_store_dir: str = Field(default="./local_store")
+    local_store_dtype: str = Field(default="int8")  # "int8", "pq" (product quantization), "float16" or "float32"
+    local_store_pq_subvectors: int = Field(default=96)  # Bytes per vector with "pq"; must divide the dimensions
+    local_store_rescore: bool = Field(default=False)  # Keep full-precision vectors to re-score top candidates
+    local_store_rescore_factor: int = Field(default=4)  # Candidates re-scored per requested result
     collection_name: str = Field(default="vedavoice_books")
+    collection_layout: str = Field(default="single")  # "single" (mixed) or "language" (one collection per language)
+
+    # Index snapshots (indexer.py export / import)
+    snapshot_dir: str = Field(default="./snapshots")  # Once a snapshot is imported, the server serves it
+    snapshot_keep: int = Field(default=2)  # Installed snapshots kept, so the previous one can finish serving
+    snapshot_poll_seconds: float = Field(default=10.0)  # Server checks for a new current snapshot; 0 disables
+
+    # Indexer
+    index_queue_size: int = Field(default=4)  # Verse pages buffered ahead of embedding
+    embed_batch_size: int = Field(default=32)  # Chunks per embedding request
+    embed_concurrency: int = Field(default=2)  # Embedding requests in flight
+    embed_max_retries: int = Field(default=5)
+    store_batch_size: int = Field(default=256)  # Chunks per vector store write
 
     # Server
     host: str = Field(default="0.0.0.0")
     port: int = Field(default=8000)
+    max_concurrent_generations: int = Field(default=2)  # Slots for /chat generations
+    max_concurrent_searches: int = Field(default=4)  # Separate slots for /search, so retrieval never waits on generation
+    max_queued_requests: int = Field(default=16)  # Beyond this, 429 with Retry-After
+    embed_batch_window_ms: float = Field(default=5.0)  # Wait for concurrent queries to batch their embeddings
+    warmup_enabled: bool = Field(default=True)  # Load models and HNSW before reporting ready
 
     # System Prompt
     system_prompt: str = Field(default="""Ти - асистент з вивчення вайшнавської філософії, що базується виключно на книгах Шріли Прабгупади та ґаудія-вайшнавських ачар'їв.
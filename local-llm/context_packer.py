@@ -0,0 +1,216 @@
+"""
+Context Packer - Fits retrieved verses into a fixed token budget
+
+Chunks of the same verse are merged and de-duplicated sentence by sentence,
+the verse and translation are kept whole, and purports are trimmed to the
+sentences most relevant to the query until the budget is filled. The prompt
+the LLM has to prefill therefore stays bounded regardless of purport length.
+"""
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.schema import BaseNode, MetadataMode, NodeWithScore, QueryBundle, TextNode
+from llama_index.core.utils import get_tokenizer
+
+from config import settings
+from hybrid_retriever import tokenize
+from verse_nodes import PURPORT_LABELS
+
+try:
+    from transformers import AutoTokenizer
+    TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    AutoTokenizer = None
+    TRANSFORMERS_AVAILABLE = False
+
+_HEADER_RE = re.compile(r"^=== (.+?) ===\s*")
+_SENTENCE_RE = re.compile(r"(?<=[.!?…»])\s+|\n+")
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+
+# Marks sentences dropped from the middle of a purport
+_GAP = "…"
+
+# Small preference for earlier-ranked verses when relevance ties
+_RANK_PRIOR = 0.01
+
+
+def build_tokenizer() -> Callable[[str], List]:
+    """
+    Tokenize with the LLM's own tokenizer when available
+
+    CONTEXT_TOKENIZER names a Hugging Face tokenizer matching the Ollama model
+    (e.g. Qwen/Qwen2.5-14B-Instruct); without transformers installed the
+    LlamaIndex default tokenizer is used as an approximation.
+    """
+    if settings.context_tokenizer and TRANSFORMERS_AVAILABLE:
+        hf_tokenizer = AutoTokenizer.from_pretrained(settings.context_tokenizer)
+        return lambda text: hf_tokenizer.encode(text, add_special_tokens=False)
+    return get_tokenizer()
+
+
+def _split_sentences(text: str) -> List[str]:
+    return [sentence.strip() for sentence in _SENTENCE_RE.split(text) if sentence and sentence.strip()]
+
+
+def _split_paragraphs(text: str) -> List[str]:
+    return [paragraph.strip() for paragraph in _PARAGRAPH_RE.split(text) if paragraph.strip()]
+
+
+def _split_chunk(text: str, node_role: Optional[str]) -> Tuple[str, Optional[str], str]:
+    """Split a chunk into (verse/translation part, purport label, purport part)"""
+    header = _HEADER_RE.match(text)
+    if header is None:
+        # A continuation chunk from sentence splitting is always purport text
+        return "", None, text if node_role != "verse" else ""
+
+    body = text[header.end():]
+    for label in PURPORT_LABELS:
+        if body.startswith(label):
+            return "", label, body[len(label):]
+        position = body.find(f"\n\n{label}")
+        if position != -1:
+            return body[:position], label, body[position + 2 + len(label):]
+    return body, None, ""
+
+
+class _VerseGroup:
+    """All retrieved text of one verse, de-duplicated by sentence"""
+
+    def __init__(self, node: NodeWithScore, rank: int):
+        self.node = node
+        self.rank = rank
+        self.label: Optional[str] = None
+        self.core: List[str] = []
+        self.purport: List[str] = []
+        self._seen = set()
+
+    def add(self, text: str, node_role: Optional[str]):
+        core, label, purport = _split_chunk(text, node_role)
+        self.label = self.label or label
+        # Verse fields stay whole; purports are split into sentences for trimming
+        for target, parts in ((self.core, _split_paragraphs(core)), (self.purport, _split_sentences(purport))):
+            for part in parts:
+                if part not in self._seen:
+                    self._seen.add(part)
+                    target.append(part)
+
+
+class ContextPacker(BaseNodePostprocessor):
+    """Node postprocessor that packs retrieved verses into token_budget tokens"""
+
+    token_budget: int = 2048
+    _tokenizer: Callable[[str], List] = PrivateAttr()
+
+    def __init__(self, token_budget: int, tokenizer: Callable[[str], List], **kwargs):
+        super().__init__(token_budget=token_budget, **kwargs)
+        self._tokenizer = tokenizer
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "ContextPacker"
+
+    def _count_tokens(self, text: str) -> int:
+        return len(self._tokenizer(text))
+
+    def _group(self, nodes: List[NodeWithScore]) -> List[_VerseGroup]:
+        groups: Dict[str, _VerseGroup] = {}
+        for node in nodes:
+            metadata = node.node.metadata
+            key = metadata.get("verse_id") or metadata.get("parent_id") or metadata.get("reference") or node.node.node_id
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = _VerseGroup(node, len(groups))
+            group.add(node.node.get_content(metadata_mode=MetadataMode.NONE), metadata.get("node_role"))
+        return list(groups.values())
+
+    @staticmethod
+    def _packed_node(source: BaseNode, text: str) -> TextNode:
+        return TextNode(
+            id_=source.node_id,
+            text=text,
+            metadata=dict(source.metadata),
+            excluded_embed_metadata_keys=list(source.excluded_embed_metadata_keys),
+            excluded_llm_metadata_keys=list(source.excluded_llm_metadata_keys),
+        )
+
+    def _count_llm_tokens(self, source: BaseNode, text: str) -> int:
+        """Tokens of text as the chat engine formats it, metadata included"""
+        return self._count_tokens(self._packed_node(source, text).get_content(metadata_mode=MetadataMode.LLM))
+
+    def _truncate(self, text: str, budget: int) -> str:
+        """Cut text to at most budget tokens on a word boundary"""
+        words = text.split()
+        low, high = 0, len(words)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self._count_tokens(" ".join(words[:middle])) <= budget:
+                low = middle
+            else:
+                high = middle - 1
+        return " ".join(words[:low])
+
+    def _postprocess_nodes(
+        self,
+        nodes: List[NodeWithScore],
+        query_bundle: Optional[QueryBundle] = None,
+    ) -> List[NodeWithScore]:
+        if not nodes:
+            return nodes
+
+        groups = self._group(nodes)
+        remaining = self.token_budget
+
+        # Verse and translation first, in retrieval order
+        packed: List[Tuple[_VerseGroup, str, List[int]]] = []
+        for group in groups:
+            reference = group.node.node.metadata.get("reference", "")
+            core = "\n\n".join(group.core)
+            header = f"=== {reference} ===\n" if reference else ""
+            cost = self._count_llm_tokens(group.node.node, header + core)
+            if cost > remaining:
+                if packed:
+                    break
+                core = self._truncate(core, max(remaining - self._count_llm_tokens(group.node.node, header), 0))
+                cost = remaining
+            remaining -= cost
+            packed.append((group, header + core, []))
+
+        # Then the most query-relevant purport sentences across all packed verses
+        query_terms = set(tokenize(query_bundle.query_str)) if query_bundle else set()
+        candidates = []
+        for group_index, (group, _, _) in enumerate(packed):
+            for sentence_index, sentence in enumerate(group.purport):
+                overlap = len(query_terms & set(tokenize(sentence))) / len(query_terms) if query_terms else 0.0
+                score = overlap + _RANK_PRIOR / (group.rank + 1) - sentence_index * 1e-6
+                candidates.append((score, group_index, sentence_index))
+        candidates.sort(reverse=True)
+
+        label_paid = set()
+        for _, group_index, sentence_index in candidates:
+            group, _, selected = packed[group_index]
+            cost = self._count_tokens(group.purport[sentence_index]) + 1
+            if group_index not in label_paid:
+                cost += self._count_tokens(f"\n\n{group.label or ''}")
+            if cost > remaining:
+                continue
+            remaining -= cost
+            label_paid.add(group_index)
+            selected.append(sentence_index)
+
+        results: List[NodeWithScore] = []
+        for group, text, selected in packed:
+            if selected:
+                selected.sort()
+                parts = []
+                for position, sentence_index in enumerate(selected):
+                    if position and sentence_index != selected[position - 1] + 1:
+                        parts.append(_GAP)
+                    parts.append(group.purport[sentence_index])
+                purport = " ".join(parts)
+                separator = "\n\n" if text and not text.endswith("\n") else ""
+                text = f"{text}{separator}{group.label or ''}{purport}"
+
+            results.append(NodeWithScore(node=self._packed_node(group.node.node, text), score=group.node.score))
+        return results
@@ -0,0 +1,170 @@
+"""
+Embedding Cache - Persistent SQLite cache of embeddings keyed by (model, text hash)
+"""
+import hashlib
+import sqlite3
+import threading
+from array import array
+from typing import Dict, List, Optional
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.embeddings.ollama import OllamaEmbedding
+from pydantic import PrivateAttr
+
+from config import settings
+from metrics import CACHE_HITS, CACHE_MISSES
+
+# SQLite limits the number of bound parameters per statement
+_SQL_BATCH_SIZE = 500
+
+
+def _cache_key(model: str, kind: str, text: str) -> str:
+    """Hash of the model, embedding kind (query/text) and the exact text"""
+    return hashlib.sha256(f"{model}\0{kind}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """On-disk embedding store shared by the indexer and the RAG query path"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT NOT NULL,"
+            " vector BLOB NOT NULL"
+            ")"
+        )
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, model: str, kind: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Look up embeddings for texts; missing entries are None"""
+        keys = [_cache_key(model, kind, text) for text in texts]
+        found: Dict[str, List[float]] = {}
+
+        with self._lock:
+            unique_keys = list(dict.fromkeys(keys))
+            for start in range(0, len(unique_keys), _SQL_BATCH_SIZE):
+                batch = unique_keys[start:start + _SQL_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+
+        results = [found.get(key) for key in keys]
+        hits = sum(1 for result in results if result is not None)
+        self.hits += hits
+        self.misses += len(results) - hits
+        CACHE_HITS.labels("embedding").inc(hits)
+        CACHE_MISSES.labels("embedding").inc(len(results) - hits)
+        return results
+
+    def put_many(self, model: str, kind: str, texts: List[str], embeddings: List[List[float]]):
+        """Store embeddings for texts, overwriting existing entries"""
+        rows = [
+            (_cache_key(model, kind, text), model, array("f", embedding).tobytes())
+            for text, embedding in zip(texts, embeddings)
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, vector) VALUES (?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbedding(BaseEmbedding):
+    """Embedding model that serves repeated texts from an EmbeddingCache"""
+
+    _inner: BaseEmbedding = PrivateAttr()
+    _cache: EmbeddingCache = PrivateAttr()
+
+    def __init__(self, inner: BaseEmbedding, cache: EmbeddingCache, **kwargs):
+        super().__init__(
+            model_name=inner.model_name,
+            embed_batch_size=inner.embed_batch_size,
+            **kwargs,
+        )
+        self._inner = inner
+        self._cache = cache
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    @property
+    def cache(self) -> EmbeddingCache:
+        return self._cache
+
+    @property
+    def inner(self) -> BaseEmbedding:
+        """The wrapped model, for calls that must reach Ollama (e.g. warm-up)"""
+        return self._inner
+
+    def _split(self, kind: str, texts: List[str]):
+        """Return cached results plus the unique texts that still need embedding"""
+        results = self._cache.get_many(self.model_name, kind, texts)
+        missing = list(dict.fromkeys(text for text, result in zip(texts, results) if result is None))
+        return results, missing
+
+    def _merge(self, kind: str, texts: List[str], results, missing: List[str], embeddings) -> List[List[float]]:
+        if missing:
+            self._cache.put_many(self.model_name, kind, missing, embeddings)
+            computed = dict(zip(missing, embeddings))
+            results = [result if result is not None else computed[text] for text, result in zip(texts, results)]
+        return results
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        results, missing = self._split("query", [query])
+        embeddings = [self._inner.get_query_embedding(text) for text in missing]
+        return self._merge("query", [query], results, missing, embeddings)[0]
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        results, missing = self._split("query", [query])
+        embeddings = [await self._inner.aget_query_embedding(text) for text in missing]
+        return self._merge("query", [query], results, missing, embeddings)[0]
+
+    def get_query_embedding_batch(self, queries: List[str]) -> List[List[float]]:
+        """Embed several queries with one model call (Ollama embeds queries and texts alike)"""
+        results, missing = self._split("query", queries)
+        embeddings = self._inner.get_text_embedding_batch(missing) if missing else []
+        return self._merge("query", queries, results, missing, embeddings)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._get_text_embeddings([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return (await self._aget_text_embeddings([text]))[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        results, missing = self._split("text", texts)
+        embeddings = self._inner.get_text_embedding_batch(missing) if missing else []
+        return self._merge("text", texts, results, missing, embeddings)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        results, missing = self._split("text", texts)
+        embeddings = await self._inner.aget_text_embedding_batch(missing) if missing else []
+        return self._merge("text", texts, results, missing, embeddings)
+
+
+def build_embed_model(**kwargs) -> BaseEmbedding:
+    """Create the Ollama embedding model, wrapped in the persistent cache when enabled"""
+    embed_model = OllamaEmbedding(
+        model_name=settings.embedding_model,
+        base_url=settings.ollama_base_url,
+        **kwargs,
+    )
+    if not settings.embedding_cache_enabled:
+        return embed_model
+    return CachedEmbedding(embed_model, EmbeddingCache(settings.embedding_cache_path))
@@ -0,0 +1,324 @@
+"""
+Hybrid Retriever - BM25 lexical index fused with vector search
+
+Dense retrieval misses exact Sanskrit terms and diacritic-heavy
+transliterations. LexicalIndex is a BM25 index over the same chunks the
+indexer stores in Chroma, with diacritics folded so "kṛṣṇa", "krsna",
+"кр̣шн̣а" and "кршна" share terms. HybridRetriever merges both result lists
+with weighted reciprocal rank fusion.
+"""
+import asyncio
+import heapq
+import json
+import math
+import os
+import re
+import unicodedata
+from array import array
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import NodeWithScore, QueryBundle
+
+from config import settings
+from search_filters import SearchFilters
+from verse_lookup import fetch_nodes
+
+# Bumped whenever tokenization or the on-disk layout changes
+LEXICAL_INDEX_VERSION = 4
+
+# Page size for scanning the collection
+_SCAN_PAGE_SIZE = 2000
+
+# BM25 parameters
+_K1 = 1.2
+_B = 0.75
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Combining marks of IAST and the Ukrainian academic transliteration
+# (macron, dots, acute, tilde) - but not the breve of й or the diaeresis of ї
+_SANSKRIT_MARKS = "\u0301\u0303\u0304\u0307\u0323"
+# Anchored at word starts, so scanning a long purport does not backtrack
+_MARKED_WORD_RE = re.compile(
+    rf"(?<![\w\u0300-\u036f])[\w\u0300-\u036f]*?[{_SANSKRIT_MARKS}][\w\u0300-\u036f]*"
+)
+
+# Verse document paragraphs made of Sanskrit words (labels as in indexer.FIELD_LABELS)
+_TRANSLITERATION_RE = re.compile(r"^(?:Транслітерація|Transliteration): (.*?)(?:\n\n|\Z)", re.M | re.S)
+_SYNONYMS_RE = re.compile(r"^(?:Послівний переклад|Word-for-word): (.*?)(?:\n\n|\Z)", re.M | re.S)
+# "<em>ом̇</em> — мій Господи; <em>намах̣</em> — ..." -> the words before each dash
+_SYNONYM_WORDS_RE = re.compile(r"(?:^|;)([^;—]*)—")
+
+
+def fold_diacritics(text: str) -> str:
+    """Casefold and strip combining marks (ṛ -> r, ā -> a, н̣ -> н)"""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def tokenize(text: str) -> List[str]:
+    """Split diacritic-folded text into lexical terms"""
+    return [token for token in _TOKEN_RE.findall(fold_diacritics(text)) if len(token) > 1]
+
+
+def sanskrit_terms(text: str) -> Set[str]:
+    """
+    Folded terms of the Sanskrit words in a chunk
+
+    These are the words of the transliteration and of the word-for-word
+    glosses, plus any word written with Sanskrit diacritics (kṛṣṇa in a purport).
+    """
+    terms = set()
+    for paragraph in _TRANSLITERATION_RE.findall(text):
+        terms.update(tokenize(paragraph))
+    for paragraph in _SYNONYMS_RE.findall(text):
+        for words in _SYNONYM_WORDS_RE.findall(re.sub(r"<[^>]+>", "", paragraph)):
+            terms.update(tokenize(words))
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    for word in _MARKED_WORD_RE.findall(decomposed):
+        terms.update(tokenize(word))
+    return terms
+
+
+class LexicalIndex:
+    """Compact in-memory BM25 index keyed by Chroma chunk ids"""
+
+    def __init__(self):
+        self.node_ids: List[str] = []
+        # (book_slug, canto_number, chapter_number, has_ukrainian) per chunk, for filtering
+        self.doc_fields: List[Tuple] = []
+        self.doc_lengths = array("I")
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        self.avg_doc_length = 0.0
+        # Terms written with Sanskrit diacritics somewhere in the corpus
+        self.sanskrit_terms: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    @classmethod
+    def from_collection(cls, collection) -> "LexicalIndex":
+        """Build the index from every chunk stored in a Chroma collection"""
+        index = cls()
+        postings: Dict[str, Tuple[array, array]] = {}
+        offset = 0
+        while True:
+            page = collection.get(include=["documents", "metadatas"], limit=_SCAN_PAGE_SIZE, offset=offset)
+            for node_id, text, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+                doc = len(index.node_ids)
+                terms = Counter(tokenize(text or ""))
+                metadata = metadata or {}
+                index.node_ids.append(node_id)
+                index.doc_fields.append((
+                    metadata.get("book_slug"),
+                    metadata.get("canto_number"),
+                    metadata.get("chapter_number"),
+                    metadata.get("has_ukrainian"),
+                ))
+                index.doc_lengths.append(sum(terms.values()))
+                index.sanskrit_terms.update(sanskrit_terms(text or ""))
+                for term, tf in terms.items():
+                    docs, tfs = postings.setdefault(term, (array("I"), array("H")))
+                    docs.append(doc)
+                    tfs.append(min(tf, 0xFFFF))
+            if len(page["ids"]) < _SCAN_PAGE_SIZE:
+                break
+            offset += _SCAN_PAGE_SIZE
+
+        index.postings = postings
+        index.avg_doc_length = (sum(index.doc_lengths) / len(index.doc_lengths)) if index.doc_lengths else 0.0
+        return index
+
+    def search(
+        self,
+        query: str,
+        top_k: int,
+        filters: Optional[SearchFilters] = None,
+        term_groups: Optional[List[List[str]]] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        Return (node_id, bm25 score) pairs, best first
+
+        Args:
+            term_groups: Alternative spellings of each query term; a chunk
+                scores the best-matching spelling of a group, so a term
+                written in several scripts counts once. Defaults to the
+                query's own terms.
+        """
+        doc_count = len(self.node_ids)
+        if not doc_count:
+            return []
+
+        allowed = None
+        if filters is not None and not filters.is_empty:
+            allowed = bytearray(filters.matches_values(*fields) for fields in self.doc_fields)
+
+        if term_groups is None:
+            term_groups = [[term] for term in set(tokenize(query))]
+
+        scores: Dict[int, float] = {}
+        for group in term_groups:
+            group_scores: Dict[int, float] = {}
+            for term in group:
+                entry = self.postings.get(term)
+                if entry is None:
+                    continue
+                docs, tfs = entry
+                idf = math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+                for doc, tf in zip(docs, tfs):
+                    if allowed is not None and not allowed[doc]:
+                        continue
+                    norm = _K1 * (1 - _B + _B * self.doc_lengths[doc] / self.avg_doc_length)
+                    score = idf * tf * (_K1 + 1) / (tf + norm)
+                    if score > group_scores.get(doc, 0.0):
+                        group_scores[doc] = score
+            for doc, score in group_scores.items():
+                scores[doc] = scores.get(doc, 0.0) + score
+
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return [(self.node_ids[doc], score) for doc, score in best]
+
+    def save(self, path: str, collection_count: int):
+        """
+        Persist the index together with the collection size it was built from
+
+        The file is an .npz archive of plain arrays: the postings are
+        concatenated into doc and tf arrays with per-term offsets, and the
+        strings go in a JSON header. It is read with allow_pickle=False, so an
+        index shipped in a snapshot cannot run code on load.
+        """
+        terms = list(self.postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        for i, term in enumerate(terms):
+            offsets[i + 1] = offsets[i] + len(self.postings[term][0])
+        header = {
+            "version": LEXICAL_INDEX_VERSION,
+            "collection_count": collection_count,
+            "avg_doc_length": self.avg_doc_length,
+            "node_ids": self.node_ids,
+            "doc_fields": self.doc_fields,
+            "sanskrit_terms": sorted(self.sanskrit_terms),
+            "terms": terms,
+        }
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                header=np.frombuffer(json.dumps(header, ensure_ascii=False).encode("utf-8"), dtype=np.uint8),
+                doc_lengths=np.frombuffer(self.doc_lengths, dtype=np.uint32),
+                offsets=offsets,
+                docs=np.frombuffer(b"".join(docs.tobytes() for docs, _ in self.postings.values()), dtype=np.uint32),
+                tfs=np.frombuffer(b"".join(tfs.tobytes() for _, tfs in self.postings.values()), dtype=np.uint16),
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, collection_count: int) -> Optional["LexicalIndex"]:
+        """Load a saved index, or None if it is missing, stale or in an older format"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                header = json.loads(data["header"].tobytes().decode("utf-8"))
+                if header.get("version") != LEXICAL_INDEX_VERSION or header.get("collection_count") != collection_count:
+                    return None
+                doc_lengths, offsets = data["doc_lengths"], data["offsets"].tolist()
+                docs, tfs = array("I", data["docs"].tobytes()), array("H", data["tfs"].tobytes())
+        except (ValueError, OSError, KeyError):
+            # Earlier versions were pickled; they are rebuilt, never unpickled
+            return None
+
+        index = cls()
+        index.node_ids = header["node_ids"]
+        index.doc_fields = [tuple(fields) for fields in header["doc_fields"]]
+        index.doc_lengths = array("I", doc_lengths.tobytes())
+        index.postings = {
+            term: (docs[offsets[i]:offsets[i + 1]], tfs[offsets[i]:offsets[i + 1]])
+            for i, term in enumerate(header["terms"])
+        }
+        index.avg_doc_length = header["avg_doc_length"]
+        index.sanskrit_terms = set(header["sanskrit_terms"])
+        return index
+
+
+def load_or_build_lexical_index(collection, path: Optional[str] = None) -> LexicalIndex:
+    """Load the saved lexical index for a collection, rebuilding it if stale"""
+    path = path or settings.lexical_index_path
+    count = collection.count()
+    index = LexicalIndex.load(path, count)
+    if index is None:
+        index = LexicalIndex.from_collection(collection)
+        index.save(path, count)
+    return index
+
+
+def reciprocal_rank_fusion(
+    ranked_lists: List[List[NodeWithScore]],
+    weights: List[float],
+    k: int,
+) -> List[NodeWithScore]:
+    """Merge ranked node lists by weighted RRF: sum(w / (k + rank))"""
+    fused: Dict[str, float] = {}
+    nodes: Dict[str, NodeWithScore] = {}
+    for ranked, weight in zip(ranked_lists, weights):
+        for rank, node in enumerate(ranked, start=1):
+            node_id = node.node.node_id
+            fused[node_id] = fused.get(node_id, 0.0) + weight / (k + rank)
+            nodes.setdefault(node_id, node)
+
+    ordered = sorted(fused.items(), key=lambda item: item[1], reverse=True)
+    return [NodeWithScore(node=nodes[node_id].node, score=score) for node_id, score in ordered]
+
+
+class HybridRetriever(BaseRetriever):
+    """Vector retriever fused with BM25 results by reciprocal rank fusion"""
+
+    def __init__(
+        self,
+        vector_retriever: BaseRetriever,
+        lexical_index: LexicalIndex,
+        collection,
+        top_k: int,
+        filters: Optional[SearchFilters] = None,
+        term_groups: Optional[Callable[[str], List[List[str]]]] = None,
+    ):
+        super().__init__()
+        self._vector_retriever = vector_retriever
+        self._lexical_index = lexical_index
+        self._collection = collection
+        self._top_k = top_k
+        self._filters = filters
+        self._term_groups = term_groups
+
+    def _lexical_retrieve(self, query: str) -> List[NodeWithScore]:
+        term_groups = self._term_groups(query) if self._term_groups is not None else None
+        hits = self._lexical_index.search(query, settings.hybrid_candidate_k, self._filters, term_groups)
+        if not hits:
+            return []
+        node_ids, scores = zip(*hits)
+        return fetch_nodes(self._collection, list(node_ids), list(scores))
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        vector_nodes = self._vector_retriever.retrieve(query_bundle)
+        lexical_nodes = self._lexical_retrieve(query_bundle.query_str)
+        return self._fuse(vector_nodes, lexical_nodes)
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        # BM25 scoring is CPU-bound, so it runs in a worker thread alongside the dense search
+        vector_nodes, lexical_nodes = await asyncio.gather(
+            self._vector_retriever.aretrieve(query_bundle),
+            asyncio.to_thread(self._lexical_retrieve, query_bundle.query_str),
+        )
+        return self._fuse(vector_nodes, lexical_nodes)
+
+    def _fuse(self, vector_nodes: List[NodeWithScore], lexical_nodes: List[NodeWithScore]) -> List[NodeWithScore]:
+        fused = reciprocal_rank_fusion(
+            [vector_nodes, lexical_nodes],
+            [settings.hybrid_vector_weight, settings.hybrid_lexical_weight],
+            settings.hybrid_rrf_k,
+        )
+        return fused[:self._top_k]
@@ -2,24 +2,216 @@
 Book Indexer - Fetches books from Supabase and creates vector embeddings
 """
 import os
+import sys
+import json
 import asyncio
-from typing import List, Optional
+import hashlib
+from collections import Counter
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
 from dataclasses import dataclass
 
 from rich.console import Console
 from rich.progress import Progress, TaskID
 from supabase import create_client, Client
+from tenacity import AsyncRetrying, stop_after_attempt, wait_exponential
 
-from llama_index.core import Document, VectorStoreIndex, StorageContext
+from llama_index.core import Document, VectorStoreIndex
 from llama_index.core.node_parser import SentenceSplitter
-from llama_index.vector_stores.chroma import ChromaVectorStore
-from llama_index.embeddings.ollama import OllamaEmbedding
-import chromadb
+from llama_index.core.schema import MetadataMode
+from llama_index.core.vector_stores.types import BasePydanticVectorStore
 
 from config import settings, BOOK_METADATA
+from embedding_cache import build_embed_model
+from verse_nodes import VerseNodeParser
+from hybrid_retriever import LexicalIndex
+from language_routing import collection_name, index_languages, lexical_index_path
+from snapshot import SnapshotError, export_snapshot, import_snapshot
+from local_vector_store import (
+    LocalClient, LocalCollection, compact_collection, directory_size, open_vector_client, store_location,
+    wrap_collection,
+)
 
 console = Console()
 
+# Page size for scanning and deleting entries in an existing collection
+INDEX_SCAN_PAGE_SIZE = 1000
+
+# Per-language fields; a verse without any of them is left out of that language's collection
+LANGUAGE_TEXT_FIELDS = ("synonyms", "translation", "commentary")
+
+# Field labels of per-language documents
+FIELD_LABELS = {
+    "uk": {
+        "sanskrit": "Санскрит",
+        "transliteration": "Транслітерація",
+        "synonyms": "Послівний переклад",
+        "translation": "Переклад",
+        "commentary": "Коментар",
+    },
+    "en": {
+        "sanskrit": "Sanskrit",
+        "transliteration": "Transliteration",
+        "synonyms": "Word-for-word",
+        "translation": "Translation",
+        "commentary": "Purport",
+    },
+}
+
+# Metadata used for change tracking only - kept out of embeddings and prompts
+TRACKING_METADATA_KEYS = ["verse_id", "content_hash", "chunk_count"]
+
+
+def content_hash(text: str, metadata: dict) -> str:
+    """Stable hash of a verse document's text and metadata"""
+    payload = json.dumps(
+        {"text": text, "metadata": {k: v for k, v in metadata.items() if k not in TRACKING_METADATA_KEYS}},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def chunking_signature() -> str:
+    """Identifies the chunking settings a collection was built with"""
+    return f"{settings.chunking_strategy}:{settings.chunk_size}:{settings.chunk_overlap}"
+
+
+def build_node_parser():
+    """Verse-aware parser by default, generic sentence splitting as a fallback"""
+    if settings.chunking_strategy == "verse":
+        return VerseNodeParser(chunk_size=settings.chunk_size)
+    return SentenceSplitter(
+        chunk_size=settings.chunk_size,
+        chunk_overlap=settings.chunk_overlap,
+    )
+
+
+def _mixed_fields(verse: dict) -> List[Tuple[str, str]]:
+    """Labelled text of a verse for the mixed collection, preferring Ukrainian"""
+    fields = []
+
+    # Sanskrit and transliteration
+    if verse.get("sanskrit"):
+        fields.append(("Санскрит", verse["sanskrit"]))
+    if verse.get("transliteration_uk") or verse.get("transliteration_en"):
+        fields.append(("Транслітерація", verse.get("transliteration_uk") or verse.get("transliteration_en")))
+
+    # Synonyms
+    if verse.get("synonyms_uk"):
+        fields.append(("Послівний переклад", verse["synonyms_uk"]))
+    elif verse.get("synonyms_en"):
+        fields.append(("Word-for-word", verse["synonyms_en"]))
+
+    # Translation
+    if verse.get("translation_uk"):
+        fields.append(("Переклад", verse["translation_uk"]))
+    elif verse.get("translation_en"):
+        fields.append(("Translation", verse["translation_en"]))
+
+    # Commentary (purport)
+    if verse.get("commentary_uk"):
+        fields.append(("Коментар", verse["commentary_uk"]))
+    elif verse.get("commentary_en"):
+        fields.append(("Purport", verse["commentary_en"]))
+
+    return fields
+
+
+def _language_fields(verse: dict, language: str) -> List[Tuple[str, str]]:
+    """Labelled text of a verse in one language; empty if it has no text in that language"""
+    if not any(verse.get(f"{field}_{language}") for field in LANGUAGE_TEXT_FIELDS):
+        return []
+
+    labels = FIELD_LABELS[language]
+    fields = []
+    if verse.get("sanskrit"):
+        fields.append((labels["sanskrit"], verse["sanskrit"]))
+    translit = verse.get(f"transliteration_{language}") or verse.get("transliteration_uk") or verse.get("transliteration_en")
+    if translit:
+        fields.append((labels["transliteration"], translit))
+    for field in LANGUAGE_TEXT_FIELDS:
+        if verse.get(f"{field}_{language}"):
+            fields.append((labels[field], verse[f"{field}_{language}"]))
+    return fields
+
+
+def verse_to_document(
+    verse: dict,
+    book: dict,
+    chapter: dict,
+    language: Optional[str] = None,
+) -> Optional[Document]:
+    """
+    Convert a verse to a LlamaIndex Document with rich metadata
+
+    Args:
+        language: "uk" or "en" to build the document from that language's
+            fields only (for per-language collections); None mixes them,
+            preferring Ukrainian
+
+    Returns:
+        The document, or None if the verse has no text in the language
+    """
+    book_slug = book.get("slug", "unknown")
+    book_meta = BOOK_METADATA.get(book_slug, {})
+    if language == "en":
+        book_title = book_meta.get("title_en", book.get("title_en") or book.get("title", ""))
+        chapter_title = chapter.get("title_en") or chapter.get("title_uk", "")
+    else:
+        book_title = book_meta.get("title_uk", book.get("title", ""))
+        chapter_title = chapter.get("title_uk") or chapter.get("title_en", "")
+
+    # Build verse reference
+    canto = verse.get("canto_number")
+    chapter_num = verse.get("chapter_number") or chapter.get("chapter_number", 1)
+    verse_num = verse.get("verse_number", "")
+
+    if canto:
+        reference = f"{book_title} {canto}.{chapter_num}.{verse_num}"
+    else:
+        reference = f"{book_title} {chapter_num}.{verse_num}"
+
+    fields = _mixed_fields(verse) if language is None else _language_fields(verse, language)
+    if language is not None and not fields:
+        return None
+
+    # Reference header, then every field that has text
+    text_parts = [f"=== {reference} ===\n"]
+    text_parts.extend(f"{label}: {text}" for label, text in fields)
+    full_text = "\n\n".join(text_parts)
+
+    # Metadata for filtering and display
+    metadata = {
+        "book_slug": book_slug,
+        "book_title": book_title,
+        "book_title_en": book_meta.get("title_en", book.get("title_en", "")),
+        "author": book_meta.get("author", "Шріла Прабгупада"),
+        "canto_number": canto,
+        "chapter_number": chapter_num,
+        "chapter_title": chapter_title,
+        "verse_number": verse_num,
+        "reference": reference,
+        "has_ukrainian": (
+            language == "uk" if language is not None
+            else bool(verse.get("translation_uk") or verse.get("commentary_uk"))
+        ),
+        "content_type": "verse"
+    }
+    if language is not None:
+        metadata["language"] = language
+
+    verse_id = str(verse.get("id") or reference)
+    metadata["verse_id"] = verse_id
+    metadata["content_hash"] = content_hash(full_text, metadata)
+
+    return Document(
+        id_=verse_id,
+        text=full_text,
+        metadata=metadata,
+        excluded_embed_metadata_keys=list(TRACKING_METADATA_KEYS),
+        excluded_llm_metadata_keys=list(TRACKING_METADATA_KEYS),
+    )
+
 
 @dataclass
 class VerseDocument:
@@ -40,6 +232,16 @@ class VerseDocument:
     commentary_en: Optional[str]
 
 
+@dataclass
+class IndexStats:
+    """Counters collected while streaming verses into the index"""
+    total: int = 0
+    new: int = 0
+    changed: int = 0
+    deleted: int = 0
+    nodes: int = 0
+
+
 class VedavoiceIndexer:
     def __init__(self):
         self.supabase: Client = create_client(
@@ -47,112 +249,276 @@ class VedavoiceIndexer:
             settings.supabase_anon_key
         )
 
-        # Initialize embedding model
-        self.embed_model = OllamaEmbedding(
-            model_name=settings.embedding_model,
-            base_url=settings.ollama_base_url,
-        )
-
-        # Initialize ChromaDB
-        self.chroma_client = chromadb.PersistentClient(path=settings.chroma_persist_dir)
+        # Initialize embedding model (served from the persistent cache where possible)
+        self.embed_model = build_embed_model(embed_batch_size=settings.embed_batch_size)
+
+        # Initialize the vector store client (Chroma or the local NumPy store)
+        self.store_client = open_vector_client()
+
+    def _get_or_create_collection(self, name: str, fresh: bool = False, language: Optional[str] = None):
+        """Get or create a collection, dropping it first for a fresh index"""
+        if not fresh:
+            try:
+                collection = self.store_client.get_collection(name)
+                metadata = collection.metadata or {}
+                indexed_model = metadata.get("embedding_model")
+                indexed_chunking = metadata.get("chunking")
+                if indexed_model == settings.embedding_model and indexed_chunking == chunking_signature():
+                    return collection
+                # Vectors from another embedding model or chunking are not comparable. Collections
+                # without this metadata predate verse_id tracking, so they could not be diffed either
+                console.print(
+                    f"[yellow]Collection was built with {indexed_model} / {indexed_chunking}, "
+                    f"rebuilding for {settings.embedding_model} / {chunking_signature()}[/yellow]"
+                )
+            except Exception:
+                pass
 
-    def _get_or_create_collection(self):
-        """Get or create ChromaDB collection"""
         try:
-            # Try to delete existing collection for fresh index
-            self.chroma_client.delete_collection(settings.collection_name)
-            console.print(f"[yellow]Deleted existing collection: {settings.collection_name}[/yellow]")
+            self.store_client.delete_collection(name)
+            console.print(f"[yellow]Deleted existing collection: {name}[/yellow]")
         except Exception:
             pass
 
-        return self.chroma_client.create_collection(
-            name=settings.collection_name,
-            metadata={"description": "Vedavoice books vector store"}
-        )
+        metadata = {
+            "description": "Vedavoice books vector store",
+            "embedding_model": settings.embedding_model,
+            "chunking": chunking_signature(),
+        }
+        if language is not None:
+            metadata["language"] = language
+        return self.store_client.create_collection(name=name, metadata=metadata)
+
+    def _load_indexed_hashes(self, collection) -> Dict[str, str]:
+        """
+        Map verse_id -> content_hash for everything already in the collection
+
+        A verse's chunks may be written in more than one store batch, so a
+        crash can leave it partly written. Such verses (fewer chunks than their
+        recorded chunk_count) map to an empty hash and are re-embedded.
+        """
+        hashes: Dict[str, str] = {}
+        counts: Counter = Counter()
+        expected: Dict[str, int] = {}
+        offset = 0
+        while True:
+            page = collection.get(include=["metadatas"], limit=INDEX_SCAN_PAGE_SIZE, offset=offset)
+            metadatas = page.get("metadatas") or []
+            for metadata in metadatas:
+                if metadata and metadata.get("verse_id"):
+                    verse_id = metadata["verse_id"]
+                    hashes[verse_id] = metadata.get("content_hash", "")
+                    counts[verse_id] += 1
+                    if metadata.get("chunk_count") is not None:
+                        expected[verse_id] = metadata["chunk_count"]
+            if len(metadatas) < INDEX_SCAN_PAGE_SIZE:
+                break
+            offset += INDEX_SCAN_PAGE_SIZE
+
+        for verse_id, chunk_count in expected.items():
+            if counts[verse_id] != chunk_count:
+                hashes[verse_id] = ""
+        return hashes
+
+    def _delete_verses(self, collection, verse_ids: List[str]):
+        """Remove every chunk belonging to the given verses"""
+        for start in range(0, len(verse_ids), INDEX_SCAN_PAGE_SIZE):
+            batch = verse_ids[start:start + INDEX_SCAN_PAGE_SIZE]
+            collection.delete(where={"verse_id": {"$in": batch}})
 
     async def fetch_books(self) -> List[dict]:
         """Fetch all books from Supabase"""
         response = self.supabase.table("books").select("*").execute()
         return response.data
 
+    async def _fetch_pages(self, table: str, book_id: str) -> AsyncIterator[List[dict]]:
+        """
+        Keyset-paginate a table filtered by book_id
+
+        Pages are ordered by id and each request starts after the last id seen,
+        so PostgREST row caps never truncate a book. The blocking Supabase call
+        runs in a worker thread, letting embedding proceed while the next page
+        is downloading.
+        """
+        last_id = None
+        while True:
+            query = self.supabase.table(table).select("*").eq("book_id", book_id)
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            query = query.order("id").limit(settings.supabase_page_size)
+
+            response = await asyncio.to_thread(query.execute)
+            rows = response.data
+            if rows:
+                yield rows
+            if len(rows) < settings.supabase_page_size:
+                return
+            last_id = rows[-1]["id"]
+
+    async def iter_verses_for_book(self, book_id: str) -> AsyncIterator[List[dict]]:
+        """Yield verses of a book with chapter info, one page at a time"""
+        async for page in self._fetch_pages("verses_with_metadata", book_id):
+            yield page
+
+    async def iter_chapters_for_book(self, book_id: str) -> AsyncIterator[List[dict]]:
+        """Yield chapters of a book, one page at a time"""
+        async for page in self._fetch_pages("chapters", book_id):
+            yield page
+
     async def fetch_verses_for_book(self, book_id: str) -> List[dict]:
         """Fetch all verses for a specific book with chapter info"""
-        response = self.supabase.table("verses_with_metadata").select("*").eq("book_id", book_id).execute()
-        return response.data
+        return [verse async for page in self.iter_verses_for_book(book_id) for verse in page]
 
     async def fetch_chapters_for_book(self, book_id: str) -> dict:
         """Fetch chapters and create a lookup dict"""
-        response = self.supabase.table("chapters").select("*").eq("book_id", book_id).execute()
-        return {ch["id"]: ch for ch in response.data}
+        return {ch["id"]: ch async for page in self.iter_chapters_for_book(book_id) for ch in page}
+
+    async def _produce_documents(
+        self,
+        books: List[dict],
+        queue: asyncio.Queue,
+        progress: Progress,
+        books_task: TaskID,
+        language: Optional[str] = None,
+    ):
+        """Stream verse pages from Supabase into the queue as Document batches"""
+        try:
+            for book in books:
+                book_title = book.get("title", book.get("slug", "Unknown"))
+                progress.update(books_task, description=f"[cyan]Processing: {book_title}")
 
-    def verse_to_document(self, verse: dict, book: dict, chapter: dict) -> Document:
-        """Convert a verse to a LlamaIndex Document with rich metadata"""
-        book_slug = book.get("slug", "unknown")
-        book_meta = BOOK_METADATA.get(book_slug, {})
-        book_title = book_meta.get("title_uk", book.get("title", ""))
+                chapters = await self.fetch_chapters_for_book(book["id"])
 
-        # Build verse reference
-        canto = verse.get("canto_number")
-        chapter_num = verse.get("chapter_number") or chapter.get("chapter_number", 1)
-        verse_num = verse.get("verse_number", "")
-
-        if canto:
-            reference = f"{book_title} {canto}.{chapter_num}.{verse_num}"
-        else:
-            reference = f"{book_title} {chapter_num}.{verse_num}"
-
-        # Build document text - combine all relevant fields
-        text_parts = []
-
-        # Reference header
-        text_parts.append(f"=== {reference} ===\n")
-
-        # Sanskrit and transliteration
-        if verse.get("sanskrit"):
-            text_parts.append(f"Санскрит: {verse['sanskrit']}")
-        if verse.get("transliteration_uk") or verse.get("transliteration_en"):
-            translit = verse.get("transliteration_uk") or verse.get("transliteration_en")
-            text_parts.append(f"Транслітерація: {translit}")
-
-        # Synonyms
-        if verse.get("synonyms_uk"):
-            text_parts.append(f"Послівний переклад: {verse['synonyms_uk']}")
-        elif verse.get("synonyms_en"):
-            text_parts.append(f"Word-for-word: {verse['synonyms_en']}")
-
-        # Translation
-        if verse.get("translation_uk"):
-            text_parts.append(f"Переклад: {verse['translation_uk']}")
-        elif verse.get("translation_en"):
-            text_parts.append(f"Translation: {verse['translation_en']}")
-
-        # Commentary (purport)
-        if verse.get("commentary_uk"):
-            text_parts.append(f"Коментар: {verse['commentary_uk']}")
-        elif verse.get("commentary_en"):
-            text_parts.append(f"Purport: {verse['commentary_en']}")
-
-        full_text = "\n\n".join(text_parts)
-
-        # Metadata for filtering and display
-        metadata = {
-            "book_slug": book_slug,
-            "book_title": book_title,
-            "book_title_en": book_meta.get("title_en", book.get("title_en", "")),
-            "author": book_meta.get("author", "Шріла Прабгупада"),
-            "canto_number": canto,
-            "chapter_number": chapter_num,
-            "chapter_title": chapter.get("title_uk") or chapter.get("title_en", ""),
-            "verse_number": verse_num,
-            "reference": reference,
-            "has_ukrainian": bool(verse.get("translation_uk") or verse.get("commentary_uk")),
-            "content_type": "verse"
-        }
+                verse_count = 0
+                async for verses in self.iter_verses_for_book(book["id"]):
+                    documents = []
+                    for verse in verses:
+                        document = verse_to_document(verse, book, chapters.get(verse.get("chapter_id"), {}), language)
+                        # Verses with no text in the collection's language are skipped
+                        if document is not None:
+                            documents.append(document)
+                    # Blocks when the embedding side falls behind, keeping memory flat
+                    await queue.put(documents)
+                    verse_count += len(verses)
+
+                if verse_count:
+                    console.print(f"  [dim]├─ {book_title}: {verse_count} verses[/dim]")
+                progress.advance(books_task)
+        finally:
+            await queue.put(None)
+
+    async def _chunk_documents(
+        self,
+        doc_queue: asyncio.Queue,
+        embed_queue: asyncio.Queue,
+        collection,
+        indexed_hashes: Dict[str, str],
+        seen_ids: Set[str],
+        stats: IndexStats,
+    ):
+        """Diff incoming documents against the index and split changed ones into embedding batches"""
+        node_parser = build_node_parser()
 
-        return Document(text=full_text, metadata=metadata)
+        try:
+            while True:
+                documents = await doc_queue.get()
+                if documents is None:
+                    return
+
+                changed_documents = []
+                stale_ids = []
+                for doc in documents:
+                    verse_id = doc.metadata["verse_id"]
+                    seen_ids.add(verse_id)
+                    indexed_hash = indexed_hashes.get(verse_id)
+                    if indexed_hash == doc.metadata["content_hash"]:
+                        continue
+                    changed_documents.append(doc)
+                    if indexed_hash is None:
+                        stats.new += 1
+                    else:
+                        stats.changed += 1
+                        stale_ids.append(verse_id)
+                stats.total += len(documents)
+
+                if stale_ids:
+                    self._delete_verses(collection, stale_ids)
+                if not changed_documents:
+                    continue
 
-    async def index_all_books(self, reindex: bool = True):
-        """Index all books from Supabase"""
+                nodes = node_parser.get_nodes_from_documents(changed_documents)
+                chunk_counts = Counter(node.metadata["verse_id"] for node in nodes)
+                for node in nodes:
+                    node.metadata["chunk_count"] = chunk_counts[node.metadata["verse_id"]]
+                for start in range(0, len(nodes), settings.embed_batch_size):
+                    await embed_queue.put(nodes[start:start + settings.embed_batch_size])
+        finally:
+            # One stop marker per embedding worker
+            for _ in range(settings.embed_concurrency):
+                await embed_queue.put(None)
+
+    async def _embed_with_retry(self, texts: List[str]) -> List[List[float]]:
+        """Embed one batch, retrying transient Ollama failures with exponential backoff"""
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(settings.embed_max_retries),
+            wait=wait_exponential(multiplier=1, max=30),
+            reraise=True,
+        ):
+            with attempt:
+                return await self.embed_model.aget_text_embedding_batch(texts)
+
+    async def _embed_worker(self, embed_queue: asyncio.Queue, write_queue: asyncio.Queue):
+        """Embed node batches; embed_concurrency of these bound the requests in flight"""
+        try:
+            while True:
+                nodes = await embed_queue.get()
+                if nodes is None:
+                    return
+
+                texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+                embeddings = await self._embed_with_retry(texts)
+                for node, embedding in zip(nodes, embeddings):
+                    node.embedding = embedding
+                await write_queue.put(nodes)
+        finally:
+            await write_queue.put(None)
+
+    async def _write_nodes(self, write_queue: asyncio.Queue, vector_store: BasePydanticVectorStore, stats: IndexStats):
+        """Buffer embedded nodes and add them to the vector store in store_batch_size writes"""
+        buffer = []
+        running_workers = settings.embed_concurrency
+
+        while running_workers:
+            nodes = await write_queue.get()
+            if nodes is None:
+                running_workers -= 1
+            else:
+                buffer.extend(nodes)
+
+            if buffer and (len(buffer) >= settings.store_batch_size or not running_workers):
+                await asyncio.to_thread(vector_store.add, buffer)
+                stats.nodes += len(buffer)
+                buffer = []
+
+    async def index_all_books(self, reindex: bool = False) -> Dict[str, VectorStoreIndex]:
+        """
+        Index all books from Supabase
+
+        Verses are fetched page by page and flow through
+        verse_to_document -> chunking -> embedding -> vector store while later
+        pages are still downloading, so memory use does not grow with the corpus.
+        Up to embed_concurrency embedding batches are in flight at once. With
+        COLLECTION_LAYOUT=language each language's collection is built in its
+        own pass over Supabase.
+
+        Args:
+            reindex: Drop the collections and embed everything from scratch.
+                Otherwise only verses whose content hash changed are re-embedded,
+                and verses that disappeared from Supabase are removed.
+
+        Returns:
+            Index per collection name
+        """
         console.print("\n[bold blue]Vedavoice RAG Indexer[/bold blue]\n")
 
         # Fetch all books
@@ -160,66 +526,162 @@ class VedavoiceIndexer:
         books = await self.fetch_books()
         console.print(f"[green]Found {len(books)} books[/green]\n")
 
-        all_documents: List[Document] = []
-
-        with Progress() as progress:
-            books_task = progress.add_task("[cyan]Processing books...", total=len(books))
-
-            for book in books:
-                book_title = book.get("title", book.get("slug", "Unknown"))
-                progress.update(books_task, description=f"[cyan]Processing: {book_title}")
-
-                # Fetch verses and chapters
-                verses = await self.fetch_verses_for_book(book["id"])
-                chapters = await self.fetch_chapters_for_book(book["id"])
-
-                if not verses:
-                    progress.advance(books_task)
-                    continue
-
-                # Convert verses to documents
-                for verse in verses:
-                    chapter = chapters.get(verse.get("chapter_id"), {})
-                    doc = self.verse_to_document(verse, book, chapter)
-                    all_documents.append(doc)
-
-                console.print(f"  [dim]├─ {book_title}: {len(verses)} verses[/dim]")
-                progress.advance(books_task)
+        indexes = {}
+        for language in index_languages():
+            index = await self._index_collection(books, language, reindex)
+            if index is not None:
+                indexes[collection_name(language)] = index
+
+        console.print(f"[green]Vector store saved to: {store_location()}[/green]")
+        return indexes
+
+    async def _index_collection(
+        self,
+        books: List[dict],
+        language: Optional[str],
+        reindex: bool,
+    ) -> Optional[VectorStoreIndex]:
+        """Stream the books into one collection: the mixed one, or a single language's"""
+        name = collection_name(language)
+        if language is not None:
+            console.print(f"[bold cyan]Collection {name}[/bold cyan]")
+
+        # Initialize the collection
+        chroma_collection = self._get_or_create_collection(name, fresh=reindex, language=language)
+        vector_store = wrap_collection(chroma_collection)
+
+        indexed_hashes = self._load_indexed_hashes(chroma_collection)
+        seen_ids: Set[str] = set()
+        stats = IndexStats()
 
-        console.print(f"\n[green]Total documents: {len(all_documents)}[/green]")
-
-        if not all_documents:
-            console.print("[red]No documents to index![/red]")
-            return
-
-        # Create vector store
-        console.print("\n[cyan]Creating vector embeddings...[/cyan]")
         console.print(f"[dim]Using embedding model: {settings.embedding_model}[/dim]")
         console.print(f"[dim]This may take a while for large collections...[/dim]\n")
 
-        # Initialize ChromaDB collection
-        chroma_collection = self._get_or_create_collection()
-        vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
-        storage_context = StorageContext.from_defaults(vector_store=vector_store)
+        # Bounded queues between stages provide back-pressure all the way to Supabase
+        doc_queue: asyncio.Queue = asyncio.Queue(maxsize=settings.index_queue_size)
+        embed_queue: asyncio.Queue = asyncio.Queue(maxsize=settings.embed_concurrency * 2)
+        write_queue: asyncio.Queue = asyncio.Queue(maxsize=settings.embed_concurrency * 2)
 
-        # Create index with chunking
-        node_parser = SentenceSplitter(
-            chunk_size=settings.chunk_size,
-            chunk_overlap=settings.chunk_overlap,
+        with Progress() as progress:
+            books_task = progress.add_task("[cyan]Processing books...", total=len(books))
+            tasks = [
+                asyncio.create_task(self._produce_documents(books, doc_queue, progress, books_task, language)),
+                asyncio.create_task(self._chunk_documents(
+                    doc_queue, embed_queue, chroma_collection, indexed_hashes, seen_ids, stats
+                )),
+                *(
+                    asyncio.create_task(self._embed_worker(embed_queue, write_queue))
+                    for _ in range(settings.embed_concurrency)
+                ),
+                asyncio.create_task(self._write_nodes(write_queue, vector_store, stats)),
+            ]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
+
+        console.print(f"\n[green]Total documents: {stats.total}[/green]")
+
+        if not stats.total:
+            console.print("[red]No documents to index![/red]")
+            return None
+
+        # Only reached when every book streamed successfully, so seen_ids is complete
+        deleted_ids = [verse_id for verse_id in indexed_hashes if verse_id not in seen_ids]
+        if deleted_ids:
+            self._delete_verses(chroma_collection, deleted_ids)
+        stats.deleted = len(deleted_ids)
+
+        # The local store keeps changes in memory and writes its files once
+        persist = getattr(chroma_collection, "persist", None)
+        if persist is not None:
+            persist()
+
+        console.print(
+            f"[green]Unchanged: {stats.total - stats.new - stats.changed}, "
+            f"new: {stats.new}, changed: {stats.changed}, deleted: {stats.deleted}, "
+            f"embedded chunks: {stats.nodes}[/green]"
         )
 
-        index = VectorStoreIndex.from_documents(
-            all_documents,
-            storage_context=storage_context,
+        if settings.hybrid_enabled:
+            console.print("[cyan]Building lexical (BM25) index...[/cyan]")
+            lexical_index = LexicalIndex.from_collection(chroma_collection)
+            lexical_path = lexical_index_path(language)
+            lexical_index.save(lexical_path, chroma_collection.count())
+            console.print(f"[dim]Lexical index: {len(lexical_index)} chunks -> {lexical_path}[/dim]")
+
+        console.print(f"\n[bold green]Indexing of {name} complete![/bold green]\n")
+
+        return VectorStoreIndex.from_vector_store(
+            vector_store=vector_store,
             embed_model=self.embed_model,
-            transformations=[node_parser],
-            show_progress=True,
         )
 
-        console.print(f"\n[bold green]Indexing complete![/bold green]")
-        console.print(f"[green]Vector store saved to: {settings.chroma_persist_dir}[/green]")
 
-        return index
+def compact_index(dtype: str, subvectors: Optional[int], rescore: bool, source_backend: str):
+    """
+    Write the index as a quantized local store
+
+    Reads every vector from the Chroma store (or the local store) and writes
+    LOCAL_STORE_DIR/<collection> with int8 or product-quantized vectors, for
+    every collection of the configured layout.
+    With rescore, full-precision vectors are kept on disk to re-score the top
+    candidates of each search.
+    """
+    if source_backend == "local":
+        source_client = LocalClient(settings.local_store_dir)
+        source_dir = settings.local_store_dir
+    else:
+        import chromadb
+        source_client = chromadb.PersistentClient(path=settings.chroma_persist_dir)
+        source_dir = settings.chroma_persist_dir
+
+    source_size = directory_size(source_dir)
+    target_size = 0
+    os.makedirs(settings.local_store_dir, exist_ok=True)
+    for language in index_languages():
+        name = collection_name(language)
+        source = source_client.get_collection(name)
+        if isinstance(source, LocalCollection) and source.dtype in ("int8", "pq") and not source.keep_full:
+            console.print("[yellow]Source vectors are already quantized; compacting them again loses more precision[/yellow]")
+
+        console.print(f"[cyan]Compacting {source.count()} chunks of {name} from {source_dir} to {dtype}...[/cyan]")
+        target_path = os.path.join(settings.local_store_dir, name)
+        compact_collection(source, target_path, dtype, subvectors=subvectors, keep_full=rescore)
+        target_size += directory_size(target_path)
+
+    console.print(
+        f"[green]{source_size / 2**20:.1f} MB -> {target_size / 2**20:.1f} MB "
+        f"({source_size / max(target_size, 1):.1f}x smaller)[/green]"
+    )
+    console.print("[dim]Serve it with VECTOR_STORE_BACKEND=local "
+                  f"LOCAL_STORE_DTYPE={dtype} LOCAL_STORE_RESCORE={str(rescore).lower()}[/dim]")
+
+
+def export_index(path: str, dtype: str, subvectors: Optional[int], rescore: bool):
+    """Pack the index into a snapshot archive for `indexer.py import` on other servers"""
+    console.print(f"[cyan]Exporting {store_location()} as a {dtype} snapshot...[/cyan]")
+    manifest = export_snapshot(path, dtype, subvectors=subvectors, keep_full=rescore)
+    chunks = sum(entry["count"] for entry in manifest["collections"])
+    console.print(
+        f"[green]Snapshot {manifest['id']}: {len(manifest['collections'])} collections, {chunks} chunks, "
+        f"{os.path.getsize(path) / 2**20:.1f} MB -> {path}[/green]"
+    )
+
+
+def import_index(path: str, force: bool):
+    """Verify and install a snapshot archive; running servers switch to it"""
+    console.print(f"[cyan]Importing snapshot {path}...[/cyan]")
+    try:
+        manifest = import_snapshot(path, force=force)
+    except SnapshotError as e:
+        console.print(f"[red]Import failed: {e}[/red]")
+        sys.exit(1)
+    console.print(f"[green]Snapshot {manifest['id']} installed and set as current in {settings.snapshot_dir}[/green]")
+    console.print(f"[dim]Built with {manifest['embedding_model']} / {manifest['chunking']}, "
+                  f"layout {manifest['collection_layout']}, {manifest['dtype']} vectors[/dim]")
 
 
 async def main():
@@ -227,9 +689,30 @@ async def main():
     import argparse
 
     parser = argparse.ArgumentParser(description="Index Vedavoice books for RAG")
+    parser.add_argument(
+        "command", nargs="?", default="index", choices=["index", "compact", "export", "import"],
+        help="index: embed books from Supabase; compact: write a quantized local store; "
+             "export/import: write or install an index snapshot",
+    )
+    parser.add_argument("path", nargs="?", default="index.snapshot.tar", help="Snapshot archive for export/import")
     parser.add_argument("--fresh", action="store_true", help="Delete existing index and create fresh")
+    parser.add_argument("--dtype", default="int8", choices=["int8", "pq", "float16", "float32"], help="Compaction / snapshot encoding")
+    parser.add_argument("--subvectors", type=int, help="PQ bytes per vector (default LOCAL_STORE_PQ_SUBVECTORS)")
+    parser.add_argument("--rescore", action="store_true", help="Keep full-precision vectors for re-scoring")
+    parser.add_argument("--source", default="chroma", choices=["chroma", "local"], help="Store to compact")
+    parser.add_argument("--force", action="store_true", help="Import a snapshot built with another embedding model")
     args = parser.parse_args()
 
+    if args.command == "compact":
+        compact_index(args.dtype, args.subvectors, args.rescore, args.source)
+        return
+    if args.command == "export":
+        export_index(args.path, args.dtype, args.subvectors, args.rescore)
+        return
+    if args.command == "import":
+        import_index(args.path, args.force)
+        return
+
     # Check if Supabase key is set
     if not settings.supabase_anon_key:
         console.print("[red]Error: SUPABASE_ANON_KEY not set![/red]")
@@ -0,0 +1,81 @@
+"""
+Language Routing - Per-language collections and routing of queries to them
+
+With COLLECTION_LAYOUT=language the indexer writes one collection per language
+(vedavoice_books_uk, vedavoice_books_en), each holding only that language's
+translations and purports. Queries are sent to the collection of the language
+they are written in, so a Ukrainian question searches the smaller Ukrainian
+index and an English question gets English purports. Books stay namespaces
+inside each collection, selected with the book_slug filter.
+"""
+import os
+import re
+from typing import Dict, List, Optional
+
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import NodeWithScore, QueryBundle
+
+from config import settings
+from search_filters import LANGUAGES
+
+LAYOUTS = ("single", "language")
+
+# Language of queries with no letters to go by, e.g. "2.14"
+DEFAULT_LANGUAGE = "uk"
+
+_WORD_RE = re.compile(r"[^\W\d_]+")
+_CYRILLIC_RE = re.compile(r"[\u0400-\u04ff]")
+
+
+def index_languages() -> List[Optional[str]]:
+    """Languages with their own collection; [None] for the single mixed collection"""
+    if settings.collection_layout not in LAYOUTS:
+        raise ValueError(f"Unsupported collection layout: {settings.collection_layout}")
+    if settings.collection_layout == "language":
+        return list(LANGUAGES)
+    return [None]
+
+
+def collection_name(language: Optional[str]) -> str:
+    return f"{settings.collection_name}_{language}" if language else settings.collection_name
+
+
+def lexical_index_path(language: Optional[str]) -> str:
+    """BM25 index file of a collection, e.g. lexical_index_uk.npz"""
+    if not language:
+        return settings.lexical_index_path
+    root, extension = os.path.splitext(settings.lexical_index_path)
+    return f"{root}_{language}{extension}"
+
+
+def detect_language(text: str) -> str:
+    """
+    Guess the language of a query: "uk" or "en"
+
+    English questions are never written in Cyrillic, while Ukrainian ones often
+    quote Sanskrit terms in IAST, so a third of the words being Cyrillic is
+    enough to call a query Ukrainian.
+    """
+    words = _WORD_RE.findall(text)
+    if not words:
+        return DEFAULT_LANGUAGE
+    cyrillic = sum(1 for word in words if _CYRILLIC_RE.search(word))
+    return "uk" if cyrillic * 3 >= len(words) else "en"
+
+
+class LanguageRoutingRetriever(BaseRetriever):
+    """Sends each query to the retriever of the language it is written in"""
+
+    def __init__(self, retrievers: Dict[str, BaseRetriever]):
+        super().__init__()
+        self._retrievers = retrievers
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        return self._route(query_bundle).retrieve(query_bundle)
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        return await self._route(query_bundle).aretrieve(query_bundle)
+
+    def _route(self, query_bundle: QueryBundle) -> BaseRetriever:
+        language = detect_language(query_bundle.query_str)
+        return self._retrievers.get(language) or next(iter(self._retrievers.values()))
@@ -0,0 +1,615 @@
+"""
+Local Vector Store - Memory-mapped NumPy alternative to Chroma
+
+Vectors are L2-normalized and stored as one int8 (per-row scales), float16,
+float32 or product-quantized matrix that is memory-mapped at startup, so
+opening the store costs milliseconds. Search is a brute-force cosine scan over
+the whole matrix, which for a corpus of tens of thousands of chunks is as fast
+as HNSW and never misses a neighbour. Stores can optionally keep the
+full-precision vectors on disk to re-score the best candidates exactly.
+
+LocalCollection mirrors the subset of the Chroma collection API the rest of
+local-llm uses (get / delete / count / query / metadata), so the lexical index,
+verse lookup and parent-child retrieval work with either backend.
+"""
+import functools
+import json
+import os
+import shutil
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode, MetadataMode
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    FilterCondition,
+    FilterOperator,
+    MetadataFilters,
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+from llama_index.core.vector_stores.utils import metadata_dict_to_node, node_to_metadata_dict
+
+from config import settings
+from quantization import normalize, pq_decode, pq_encode, pq_scores, pq_tables, scalar_quantize, train_product_quantizer
+
+# Bumped whenever the on-disk layout changes
+LOCAL_STORE_VERSION = 3
+
+DTYPES = ("float32", "float16", "int8", "pq")
+
+# Rows scored per block, bounding the float32 working copy of the matrix
+_SEARCH_BLOCK_ROWS = 4096
+
+# Filters selecting less than this share of rows (e.g. one book) score only those rows
+_SUBSET_SCAN_FRACTION = 0.5
+
+_COLLECTION_FILE = "collection.json"
+_VECTORS_FILE = "vectors.npy"
+_SCALES_FILE = "scales.npy"
+_CODEBOOKS_FILE = "codebooks.npy"
+_FULL_VECTORS_FILE = "full_vectors.npy"
+# One JSON object per line; like the .npy files, nothing in a store is executable on load
+_RECORDS_FILE = "records.jsonl"
+
+# Page size for reading a collection during compaction
+_COMPACT_PAGE_SIZE = 1000
+
+
+def _locked(method):
+    """Run a LocalCollection method under the collection's lock"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _filter_matches(metadata: Dict[str, Any], filters: MetadataFilters) -> bool:
+    """Evaluate LlamaIndex MetadataFilters against one metadata dict"""
+    results = []
+    for item in filters.filters:
+        if isinstance(item, MetadataFilters):
+            results.append(_filter_matches(metadata, item))
+            continue
+        value = metadata.get(item.key)
+        operator = item.operator
+        if operator == FilterOperator.EQ:
+            results.append(value == item.value)
+        elif operator == FilterOperator.NE:
+            results.append(value != item.value)
+        elif operator == FilterOperator.IN:
+            results.append(value in item.value)
+        elif operator == FilterOperator.NIN:
+            results.append(value not in item.value)
+        elif operator in (FilterOperator.GT, FilterOperator.GTE, FilterOperator.LT, FilterOperator.LTE):
+            if value is None:
+                results.append(False)
+            elif operator == FilterOperator.GT:
+                results.append(value > item.value)
+            elif operator == FilterOperator.GTE:
+                results.append(value >= item.value)
+            elif operator == FilterOperator.LT:
+                results.append(value < item.value)
+            else:
+                results.append(value <= item.value)
+        else:
+            raise ValueError(f"Unsupported filter operator for the local vector store: {operator}")
+
+    if filters.condition == FilterCondition.OR:
+        return any(results)
+    return all(results)
+
+
+def _where_matches(metadata: Dict[str, Any], where: Dict[str, Any]) -> bool:
+    """Evaluate a Chroma-style `where` clause ($and, $or, $eq, $ne, $in, $nin)"""
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(_where_matches(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(_where_matches(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for operator, operand in condition.items():
+                if operator == "$eq" and value != operand:
+                    return False
+                if operator == "$ne" and value == operand:
+                    return False
+                if operator == "$in" and value not in operand:
+                    return False
+                if operator == "$nin" and value in operand:
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+class LocalCollection:
+    """
+    Vectors, documents and metadata of one collection
+
+    Writes accumulate in memory and reach disk on persist(), which rewrites the
+    files atomically; readers memory-map the vector matrix. A "pq" collection
+    without codebooks trains them on the vectors of its first persist().
+    """
+
+    def __init__(
+        self,
+        path: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        dtype: str = "int8",
+        codebooks: Optional[np.ndarray] = None,
+        keep_full: bool = False,
+    ):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported local store dtype: {dtype}")
+        self.path = path
+        self.metadata = metadata or {}
+        self.dtype = dtype
+        self.keep_full = keep_full
+        self._codebooks = codebooks
+        self._full: Optional[np.ndarray] = None
+        self.ids: List[str] = []
+        self.documents: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self._vectors: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._alive = np.zeros(0, dtype=bool)
+        self._positions: Dict[str, int] = {}
+        self._pending: List[List[float]] = []
+        self._mask_cache: Dict[str, np.ndarray] = {}
+        # The indexer deletes on the event loop while adds run in a worker thread;
+        # every read and write of the rows goes through this lock
+        self.lock = threading.RLock()
+
+    @classmethod
+    def load(cls, path: str) -> "LocalCollection":
+        """Open a persisted collection, memory-mapping its vectors"""
+        with open(os.path.join(path, _COLLECTION_FILE), encoding="utf-8") as f:
+            info = json.load(f)
+        if info.get("version") != LOCAL_STORE_VERSION:
+            raise ValueError(f"Local store at {path} has version {info.get('version')}, expected {LOCAL_STORE_VERSION}")
+
+        collection = cls(path, info.get("metadata"), info["dtype"], keep_full=info.get("full_vectors", False))
+        collection._read()
+        return collection
+
+    def _read(self):
+        self.ids, self.documents, self.metadatas = [], [], []
+        with open(os.path.join(self.path, _RECORDS_FILE), encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                self.ids.append(record["id"])
+                self.documents.append(record["document"])
+                self.metadatas.append(record["metadata"])
+        self._positions = {node_id: i for i, node_id in enumerate(self.ids)}
+        self._alive = np.ones(len(self.ids), dtype=bool)
+        self._vectors = self._scales = self._full = None
+        self._pending = []
+        self._mask_cache.clear()
+        if self.dtype == "pq" and os.path.exists(os.path.join(self.path, _CODEBOOKS_FILE)):
+            self._codebooks = np.load(os.path.join(self.path, _CODEBOOKS_FILE))
+        if self.ids:
+            self._vectors = np.load(os.path.join(self.path, _VECTORS_FILE), mmap_mode="r")
+            if self.dtype == "int8":
+                self._scales = np.load(os.path.join(self.path, _SCALES_FILE))
+            if self.keep_full:
+                self._full = np.load(os.path.join(self.path, _FULL_VECTORS_FILE), mmap_mode="r")
+
+    @property
+    def dimensions(self) -> int:
+        if self._full is not None:
+            return int(self._full.shape[1])
+        if self._codebooks is not None:
+            return int(self._codebooks.shape[0] * self._codebooks.shape[2])
+        return int(self._vectors.shape[1]) if self._vectors is not None else 0
+
+    # -- Chroma-compatible API -------------------------------------------------
+
+    @_locked
+    def count(self) -> int:
+        return int(self._alive.sum())
+
+    @_locked
+    def add(self, ids: List[str], embeddings: List[List[float]], metadatas: List[Dict[str, Any]], documents: List[str]):
+        """Insert or replace entries"""
+        self._alive = np.concatenate([self._alive, np.ones(len(ids), dtype=bool)])
+        for node_id, embedding, metadata, document in zip(ids, embeddings, metadatas, documents):
+            previous = self._positions.get(node_id)
+            if previous is not None:
+                self._alive[previous] = False
+            self._positions[node_id] = len(self.ids)
+            self.ids.append(node_id)
+            self.documents.append(document)
+            self.metadatas.append(metadata)
+            self._pending.append(embedding)
+        self._mask_cache.clear()
+
+    @_locked
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None):
+        """Delete entries by id and/or `where` clause"""
+        for position in self._select(ids, where):
+            self._alive[position] = False
+            self._positions.pop(self.ids[position], None)
+        self._mask_cache.clear()
+
+    @_locked
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        where: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        include: Optional[List[str]] = None,
+    ) -> Dict[str, List]:
+        """Return ids, documents and metadatas of matching entries (in the order of ids, if given)"""
+        positions = self._select(ids, where)
+        if ids is None:
+            positions = positions[offset:offset + limit if limit is not None else None]
+        result = {
+            "ids": [self.ids[i] for i in positions],
+            "documents": [self.documents[i] for i in positions],
+            "metadatas": [self.metadatas[i] for i in positions],
+        }
+        if include and "embeddings" in include:
+            result["embeddings"] = self.vectors(positions)
+        return result
+
+    @_locked
+    def query(
+        self,
+        query_embeddings: List[List[float]],
+        n_results: int = 10,
+        where: Optional[Dict[str, Any]] = None,
+        include: Optional[List[str]] = None,
+    ) -> Dict[str, List]:
+        """Chroma-style nearest neighbours; distances are cosine distances"""
+        mask = None
+        if where:
+            mask = np.zeros(len(self.ids), dtype=bool)
+            mask[self._select(None, where)] = True
+        result = {"ids": [], "distances": [], "documents": [], "metadatas": []}
+        for embedding in query_embeddings:
+            positions, scores = self.search(embedding, n_results, mask)
+            result["ids"].append([self.ids[i] for i in positions])
+            result["distances"].append([1.0 - float(s) for s in scores])
+            result["documents"].append([self.documents[i] for i in positions])
+            result["metadatas"].append([self.metadatas[i] for i in positions])
+        return result
+
+    # -- Search ----------------------------------------------------------------
+
+    def _select(self, ids: Optional[List[str]], where: Optional[Dict[str, Any]]) -> List[int]:
+        if ids is not None:
+            positions = [self._positions[node_id] for node_id in ids if node_id in self._positions]
+        else:
+            positions = np.flatnonzero(self._alive).tolist()
+        if where:
+            positions = [i for i in positions if _where_matches(self.metadatas[i], where)]
+        return positions
+
+    def _encode(self, vectors: np.ndarray):
+        """Encode normalized vectors; returns (matrix, per-row scales or None)"""
+        if self.dtype == "int8":
+            return scalar_quantize(vectors)
+        if self.dtype == "pq":
+            if self._codebooks is None:
+                self._codebooks = train_product_quantizer(vectors, settings.local_store_pq_subvectors)
+            return pq_encode(vectors, self._codebooks), None
+        return vectors.astype(self.dtype), None
+
+    def _flush_pending(self):
+        """Encode vectors added since the last flush into the matrix"""
+        if not self._pending:
+            return
+        vectors = normalize(np.asarray(self._pending, dtype=np.float32))
+        encoded, scales = self._encode(vectors)
+        self._pending = []
+        if self._vectors is None:
+            self._vectors, self._scales = encoded, scales
+            self._full = vectors if self.keep_full else None
+        else:
+            self._vectors = np.concatenate([self._vectors, encoded])
+            if scales is not None:
+                self._scales = np.concatenate([self._scales, scales])
+            if self.keep_full:
+                self._full = np.concatenate([self._full, vectors])
+
+    @_locked
+    def vectors(self, positions: List[int]) -> np.ndarray:
+        """Normalized vectors for rows; exact if full precision is kept, decoded otherwise"""
+        self._flush_pending()
+        if not positions:
+            return np.zeros((0, self.dimensions), dtype=np.float32)
+        if self._full is not None:
+            return np.asarray(self._full[positions], dtype=np.float32)
+        encoded = np.asarray(self._vectors[positions])
+        if self.dtype == "pq":
+            return pq_decode(encoded, self._codebooks)
+        vectors = encoded.astype(np.float32)
+        if self._scales is not None:
+            vectors *= self._scales[positions][:, None]
+        return vectors
+
+    def _approximate_scores(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Inner products of the query with every encoded row, or with the given rows only"""
+        tables = pq_tables(self._codebooks, query) if self.dtype == "pq" else None
+        count = len(self._vectors) if rows is None else len(rows)
+        scores = np.empty(count, dtype=np.float32)
+        for start in range(0, count, _SEARCH_BLOCK_ROWS):
+            if rows is None:
+                block = np.asarray(self._vectors[start:start + _SEARCH_BLOCK_ROWS])
+            else:
+                block = np.asarray(self._vectors[rows[start:start + _SEARCH_BLOCK_ROWS]])
+            if tables is not None:
+                scores[start:start + len(block)] = pq_scores(block, tables)
+            else:
+                scores[start:start + len(block)] = block.astype(np.float32, copy=False) @ query
+        if self._scales is not None:
+            scores *= self._scales if rows is None else self._scales[rows]
+        return scores
+
+    @_locked
+    def filter_mask(self, filters: Optional[MetadataFilters]) -> Optional[np.ndarray]:
+        """Boolean row mask for LlamaIndex filters, cached until the next write"""
+        if filters is None or not filters.filters:
+            return None
+        key = filters.model_dump_json()
+        mask = self._mask_cache.get(key)
+        if mask is None:
+            mask = np.fromiter(
+                (alive and _filter_matches(metadata, filters) for alive, metadata in zip(self._alive, self.metadatas)),
+                dtype=bool,
+                count=len(self.metadatas),
+            )
+            self._mask_cache[key] = mask
+        return mask
+
+    @_locked
+    def search(self, embedding: List[float], top_k: int, mask: Optional[np.ndarray] = None):
+        """Cosine search; returns (row positions, similarities), best first"""
+        self._flush_pending()
+        if self._vectors is None or top_k <= 0:
+            return [], []
+
+        query = normalize(np.asarray(embedding, dtype=np.float32)[None, :])[0]
+        allowed = self._alive if mask is None else (self._alive & mask)
+        candidates = int(allowed.sum())
+        if not candidates:
+            return [], []
+
+        if candidates < len(allowed) * _SUBSET_SCAN_FRACTION:
+            # A small namespace such as one book: read and score only its rows
+            rows = np.flatnonzero(allowed)
+            scores = np.full(len(allowed), -np.inf, dtype=np.float32)
+            scores[rows] = self._approximate_scores(query, rows)
+        else:
+            scores = self._approximate_scores(query)
+            scores[~allowed] = -np.inf
+
+        # With full-precision vectors kept, over-fetch and re-score exactly
+        rescore = self._full is not None and self.dtype in ("int8", "pq")
+        fetch_k = min(top_k * settings.local_store_rescore_factor if rescore else top_k, candidates)
+        best = np.argpartition(-scores, fetch_k - 1)[:fetch_k]
+        if rescore:
+            best = np.sort(best)
+            scores = np.full(len(scores), -np.inf, dtype=np.float32)
+            scores[best] = np.asarray(self._full[best], dtype=np.float32) @ query
+
+        top_k = min(top_k, fetch_k)
+        best = best[np.argsort(-scores[best])[:top_k]]
+        return best.tolist(), scores[best].tolist()
+
+    # -- Persistence -----------------------------------------------------------
+
+    @_locked
+    def persist(self):
+        """Write live entries to disk atomically and re-open the vectors memory-mapped"""
+        self._flush_pending()
+        live = np.flatnonzero(self._alive)
+        tmp_path = f"{self.path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        if self._codebooks is not None:
+            np.save(os.path.join(tmp_path, _CODEBOOKS_FILE), self._codebooks)
+        if len(live):
+            np.save(os.path.join(tmp_path, _VECTORS_FILE), np.ascontiguousarray(self._vectors[live]))
+            if self._scales is not None:
+                np.save(os.path.join(tmp_path, _SCALES_FILE), self._scales[live])
+            if self._full is not None:
+                np.save(os.path.join(tmp_path, _FULL_VECTORS_FILE), np.ascontiguousarray(self._full[live]))
+        with open(os.path.join(tmp_path, _RECORDS_FILE), "w", encoding="utf-8") as f:
+            for i in live:
+                record = {"id": self.ids[i], "document": self.documents[i], "metadata": self.metadatas[i]}
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        with open(os.path.join(tmp_path, _COLLECTION_FILE), "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": LOCAL_STORE_VERSION,
+                    "dtype": self.dtype,
+                    "dimensions": self.dimensions,
+                    "full_vectors": self.keep_full,
+                    "count": int(len(live)),
+                    "metadata": self.metadata,
+                },
+                f,
+                ensure_ascii=False,
+            )
+
+        # Swap directories so readers never see a half-written store
+        old_path = f"{self.path}.old"
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(self.path):
+            os.replace(self.path, old_path)
+        os.replace(tmp_path, self.path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+        self._read()
+
+
+class LocalClient:
+    """Chroma-client-like access to the collections under one directory"""
+
+    def __init__(self, path: str, dtype: str = "int8", keep_full: bool = False):
+        self.path = path
+        self.dtype = dtype
+        self.keep_full = keep_full
+
+    def _collection_path(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def get_collection(self, name: str) -> LocalCollection:
+        path = self._collection_path(name)
+        if not os.path.exists(os.path.join(path, _COLLECTION_FILE)):
+            raise ValueError(f"Collection {name} does not exist in {self.path}")
+        return LocalCollection.load(path)
+
+    def create_collection(self, name: str, metadata: Optional[Dict[str, Any]] = None) -> LocalCollection:
+        path = self._collection_path(name)
+        if os.path.exists(path):
+            raise ValueError(f"Collection {name} already exists in {self.path}")
+        os.makedirs(self.path, exist_ok=True)
+        collection = LocalCollection(path, metadata, self.dtype, keep_full=self.keep_full)
+        collection.persist()
+        return collection
+
+    def delete_collection(self, name: str):
+        path = self._collection_path(name)
+        if not os.path.exists(path):
+            raise ValueError(f"Collection {name} does not exist in {self.path}")
+        shutil.rmtree(path)
+
+
+class LocalVectorStore(BasePydanticVectorStore):
+    """LlamaIndex vector store over a LocalCollection"""
+
+    stores_text: bool = True
+    flat_metadata: bool = True
+
+    _collection: LocalCollection = PrivateAttr()
+
+    def __init__(self, collection: LocalCollection, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._collection = collection
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LocalVectorStore"
+
+    @property
+    def client(self) -> LocalCollection:
+        return self._collection
+
+    def add(self, nodes: List[BaseNode], **add_kwargs: Any) -> List[str]:
+        ids = [node.node_id for node in nodes]
+        self._collection.add(
+            ids=ids,
+            embeddings=[node.get_embedding() for node in nodes],
+            metadatas=[node_to_metadata_dict(node, remove_text=True, flat_metadata=True) for node in nodes],
+            documents=[node.get_content(metadata_mode=MetadataMode.NONE) for node in nodes],
+        )
+        return ids
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        self._collection.delete(where={"document_id": ref_doc_id})
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        # Positions are only valid until the next write
+        with self._collection.lock:
+            mask = self._collection.filter_mask(query.filters)
+            positions, scores = self._collection.search(query.query_embedding, query.similarity_top_k, mask)
+
+            nodes = []
+            for position in positions:
+                # Same reconstruction ChromaVectorStore.query uses
+                node = metadata_dict_to_node(self._collection.metadatas[position])
+                node.set_content(self._collection.documents[position])
+                nodes.append(node)
+            ids = [self._collection.ids[position] for position in positions]
+        return VectorStoreQueryResult(nodes=nodes, similarities=scores, ids=ids)
+
+
+def directory_size(path: str) -> int:
+    """Total size in bytes of the files under path"""
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+def compact_collection(
+    source,
+    path: str,
+    dtype: str,
+    subvectors: Optional[int] = None,
+    keep_full: bool = False,
+) -> LocalCollection:
+    """
+    Copy a Chroma or local collection into a quantized local collection
+
+    Args:
+        source: Collection to read (vectors, documents and metadata)
+        path: Directory of the new collection; replaced atomically if it exists
+        dtype: "int8", "pq", "float16" or "float32"
+        subvectors: PQ subspaces (bytes per vector); defaults to LOCAL_STORE_PQ_SUBVECTORS
+        keep_full: Also store full-precision vectors for re-scoring the top candidates
+
+    Returns:
+        The persisted collection
+    """
+    ids: List[str] = []
+    documents: List[str] = []
+    metadatas: List[Dict[str, Any]] = []
+    embeddings: List[np.ndarray] = []
+    offset = 0
+    while True:
+        page = source.get(
+            include=["embeddings", "documents", "metadatas"],
+            limit=_COMPACT_PAGE_SIZE,
+            offset=offset,
+        )
+        ids.extend(page["ids"])
+        documents.extend(page["documents"])
+        metadatas.extend(page["metadatas"])
+        if len(page["ids"]):
+            embeddings.append(np.asarray(page["embeddings"], dtype=np.float32))
+        if len(page["ids"]) < _COMPACT_PAGE_SIZE:
+            break
+        offset += _COMPACT_PAGE_SIZE
+
+    vectors = normalize(np.concatenate(embeddings)) if embeddings else np.zeros((0, 0), dtype=np.float32)
+    codebooks = None
+    if dtype == "pq" and len(vectors):
+        codebooks = train_product_quantizer(vectors, subvectors or settings.local_store_pq_subvectors)
+
+    target = LocalCollection(path, dict(source.metadata or {}), dtype, codebooks=codebooks, keep_full=keep_full)
+    target.add(ids, list(vectors), metadatas, documents)
+    target.persist()
+    return target
+
+
+def open_vector_client():
+    """Client for the configured backend: chromadb.PersistentClient or LocalClient"""
+    if settings.vector_store_backend == "local":
+        return LocalClient(settings.local_store_dir, settings.local_store_dtype, settings.local_store_rescore)
+    # Imported lazily so the local backend runs without Chroma installed
+    import chromadb
+    return chromadb.PersistentClient(path=settings.chroma_persist_dir)
+
+
+def wrap_collection(collection) -> BasePydanticVectorStore:
+    """LlamaIndex vector store for a collection from open_vector_client()"""
+    if isinstance(collection, LocalCollection):
+        return LocalVectorStore(collection)
+    from llama_index.vector_stores.chroma import ChromaVectorStore
+    return ChromaVectorStore(chroma_collection=collection)
+
+
+def store_location() -> str:
+    """Directory holding the configured backend's data"""
+    return settings.local_store_dir if settings.vector_store_backend == "local" else settings.chroma_persist_dir
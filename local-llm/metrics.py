@@ -0,0 +1,139 @@
+"""
+Metrics - Prometheus histograms and counters for the RAG pipeline
+
+Exposed by the server on /metrics in the Prometheus text format.
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, List, Optional
+
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import NodeWithScore, QueryBundle
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+
+# Stage latencies span sub-millisecond cache hits to multi-second cold calls
+_STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_REQUEST_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+_RATE_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 40, 60, 80, 120)
+
+EMBED_SECONDS = Histogram(
+    "vedavoice_embed_seconds", "Query embedding time", buckets=_STAGE_BUCKETS
+)
+RETRIEVAL_SECONDS = Histogram(
+    "vedavoice_retrieval_seconds", "Retrieval time, including embedding, fusion and rerank", buckets=_STAGE_BUCKETS
+)
+RERANK_SECONDS = Histogram(
+    "vedavoice_rerank_seconds", "Reranking time", buckets=_STAGE_BUCKETS
+)
+TIME_TO_FIRST_TOKEN_SECONDS = Histogram(
+    "vedavoice_time_to_first_token_seconds", "Time from request to the first generated token",
+    ["endpoint"], buckets=_REQUEST_BUCKETS,
+)
+TOKENS_PER_SECOND = Histogram(
+    "vedavoice_tokens_per_second", "Generation speed after the first token (stream chunks per second)",
+    ["endpoint"], buckets=_RATE_BUCKETS,
+)
+REQUEST_SECONDS = Histogram(
+    "vedavoice_request_seconds", "Total request latency", ["endpoint"], buckets=_REQUEST_BUCKETS
+)
+CACHE_HITS = Counter("vedavoice_cache_hits_total", "Cache hits", ["cache"])
+CACHE_MISSES = Counter("vedavoice_cache_misses_total", "Cache misses", ["cache"])
+ERRORS = Counter("vedavoice_errors_total", "Failed requests", ["endpoint"])
+REJECTED = Counter("vedavoice_rejected_total", "Requests rejected with 429 because the queue was full", ["endpoint"])
+
+
+def render_metrics():
+    """Return (body, content type) for the /metrics endpoint"""
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+class GenerationTimer:
+    """Records time to first token and generation speed for one answer"""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.first_token_at = None
+        self.tokens = 0
+
+    def token(self):
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+            TIME_TO_FIRST_TOKEN_SECONDS.labels(self.endpoint).observe(self.first_token_at - self.started)
+        self.tokens += 1
+
+    def finish(self):
+        if self.first_token_at is None or self.tokens < 2:
+            return
+        elapsed = time.perf_counter() - self.first_token_at
+        if elapsed > 0:
+            TOKENS_PER_SECOND.labels(self.endpoint).observe((self.tokens - 1) / elapsed)
+
+
+class TimedRetriever(BaseRetriever):
+    """Observes the wrapped retriever's latency in a histogram"""
+
+    def __init__(self, retriever: BaseRetriever, histogram: Histogram):
+        super().__init__()
+        self._retriever = retriever
+        self._histogram = histogram
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        with self._histogram.time():
+            return self._retriever.retrieve(query_bundle)
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        with self._histogram.time():
+            return await self._retriever.aretrieve(query_bundle)
+
+
+class QueryEmbeddingRetriever(BaseRetriever):
+    """
+    Embeds the query before vector search so embedding time is measured on its own
+
+    The vector retriever skips embedding when the bundle already carries one.
+    Single-string queries go through embed_query when given (e.g. a batcher),
+    or aembed_query on the async path.
+    """
+
+    def __init__(
+        self,
+        retriever: BaseRetriever,
+        embed_model,
+        embed_query: Optional[Callable[[str], List[float]]] = None,
+        aembed_query: Optional[Callable[[str], Awaitable[List[float]]]] = None,
+    ):
+        super().__init__()
+        self._retriever = retriever
+        self._embed_model = embed_model
+        self._embed_query = embed_query
+        self._aembed_query = aembed_query
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        if query_bundle.embedding is None:
+            with EMBED_SECONDS.time():
+                if self._embed_query is not None and len(query_bundle.embedding_strs) == 1:
+                    query_bundle.embedding = self._embed_query(query_bundle.embedding_strs[0])
+                else:
+                    query_bundle.embedding = self._embed_model.get_agg_embedding_from_queries(
+                        query_bundle.embedding_strs
+                    )
+        return self._retriever.retrieve(query_bundle)
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        if query_bundle.embedding is None:
+            with EMBED_SECONDS.time():
+                single = len(query_bundle.embedding_strs) == 1
+                if self._aembed_query is not None and single:
+                    query_bundle.embedding = await self._aembed_query(query_bundle.embedding_strs[0])
+                elif self._embed_query is not None and single:
+                    query_bundle.embedding = await asyncio.to_thread(
+                        self._embed_query, query_bundle.embedding_strs[0]
+                    )
+                else:
+                    query_bundle.embedding = await self._embed_model.aget_agg_embedding_from_queries(
+                        query_bundle.embedding_strs
+                    )
+        # With the embedding set, only the vector-store query is left, and the
+        # store clients are synchronous
+        return await asyncio.to_thread(self._retriever.retrieve, query_bundle)
@@ -0,0 +1,114 @@
+"""
+Quantization - Scalar (int8) and product quantization of embedding vectors
+
+All functions take and return L2-normalized float32 vectors, so inner products
+of decoded vectors approximate cosine similarity.
+"""
+from typing import Tuple
+
+import numpy as np
+
+# Centroids per product-quantization subspace (one uint8 code each)
+PQ_CENTROIDS = 256
+
+# Rows encoded per step, bounding the distance matrix kept in memory
+_ENCODE_BLOCK_ROWS = 8192
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def scalar_quantize(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """int8 codes with one float32 scale per row"""
+    scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127.0
+    return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+
+def _subspaces(vectors: np.ndarray, subvectors: int) -> np.ndarray:
+    """Reshape (n, d) to (subvectors, n, d / subvectors)"""
+    count, dimensions = vectors.shape
+    if dimensions % subvectors:
+        raise ValueError(f"{dimensions} dimensions cannot be split into {subvectors} subvectors")
+    return vectors.reshape(count, subvectors, dimensions // subvectors).transpose(1, 0, 2)
+
+
+def _nearest(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the nearest centroid for each point, per subspace: shape (subvectors, n)"""
+    assignments = np.empty(points.shape[:2], dtype=np.int64)
+    for subspace in range(len(points)):
+        # ||x - c||^2 = ||x||^2 - 2 x.c + ||c||^2, and ||x||^2 does not change the argmin
+        distances = (centroids[subspace] ** 2).sum(axis=1)[None, :] - 2 * points[subspace] @ centroids[subspace].T
+        assignments[subspace] = distances.argmin(axis=1)
+    return assignments
+
+
+def train_product_quantizer(
+    vectors: np.ndarray,
+    subvectors: int,
+    iterations: int = 12,
+    sample_size: int = 16384,
+    seed: int = 0,
+) -> np.ndarray:
+    """
+    Train PQ codebooks with k-means in every subspace
+
+    Args:
+        vectors: Normalized training vectors, shape (n, d)
+        subvectors: Number of subspaces; each vector is stored as this many bytes
+        iterations: k-means iterations
+        sample_size: Vectors sampled for training
+
+    Returns:
+        Codebooks of shape (subvectors, 256, d / subvectors)
+    """
+    rng = np.random.default_rng(seed)
+    if len(vectors) > sample_size:
+        vectors = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+    points = _subspaces(np.asarray(vectors, dtype=np.float32), subvectors)
+
+    centroid_count = min(PQ_CENTROIDS, len(vectors))
+    initial = rng.choice(len(vectors), centroid_count, replace=False)
+    centroids = points[:, initial, :].copy()
+
+    for _ in range(iterations):
+        assignments = _nearest(points, centroids)
+        for subspace in range(subvectors):
+            sums = np.zeros_like(centroids[subspace])
+            np.add.at(sums, assignments[subspace], points[subspace])
+            counts = np.bincount(assignments[subspace], minlength=centroid_count)
+            filled = counts > 0
+            # Empty clusters keep their previous centroid
+            centroids[subspace, filled] = sums[filled] / counts[filled, None]
+
+    if centroid_count < PQ_CENTROIDS:
+        padding = np.repeat(centroids[:, :1, :], PQ_CENTROIDS - centroid_count, axis=1)
+        centroids = np.concatenate([centroids, padding], axis=1)
+    return centroids.astype(np.float32)
+
+
+def pq_encode(vectors: np.ndarray, codebooks: np.ndarray) -> np.ndarray:
+    """uint8 codes of shape (n, subvectors)"""
+    codes = np.empty((len(vectors), len(codebooks)), dtype=np.uint8)
+    for start in range(0, len(vectors), _ENCODE_BLOCK_ROWS):
+        block = _subspaces(np.asarray(vectors[start:start + _ENCODE_BLOCK_ROWS], dtype=np.float32), len(codebooks))
+        codes[start:start + _ENCODE_BLOCK_ROWS] = _nearest(block, codebooks).T
+    return codes
+
+
+def pq_decode(codes: np.ndarray, codebooks: np.ndarray) -> np.ndarray:
+    """Approximate vectors reconstructed from their codes"""
+    parts = codebooks[np.arange(len(codebooks))[None, :], codes]
+    return parts.reshape(len(codes), -1)
+
+
+def pq_scores(codes: np.ndarray, tables: np.ndarray) -> np.ndarray:
+    """Asymmetric inner products of a query (via its pq_tables) with PQ-coded vectors"""
+    return tables[np.arange(len(tables))[None, :], codes].sum(axis=1)
+
+
+def pq_tables(codebooks: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """Per-subspace inner products of the query with every centroid, shape (subvectors, 256)"""
+    return np.einsum("msd,md->ms", codebooks, query.reshape(len(codebooks), -1))
@@ -1,19 +1,38 @@
 """
 RAG Engine - Query engine for Vedavoice books
 """
-from typing import List, Optional, Generator
-from dataclasses import dataclass
+import asyncio
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import AsyncGenerator, Callable, Dict, Iterator, List, Optional, Generator, Tuple
+from dataclasses import dataclass, replace
 
 from llama_index.core import VectorStoreIndex, StorageContext, Settings as LlamaSettings
 from llama_index.core.chat_engine import CondensePlusContextChatEngine
 from llama_index.core.memory import ChatMemoryBuffer
 from llama_index.core.llms import ChatMessage, MessageRole
-from llama_index.vector_stores.chroma import ChromaVectorStore
 from llama_index.llms.ollama import Ollama
-from llama_index.embeddings.ollama import OllamaEmbedding
-import chromadb
 
 from config import settings
+from embedding_cache import build_embed_model
+from query_cache import TTLCache, normalize_query
+from verse_lookup import ReferenceAwareRetriever, VerseLookupIndex
+from hybrid_retriever import HybridRetriever, LexicalIndex, load_or_build_lexical_index
+from search_filters import SearchFilters
+from verse_nodes import ParentChildRetriever
+from reranker import BudgetedReranker, RerankingRetriever, build_scorer
+from context_packer import ContextPacker, build_tokenizer
+from scheduler import QueryEmbeddingBatcher
+from sanskrit_query import SanskritVariants
+from local_vector_store import LocalClient, open_vector_client, wrap_collection
+from snapshot import COLLECTIONS_DIR, load_manifest
+from language_routing import LanguageRoutingRetriever, collection_name, index_languages, lexical_index_path
+from metrics import (
+    CACHE_HITS, CACHE_MISSES, RETRIEVAL_SECONDS, GenerationTimer, QueryEmbeddingRetriever, TimedRetriever,
+)
 
 
 @dataclass
@@ -35,15 +54,98 @@ class RAGResponse:
     model: str
 
 
-class VedavoiceRAG:
-    """RAG engine for Vedavoice books"""
+class ChatEnginePool:
+    """
+    Thread-safe pool of chat engines
+
+    Engines share the retriever and LLM; each owns only its chat memory, which
+    is replaced with the caller's history on every request and cleared on release.
+    """
+
+    def __init__(self, factory: Callable[[], CondensePlusContextChatEngine], max_idle: int):
+        self._factory = factory
+        self._idle: queue.LifoQueue = queue.LifoQueue(maxsize=max_idle)
+
+    def acquire(self) -> CondensePlusContextChatEngine:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._factory()
+
+    def release(self, engine: CondensePlusContextChatEngine):
+        engine.reset()
+        try:
+            self._idle.put_nowait(engine)
+        except queue.Full:
+            pass
+
+    @contextmanager
+    def engine(self) -> Iterator[CondensePlusContextChatEngine]:
+        engine = self.acquire()
+        try:
+            yield engine
+        finally:
+            self.release(engine)
+
+
+class CollectionIndex:
+    """A vector collection with the lexical and verse indexes built over it"""
+
+    def __init__(self, collection, language: Optional[str], lexical_path: str):
+        self.collection = collection
+        self.language = language
 
-    def __init__(self):
-        self.llm = None
-        self.embed_model = None
-        self.index = None
-        self.chat_engine = None
+        vector_store = wrap_collection(collection)
+        storage_context = StorageContext.from_defaults(vector_store=vector_store)
+        self.index = VectorStoreIndex.from_vector_store(
+            vector_store=vector_store,
+            storage_context=storage_context,
+        )
+
+        # BM25 index over the same chunks, for exact terms dense retrieval misses
+        self.lexical_index: Optional[LexicalIndex] = None
+        if settings.hybrid_enabled:
+            self.lexical_index = load_or_build_lexical_index(collection, lexical_path)
+
+        # Spellings of Sanskrit words in every script, from the BM25 vocabulary
+        self.sanskrit_variants: Optional[SanskritVariants] = None
+        if self.lexical_index is not None and settings.sanskrit_expansion_enabled:
+            self.sanskrit_variants = SanskritVariants.from_lexical_index(self.lexical_index)
+
+        # Exact "БГ 2.14"-style lookups bypass vector search
+        self.verse_index: Optional[VerseLookupIndex] = None
+        if settings.verse_lookup_enabled:
+            self.verse_index = VerseLookupIndex.from_collection(collection)
+
+
+class VedavoiceRAG:
+    """
+    RAG engine for Vedavoice books
+
+    Serves the configured vector store, or an installed index snapshot when
+    snapshot_path is given. The LLM and embedding model default to Ollama;
+    others can be passed in, e.g. a mock LLM for offline benchmarks.
+    """
+
+    def __init__(self, snapshot_path: Optional[str] = None, llm=None, embed_model=None):
+        self.snapshot_path = snapshot_path
+        self.snapshot_id: Optional[str] = None
+        self.llm = llm
+        self.embed_model = embed_model
+        self.collections: Dict[Optional[str], CollectionIndex] = {}
+        self.retriever = None
+        self.reranker: Optional[BudgetedReranker] = None
+        self.context_packer: Optional[ContextPacker] = None
+        self.embed_batcher: Optional[QueryEmbeddingBatcher] = None
+        self._tokenizer: Optional[Callable[[str], List]] = None
+        self._retrievers: Dict[int, object] = {}
+        self._retrievers_lock = threading.Lock()
+        self._engine_pool: Optional[ChatEnginePool] = None
+        self.search_cache = TTLCache(settings.search_cache_size, settings.search_cache_ttl)
+        self.answer_cache = TTLCache(settings.answer_cache_size, settings.answer_cache_ttl)
         self._initialized = False
+        self.warmed_up = False
+        self.warmup_timings: Dict[str, float] = {}
 
     def initialize(self):
         """Initialize the RAG engine with models and index"""
@@ -51,77 +153,255 @@ class VedavoiceRAG:
             return
 
         # Initialize LLM
-        self.llm = Ollama(
-            model=settings.llm_model,
-            base_url=settings.ollama_base_url,
-            request_timeout=120.0,
-            temperature=0.7,
-        )
+        if self.llm is None:
+            self.llm = Ollama(
+                model=settings.llm_model,
+                base_url=settings.ollama_base_url,
+                request_timeout=120.0,
+                temperature=0.7,
+            )
 
-        # Initialize embedding model
-        self.embed_model = OllamaEmbedding(
-            model_name=settings.embedding_model,
-            base_url=settings.ollama_base_url,
+        # Initialize embedding model (repeated queries are served from the cache)
+        if self.embed_model is None:
+            self.embed_model = build_embed_model()
+
+        # Queries retrieved at the same moment share one embedding call
+        self.embed_batcher = QueryEmbeddingBatcher(
+            self._embed_queries,
+            settings.embed_batch_window_ms,
+            settings.embed_batch_size,
         )
 
         # Set global settings
         LlamaSettings.llm = self.llm
         LlamaSettings.embed_model = self.embed_model
 
-        # Load vector store
-        chroma_client = chromadb.PersistentClient(path=settings.chroma_persist_dir)
+        # Load the vector store: one mixed collection, or one per language
+        if self.snapshot_path:
+            # A snapshot lists its own collections and ships their BM25 indexes
+            manifest = load_manifest(self.snapshot_path)
+            self.snapshot_id = manifest["id"]
+            chroma_client = LocalClient(os.path.join(self.snapshot_path, COLLECTIONS_DIR))
+            layout = [
+                (entry["language"], entry["name"], os.path.join(self.snapshot_path, entry["lexical_index"]))
+                for entry in manifest["collections"]
+            ]
+        else:
+            chroma_client = open_vector_client()
+            layout = [
+                (language, collection_name(language), lexical_index_path(language))
+                for language in index_languages()
+            ]
+
+        for language, name, lexical_path in layout:
+            try:
+                chroma_collection = chroma_client.get_collection(name)
+            except Exception as e:
+                raise RuntimeError(
+                    f"Vector store not found. Please run indexer.py first.\n"
+                    f"Error: {e}"
+                )
+            self.collections[language] = CollectionIndex(chroma_collection, language, lexical_path)
+
+        # Optional CPU rerank of over-retrieved candidates
+        if settings.rerank_enabled:
+            self.reranker = BudgetedReranker(build_scorer(), settings.rerank_budget_ms)
+
+        # Retrieved text and chat history are both held to fixed token budgets
+        self._tokenizer = build_tokenizer()
+        self.context_packer = ContextPacker(settings.context_token_budget, self._tokenizer)
+
+        # Built once and shared by every request
+        self.retriever = self._get_retriever(settings.similarity_top_k)
+        self._engine_pool = ChatEnginePool(self._build_chat_engine, settings.chat_engine_pool_size)
 
-        try:
-            chroma_collection = chroma_client.get_collection(settings.collection_name)
-        except Exception as e:
-            raise RuntimeError(
-                f"Vector store not found. Please run indexer.py first.\n"
-                f"Error: {e}"
-            )
+        self._initialized = True
 
-        vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
-        storage_context = StorageContext.from_defaults(vector_store=vector_store)
+    def warm_up(self) -> Dict[str, float]:
+        """
+        Pay the cold-start costs before the first real request
 
-        # Create index from existing vector store
-        self.index = VectorStoreIndex.from_vector_store(
-            vector_store=vector_store,
-            storage_context=storage_context,
+        Loads the embedding and LLM models in Ollama and pulls the HNSW index
+        into memory. An injected non-Ollama LLM is not warmed. Returns the time
+        each step took, in milliseconds.
+        """
+        if not self._initialized:
+            self.initialize()
+
+        timings: Dict[str, float] = {}
+
+        # Bypass the embedding cache - the point is to make Ollama load the model
+        started = time.perf_counter()
+        embed_model = getattr(self.embed_model, "inner", self.embed_model)
+        embedding = embed_model.get_query_embedding("warm-up")
+        timings["embed_ms"] = (time.perf_counter() - started) * 1000
+
+        # Chroma loads the HNSW segment lazily on the first query; the local
+        # store pages in its memory-mapped matrix
+        started = time.perf_counter()
+        for collection_index in self.collections.values():
+            collection_index.collection.query(query_embeddings=[embedding], n_results=1)
+        timings["hnsw_ms"] = (time.perf_counter() - started) * 1000
+
+        # One generated token is enough to load the LLM weights. The copy keeps
+        # the engine's model options (num_ctx, keep_alive), so Ollama does not
+        # reload the model with different settings on the first real request
+        if isinstance(self.llm, Ollama):
+            started = time.perf_counter()
+            self.llm.model_copy(
+                update={"additional_kwargs": {**self.llm.additional_kwargs, "num_predict": 1}}
+            ).complete("Hi")
+            timings["generate_ms"] = (time.perf_counter() - started) * 1000
+
+        self.warmup_timings = timings
+        self.warmed_up = True
+        return timings
+
+    def _embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embed a batch of queries in one call to the embedding model"""
+        batch_embed = getattr(self.embed_model, "get_query_embedding_batch", None)
+        if batch_embed is not None:
+            return batch_embed(queries)
+        # Ollama embeds queries and texts alike, so the text batch API serves queries too
+        return self.embed_model.get_text_embedding_batch(queries)
+
+    def _build_collection_retriever(
+        self,
+        collection_index: CollectionIndex,
+        top_k: int,
+        filters: Optional[SearchFilters] = None,
+    ):
+        """Compose vector, lexical and exact-reference retrieval over one collection"""
+        metadata_filters = filters.to_metadata_filters() if filters else None
+        collection = collection_index.collection
+
+        # With reranking, retrieve rerank_candidates and let the reranker pick top_k
+        candidate_k = max(top_k, settings.rerank_candidates) if self.reranker is not None else top_k
+
+        # Verse-structured indexes return verse groups; over-fetch chunks to fill them
+        parent_child = settings.chunking_strategy == "verse"
+        fetch_k = candidate_k * 3 if parent_child and self.reranker is None else candidate_k
+
+        # Queries are embedded with the other spellings of their Sanskrit words
+        embed_query = self.embed_batcher.embed
+        aembed_query = self.embed_batcher.aembed
+        variants = collection_index.sanskrit_variants
+        if variants is not None:
+            embed_query = lambda query: self.embed_batcher.embed(variants.expand_text(query))
+            aembed_query = lambda query: self.embed_batcher.aembed(variants.expand_text(query))
+
+        if collection_index.lexical_index is not None:
+            retriever = HybridRetriever(
+                QueryEmbeddingRetriever(
+                    collection_index.index.as_retriever(
+                        similarity_top_k=max(fetch_k, settings.hybrid_candidate_k),
+                        filters=metadata_filters,
+                    ),
+                    self.embed_model,
+                    embed_query,
+                    aembed_query,
+                ),
+                collection_index.lexical_index,
+                collection,
+                fetch_k,
+                filters=filters,
+                term_groups=variants.term_groups if variants is not None else None,
+            )
+        else:
+            retriever = QueryEmbeddingRetriever(
+                collection_index.index.as_retriever(similarity_top_k=fetch_k, filters=metadata_filters),
+                self.embed_model,
+                embed_query,
+                aembed_query,
+            )
+        if parent_child:
+            retriever = ParentChildRetriever(retriever, collection, candidate_k)
+        if self.reranker is not None:
+            retriever = RerankingRetriever(retriever, self.reranker, top_k)
+        if collection_index.verse_index is not None:
+            retriever = ReferenceAwareRetriever(retriever, collection_index.verse_index, top_k, filters=filters)
+        return retriever
+
+    def _build_retriever(self, top_k: int, filters: Optional[SearchFilters] = None):
+        """Retriever for top_k; with per-language collections, queries go to their language's"""
+        if filters is not None and filters.language is not None and filters.language in self.collections:
+            # The language filter picks the collection, whose chunks all satisfy it
+            collection_index = self.collections[filters.language]
+            retriever = self._build_collection_retriever(collection_index, top_k, replace(filters, language=None))
+        elif len(self.collections) == 1:
+            retriever = self._build_collection_retriever(next(iter(self.collections.values())), top_k, filters)
+        else:
+            retriever = LanguageRoutingRetriever({
+                language: self._build_collection_retriever(collection_index, top_k, filters)
+                for language, collection_index in self.collections.items()
+            })
+        return TimedRetriever(retriever, RETRIEVAL_SECONDS)
+
+    def _get_retriever(self, top_k: int, filters: Optional[SearchFilters] = None):
+        """Return a shared retriever for the given top_k; filtered ones are built per request"""
+        if filters is not None and not filters.is_empty:
+            return self._build_retriever(top_k, filters)
+
+        with self._retrievers_lock:
+            retriever = self._retrievers.get(top_k)
+            if retriever is None:
+                retriever = self._build_retriever(top_k)
+                self._retrievers[top_k] = retriever
+            return retriever
+
+    def _build_chat_engine(
+        self,
+        memory: Optional[ChatMemoryBuffer] = None,
+        retriever=None,
+    ) -> CondensePlusContextChatEngine:
+        """Create a chat engine on top of the shared (or a filtered) retriever"""
+        return CondensePlusContextChatEngine.from_defaults(
+            retriever=retriever or self.retriever,
+            llm=self.llm,
+            memory=memory or self._build_memory(),
+            system_prompt=settings.system_prompt,
+            node_postprocessors=[self.context_packer],
+            verbose=False,
         )
 
-        self._initialized = True
+    def _build_memory(self) -> ChatMemoryBuffer:
+        """Chat memory truncated to the history budget with the packer's tokenizer"""
+        return ChatMemoryBuffer.from_defaults(
+            token_limit=settings.chat_memory_token_limit,
+            tokenizer_fn=self._tokenizer,
+        )
+
+    def _acquire_chat_engine(self, filters: Optional[SearchFilters]) -> Tuple[CondensePlusContextChatEngine, bool]:
+        """Return (engine, pooled); filtered requests get a one-off engine outside the pool"""
+        if filters is None or filters.is_empty:
+            return self._engine_pool.acquire(), True
+        return self._build_chat_engine(retriever=self._get_retriever(settings.similarity_top_k, filters)), False
+
+    @staticmethod
+    def _to_chat_messages(chat_history: Optional[List[dict]]) -> List[ChatMessage]:
+        """Convert API history dicts to LlamaIndex chat messages"""
+        messages = []
+        for msg in chat_history or []:
+            role = MessageRole.USER if msg["role"] == "user" else MessageRole.ASSISTANT
+            messages.append(ChatMessage(role=role, content=msg["content"]))
+        return messages
 
     def create_chat_engine(self, chat_history: Optional[List[dict]] = None):
         """Create a new chat engine with optional history"""
         if not self._initialized:
             self.initialize()
 
-        # Create retriever
-        retriever = self.index.as_retriever(
-            similarity_top_k=settings.similarity_top_k,
-        )
-
-        # Convert chat history if provided
-        memory = ChatMemoryBuffer.from_defaults(token_limit=4096)
-        if chat_history:
-            for msg in chat_history:
-                role = MessageRole.USER if msg["role"] == "user" else MessageRole.ASSISTANT
-                memory.put(ChatMessage(role=role, content=msg["content"]))
-
-        # Create chat engine
-        chat_engine = CondensePlusContextChatEngine.from_defaults(
-            retriever=retriever,
-            llm=self.llm,
-            memory=memory,
-            system_prompt=settings.system_prompt,
-            verbose=False,
-        )
+        memory = self._build_memory()
+        for message in self._to_chat_messages(chat_history):
+            memory.put(message)
 
-        return chat_engine
+        return self._build_chat_engine(memory)
 
     def query(
         self,
         question: str,
         chat_history: Optional[List[dict]] = None,
+        filters: Optional[SearchFilters] = None,
     ) -> RAGResponse:
         """
         Query the RAG system with a question
@@ -129,14 +409,68 @@ class VedavoiceRAG:
         Args:
             question: The user's question
             chat_history: Optional list of previous messages [{"role": "user/assistant", "content": "..."}]
+            filters: Optional restriction to a book, canto, chapter or language
 
         Returns:
             RAGResponse with answer and sources
         """
-        chat_engine = self.create_chat_engine(chat_history)
+        cached = self.cached_answer(question, chat_history, filters)
+        if cached is not None:
+            return cached
+        return self.generate_answer(question, chat_history, filters)
 
-        # Get response
-        response = chat_engine.chat(question)
+    @staticmethod
+    def _answer_cache_key(
+        question: str,
+        chat_history: Optional[List[dict]],
+        filters: Optional[SearchFilters],
+    ) -> Optional[Tuple]:
+        # Without history the answer depends on the question alone
+        if not settings.answer_cache_enabled or chat_history:
+            return None
+        return normalize_query(question), filters.key() if filters else None
+
+    def cached_answer(
+        self,
+        question: str,
+        chat_history: Optional[List[dict]] = None,
+        filters: Optional[SearchFilters] = None,
+    ) -> Optional[RAGResponse]:
+        """Answer from the answer cache, or None; never calls the models"""
+        cache_key = self._answer_cache_key(question, chat_history, filters)
+        if cache_key is None:
+            return None
+        cached = self.answer_cache.get(cache_key)
+        if cached is not None:
+            CACHE_HITS.labels("answer").inc()
+        else:
+            CACHE_MISSES.labels("answer").inc()
+        return cached
+
+    def generate_answer(
+        self,
+        question: str,
+        chat_history: Optional[List[dict]] = None,
+        filters: Optional[SearchFilters] = None,
+    ) -> RAGResponse:
+        """Answer with the LLM, bypassing the cache lookup; the answer is cached"""
+        if not self._initialized:
+            self.initialize()
+
+        # Passing the history (even when empty) replaces the pooled engine's memory.
+        # The answer is streamed internally so time to first token can be measured.
+        timer = GenerationTimer("chat")
+        chat_engine, pooled = self._acquire_chat_engine(filters)
+        try:
+            response = chat_engine.stream_chat(question, chat_history=self._to_chat_messages(chat_history))
+            tokens = []
+            for token in response.response_gen:
+                timer.token()
+                tokens.append(token)
+            timer.finish()
+        finally:
+            if pooled:
+                self._engine_pool.release(chat_engine)
 
         # Extract sources
         sources = []
@@ -152,16 +486,22 @@ class VedavoiceRAG:
                     relevance_score=node.score if hasattr(node, 'score') else 0.0,
                 ))
 
-        return RAGResponse(
-            answer=str(response),
+        result = RAGResponse(
+            answer="".join(tokens),
             sources=sources,
             model=settings.llm_model,
         )
+        cache_key = self._answer_cache_key(question, chat_history, filters)
+        if cache_key is not None:
+            self.answer_cache.set(cache_key, result)
+
+        return result
 
     def query_stream(
         self,
         question: str,
         chat_history: Optional[List[dict]] = None,
+        filters: Optional[SearchFilters] = None,
     ) -> Generator[str, None, None]:
         """
         Stream response from the RAG system
@@ -169,25 +509,109 @@ class VedavoiceRAG:
         Args:
             question: The user's question
             chat_history: Optional list of previous messages
+            filters: Optional restriction to a book, canto, chapter or language
 
         Yields:
             Chunks of the response text
         """
-        chat_engine = self.create_chat_engine(chat_history)
+        if not self._initialized:
+            self.initialize()
+
+        timer = GenerationTimer("chat_stream")
+        chat_engine, pooled = self._acquire_chat_engine(filters)
+        completed = False
+        try:
+            # Get streaming response
+            response = chat_engine.stream_chat(question, chat_history=self._to_chat_messages(chat_history))
+
+            for token in response.response_gen:
+                timer.token()
+                yield token
+            completed = True
+            timer.finish()
+        finally:
+            # An abandoned stream may still be writing to this engine's memory
+            # from a background thread, so it is not returned to the pool
+            if completed and pooled:
+                self._engine_pool.release(chat_engine)
+
+    async def aquery_stream(
+        self,
+        question: str,
+        chat_history: Optional[List[dict]] = None,
+        filters: Optional[SearchFilters] = None,
+    ) -> AsyncGenerator[str, None]:
+        """
+        Stream response from the RAG system without blocking the event loop
 
-        # Get streaming response
-        response = chat_engine.stream_chat(question)
+        Uses the LLM's async streaming API, driven by a task of its own.
+        Closing or cancelling the generator (e.g. on client disconnect)
+        cancels that task, which stops the LLM stream before the chat engine
+        goes back to the pool.
 
-        for token in response.response_gen:
-            yield token
+        Args:
+            question: The user's question
+            chat_history: Optional list of previous messages
+            filters: Optional restriction to a book, canto, chapter or language
 
-    def get_similar_verses(self, query: str, top_k: int = 5) -> List[SourceReference]:
+        Yields:
+            Chunks of the response text
+        """
+        if not self._initialized:
+            self.initialize()
+
+        timer = GenerationTimer("chat_stream")
+        chat_engine, pooled = self._acquire_chat_engine(filters)
+        tokens: asyncio.Queue = asyncio.Queue()
+        producer = asyncio.create_task(self._stream_tokens(chat_engine, question, chat_history, tokens))
+        try:
+            while True:
+                token = await tokens.get()
+                if token is None:
+                    break
+                timer.token()
+                yield token
+            # Re-raises a failure of the stream
+            await producer
+            timer.finish()
+        finally:
+            if not producer.done():
+                # The cancellation is raised at the pending read of the LLM
+                # stream, closing every generator down to the Ollama response
+                producer.cancel()
+                await asyncio.gather(producer, return_exceptions=True)
+            if pooled:
+                self._engine_pool.release(chat_engine)
+
+    async def _stream_tokens(
+        self,
+        chat_engine: CondensePlusContextChatEngine,
+        question: str,
+        chat_history: Optional[List[dict]],
+        tokens: asyncio.Queue,
+    ):
+        """Feed the chat engine's streamed tokens into the queue, then None"""
+        try:
+            response = await chat_engine.astream_chat(question, chat_history=self._to_chat_messages(chat_history))
+            # Unbounded, so this task is always waiting on the LLM when cancelled
+            async for token in response.async_response_gen():
+                tokens.put_nowait(token)
+        finally:
+            tokens.put_nowait(None)
+
+    def get_similar_verses(
+        self,
+        query: str,
+        top_k: int = 5,
+        filters: Optional[SearchFilters] = None,
+    ) -> List[SourceReference]:
         """
         Find verses similar to the query without generating a response
 
         Args:
             query: Search query
             top_k: Number of results to return
+            filters: Optional restriction to a book, canto, chapter or language
 
         Returns:
             List of similar verses with metadata
@@ -195,8 +619,14 @@ class VedavoiceRAG:
         if not self._initialized:
             self.initialize()
 
-        retriever = self.index.as_retriever(similarity_top_k=top_k)
-        nodes = retriever.retrieve(query)
+        cache_key = (normalize_query(query), top_k, filters.key() if filters else None)
+        cached = self.search_cache.get(cache_key)
+        if cached is not None:
+            CACHE_HITS.labels("search").inc()
+            return list(cached)
+        CACHE_MISSES.labels("search").inc()
+
+        nodes = self._get_retriever(top_k, filters).retrieve(query)
 
         results = []
         for node in nodes:
@@ -210,7 +640,23 @@ class VedavoiceRAG:
                 relevance_score=node.score if hasattr(node, 'score') else 0.0,
             ))
 
-        return results
+        self.search_cache.set(cache_key, results)
+        return list(results)
+
+    def cache_stats(self) -> dict:
+        """Hit/miss counters of the query caches"""
+        stats = {
+            "search": self.search_cache.stats(),
+            "answer": {"enabled": settings.answer_cache_enabled, **self.answer_cache.stats()},
+        }
+        if self.reranker is not None:
+            stats["rerank"] = self.reranker.stats()
+        if self.embed_batcher is not None:
+            stats["query_embedding_batches"] = self.embed_batcher.stats()
+        cache = getattr(self.embed_model, "cache", None)
+        if cache is not None:
+            stats["embedding"] = {"hits": cache.hits, "misses": cache.misses}
+        return stats
 
 
 # Global instance
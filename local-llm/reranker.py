@@ -0,0 +1,190 @@
+"""
+Reranker - CPU reranking of over-retrieved candidates within a time budget
+
+Candidates are scored with a small local cross-encoder (if
+sentence-transformers is installed) or a lexical-overlap scorer. Reranking is
+skipped whenever the expected cost would exceed the configured budget, and
+abandoned (keeping retrieval order) if the budget runs out mid-way.
+"""
+import asyncio
+import time
+import threading
+from typing import Dict, List, Optional
+
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import MetadataMode, NodeWithScore, QueryBundle
+from rich.console import Console
+
+from config import settings
+from hybrid_retriever import tokenize
+from metrics import RERANK_SECONDS
+
+try:
+    from sentence_transformers import CrossEncoder
+    CROSS_ENCODER_AVAILABLE = True
+except ImportError:
+    CrossEncoder = None
+    CROSS_ENCODER_AVAILABLE = False
+
+console = Console()
+
+# Weight of the original retrieval rank, used to break ties between equal scores
+_RANK_PRIOR = 0.05
+
+# Cross-encoder pairs scored per call; the deadline is checked between batches
+_CROSS_ENCODER_BATCH = 8
+
+
+class LexicalOverlapScorer:
+    """Scores candidates by query term and bigram coverage (diacritic-folded)"""
+
+    name = "lexical"
+
+    def score(self, query: str, texts: List[str], deadline: float) -> Optional[List[float]]:
+        query_terms = tokenize(query)
+        if not query_terms:
+            return [0.0] * len(texts)
+        unique_terms = set(query_terms)
+        bigrams = set(zip(query_terms, query_terms[1:]))
+
+        scores = []
+        for text in texts:
+            if time.perf_counter() > deadline:
+                return None
+            terms = tokenize(text)
+            present = set(terms)
+            score = len(unique_terms & present) / len(unique_terms)
+            if bigrams:
+                score += 0.5 * len(bigrams & set(zip(terms, terms[1:]))) / len(bigrams)
+            scores.append(score)
+        return scores
+
+
+class CrossEncoderScorer:
+    """Scores (query, passage) pairs with a local cross-encoder model"""
+
+    name = "cross-encoder"
+
+    def __init__(self, model_name: str):
+        self._model = CrossEncoder(model_name, device="cpu")
+
+    def score(self, query: str, texts: List[str], deadline: float) -> Optional[List[float]]:
+        scores: List[float] = []
+        for start in range(0, len(texts), _CROSS_ENCODER_BATCH):
+            if time.perf_counter() > deadline:
+                return None
+            batch = texts[start:start + _CROSS_ENCODER_BATCH]
+            scores.extend(float(s) for s in self._model.predict([(query, text) for text in batch]))
+        return scores
+
+
+def build_scorer():
+    """Cross-encoder when requested and installed, lexical overlap otherwise"""
+    if settings.rerank_method == "cross-encoder":
+        if CROSS_ENCODER_AVAILABLE:
+            return CrossEncoderScorer(settings.rerank_model)
+        console.print("[yellow]sentence-transformers not installed, falling back to lexical reranking[/yellow]")
+    return LexicalOverlapScorer()
+
+
+class BudgetedReranker:
+    """Reranks nodes when the scorer's measured per-candidate cost fits the budget"""
+
+    def __init__(self, scorer, budget_ms: float):
+        self.scorer = scorer
+        self.budget = budget_ms / 1000.0
+        self._seconds_per_node: Optional[float] = None
+        self._lock = threading.Lock()
+        self.reranked = 0
+        self.skipped = 0
+
+    def _record_cost(self, elapsed: float, count: int):
+        per_node = elapsed / max(count, 1)
+        with self._lock:
+            if self._seconds_per_node is None:
+                self._seconds_per_node = per_node
+            else:
+                self._seconds_per_node = 0.8 * self._seconds_per_node + 0.2 * per_node
+
+    def rerank(self, query: str, nodes: List[NodeWithScore], top_n: int) -> List[NodeWithScore]:
+        """
+        Reorder nodes by relevance and keep the best top_n verse groups
+
+        Chunks that share a parent_id stay together, ranked by their best member.
+        """
+        if len(nodes) <= 1:
+            return nodes
+
+        estimate = self._seconds_per_node * len(nodes) if self._seconds_per_node is not None else 0.0
+        if estimate > self.budget:
+            self.skipped += 1
+            # Let the next request re-measure instead of skipping forever
+            with self._lock:
+                self._seconds_per_node *= 0.9
+            return self._top_groups(nodes, None, top_n)
+
+        started = time.perf_counter()
+        texts = [node.node.get_content(metadata_mode=MetadataMode.NONE) for node in nodes]
+        scores = self.scorer.score(query, texts, started + self.budget)
+        elapsed = time.perf_counter() - started
+        self._record_cost(elapsed, len(nodes) if scores is None else len(scores))
+
+        if scores is None:
+            self.skipped += 1
+            return self._top_groups(nodes, None, top_n)
+
+        self.reranked += 1
+        rescored = [
+            NodeWithScore(node=node.node, score=score + _RANK_PRIOR / (rank + 1))
+            for rank, (node, score) in enumerate(zip(nodes, scores))
+        ]
+        return self._top_groups(rescored, [n.score for n in rescored], top_n)
+
+    @staticmethod
+    def _top_groups(nodes: List[NodeWithScore], scores: Optional[List[float]], top_n: int) -> List[NodeWithScore]:
+        groups: Dict[str, List[int]] = {}
+        for i, node in enumerate(nodes):
+            key = node.node.metadata.get("parent_id") or node.node.node_id
+            groups.setdefault(key, []).append(i)
+
+        ordered = list(groups.values())
+        if scores is not None:
+            ordered.sort(key=lambda members: max(scores[i] for i in members), reverse=True)
+
+        result: List[NodeWithScore] = []
+        for members in ordered[:top_n]:
+            # Verse node first, then purport parts in retrieval order
+            members.sort(key=lambda i: nodes[i].node.metadata.get("node_role") == "purport")
+            result.extend(nodes[i] for i in members)
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "method": self.scorer.name,
+            "budget_ms": self.budget * 1000,
+            "ms_per_candidate": (self._seconds_per_node or 0.0) * 1000,
+            "reranked": self.reranked,
+            "skipped": self.skipped,
+        }
+
+
+class RerankingRetriever(BaseRetriever):
+    """Over-retrieves candidates and returns the reranked top_n"""
+
+    def __init__(self, retriever: BaseRetriever, reranker: BudgetedReranker, top_n: int):
+        super().__init__()
+        self._retriever = retriever
+        self._reranker = reranker
+        self._top_n = top_n
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        return self._rerank(query_bundle.query_str, self._retriever.retrieve(query_bundle))
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        nodes = await self._retriever.aretrieve(query_bundle)
+        # Cross-encoder scoring is CPU-bound
+        return await asyncio.to_thread(self._rerank, query_bundle.query_str, nodes)
+
+    def _rerank(self, query: str, nodes: List[NodeWithScore]) -> List[NodeWithScore]:
+        with RERANK_SECONDS.time():
+            return self._reranker.rerank(query, nodes, self._top_n)
@@ -0,0 +1,145 @@
+"""
+Sanskrit Query - One term for every spelling of a Sanskrit word
+
+Users type "Krishna", "Крішна", "Kṛṣṇa" and "кр̣шн̣а" interchangeably, while
+the books use IAST in English, the academic transliteration in Ukrainian
+verse text and popular spellings in translations. Every spelling is reduced
+to a Latin key with the importer's IAST -> Ukrainian table run backwards
+(tools/pre_import_normalizer.py), plus a few rules for popular English
+spellings. The spellings of one key found in a collection's BM25 vocabulary
+are its variants: BM25 scores a query term by its best-matching variant, and
+the most frequent variants are appended to the query before it is embedded,
+so one query reaches every script without extra searches.
+"""
+import os
+import re
+import sys
+from typing import Dict, List, Optional
+
+from config import settings
+from hybrid_retriever import LexicalIndex, fold_diacritics, tokenize
+
+# The importer's transliteration tables live in tools/ at the repo root
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+
+from tools.pre_import_normalizer import ENGLISH_TO_UKRAINIAN_TRANSLIT  # noqa: E402
+
+# Cyrillic letters the IAST table never produces, as typed in popular spellings
+# ("Чайтанья", "Гіта") - after folding, so й and ї are already и and і
+_POPULAR_CYRILLIC = {
+    "г": "g",
+    "и": "i",
+    "є": "ie",
+    "я": "ia",
+    "ю": "iu",
+    "ь": "",
+    "ж": "zh",
+    "з": "z",
+    "ф": "f",
+    "ц": "ts",
+    "щ": "sc",
+}
+
+# Popular English spellings -> folded IAST: Krishna -> krsna, Chaitanya -> caitania
+_LATIN_RULES = [
+    (re.compile(r"w"), "v"),
+    (re.compile(r"y"), "i"),
+    (re.compile(r"ee"), "i"),
+    (re.compile(r"oo"), "u"),
+    (re.compile(r"sh"), "s"),
+    (re.compile(r"ch"), "c"),
+    # Vocalic ṛ is written "ri" (Krishna, Крішна, rishi)
+    (re.compile(r"ri(?![aeiou])"), "r"),
+]
+
+# Shorter keys match too many unrelated words
+_MIN_KEY_LENGTH = 4
+
+
+def _cyrillic_to_latin() -> Dict[str, str]:
+    """Folded Ukrainian transliteration -> folded IAST, longest spellings first"""
+    table: Dict[str, str] = {}
+    for latin, cyrillic in ENGLISH_TO_UKRAINIAN_TRANSLIT.items():
+        # The first IAST spelling wins, e.g. ч -> ch (normalized to c below)
+        table.setdefault(fold_diacritics(cyrillic), fold_diacritics(latin))
+    for cyrillic, latin in _POPULAR_CYRILLIC.items():
+        table.setdefault(cyrillic, latin)
+    return dict(sorted(table.items(), key=lambda item: len(item[0]), reverse=True))
+
+
+_CYRILLIC_TO_LATIN = _cyrillic_to_latin()
+_CYRILLIC_RE = re.compile("|".join(re.escape(spelling) for spelling in _CYRILLIC_TO_LATIN))
+
+
+def sanskrit_key(term: str) -> str:
+    """
+    Script-independent key of a folded term
+
+    "krishna", "крішна", "krsna" (kṛṣṇa) and "кршна" (кр̣шн̣а) all give "krsna".
+    """
+    key = _CYRILLIC_RE.sub(lambda match: _CYRILLIC_TO_LATIN[match.group()], term)
+    for pattern, replacement in _LATIN_RULES:
+        key = pattern.sub(replacement, key)
+    return key
+
+
+class SanskritVariants:
+    """Spellings of the Sanskrit words in one collection, grouped by key"""
+
+    def __init__(self, variants: Dict[str, List[str]]):
+        # key -> spellings, most frequent first
+        self._variants = variants
+
+    def __len__(self) -> int:
+        return len(self._variants)
+
+    @classmethod
+    def from_lexical_index(cls, lexical_index: LexicalIndex) -> "SanskritVariants":
+        """
+        Group the index vocabulary by key
+
+        Only keys of words the books write with diacritics somewhere count as
+        Sanskrit, so "son" never expands to "сон".
+        """
+        sanskrit_keys = {sanskrit_key(term) for term in lexical_index.sanskrit_terms}
+        sanskrit_keys = {key for key in sanskrit_keys if len(key) >= _MIN_KEY_LENGTH}
+
+        spellings: Dict[str, List[tuple]] = {}
+        for term, (docs, _) in lexical_index.postings.items():
+            key = sanskrit_key(term)
+            if key in sanskrit_keys:
+                spellings.setdefault(key, []).append((len(docs), term))
+
+        return cls({
+            key: [term for _, term in sorted(entries, key=lambda entry: (-entry[0], entry[1]))]
+            for key, entries in spellings.items()
+        })
+
+    def variants(self, term: str) -> Optional[List[str]]:
+        """Every indexed spelling of a folded term, or None if it is not a Sanskrit word"""
+        return self._variants.get(sanskrit_key(term))
+
+    def term_groups(self, query: str) -> List[List[str]]:
+        """BM25 terms of a query, each with its alternative spellings"""
+        groups = []
+        for term in dict.fromkeys(tokenize(query)):
+            variants = self.variants(term)
+            if variants is None:
+                groups.append([term])
+            else:
+                groups.append([term] + [variant for variant in variants if variant != term])
+        return groups
+
+    def expand_text(self, query: str) -> str:
+        """The query with the most frequent other spellings of its Sanskrit words appended, for embedding"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        extra: List[str] = []
+        for term in terms:
+            variants = self.variants(term) or []
+            added = [variant for variant in variants if variant not in terms and variant not in extra]
+            extra.extend(added[:settings.sanskrit_max_variants])
+        if not extra:
+            return query
+        return f"{query} ({', '.join(extra)})"
@@ -0,0 +1,167 @@
+"""
+Scheduler - Admission control for model work and batching of query embeddings
+
+AdmissionScheduler gives a fixed number of slots to requests and rejects new
+requests once its bounded queue is full, so a CPU-only host never runs more
+generations than it can serve. The server keeps one for /chat generations and
+a separate one for /search retrieval. QueryEmbeddingBatcher coalesces query
+embeddings requested at the same moment into a single call to the embedding
+model.
+"""
+import asyncio
+import math
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+
+
+class QueueFullError(Exception):
+    """Raised when a request cannot be queued; retry_after is in seconds"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Server busy, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class AdmissionScheduler:
+    """Fixed slots and a bounded queue for requests that use the models"""
+
+    def __init__(self, slots: int, max_queue: int):
+        self.slots = slots
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(slots)
+        self._busy = 0
+        self._waiting = 0
+        self._service_time: Optional[float] = None
+        self.rejected = 0
+
+    @property
+    def queued(self) -> int:
+        return self._waiting
+
+    def retry_after(self) -> int:
+        """Seconds until the queue ahead of a new request is likely to drain"""
+        service_time = self._service_time or 1.0
+        return max(1, math.ceil(service_time * (self._waiting + 1) / self.slots))
+
+    def check_admission(self):
+        """Raise QueueFullError if a new request would not fit in the queue"""
+        if self._semaphore.locked() and self._waiting >= self.max_queue:
+            self.rejected += 1
+            raise QueueFullError(self.retry_after())
+
+    def _record(self, elapsed: float):
+        if self._service_time is None:
+            self._service_time = elapsed
+        else:
+            self._service_time = 0.8 * self._service_time + 0.2 * elapsed
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one slot for the duration of the block"""
+        self.check_admission()
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        self._busy += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(time.perf_counter() - started)
+            self._busy -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "slots": self.slots,
+            "busy": self._busy,
+            "queued": self._waiting,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+        }
+
+
+class QueryEmbeddingBatcher:
+    """
+    Embeds concurrent queries with one model call
+
+    The first caller waits window_ms for other queries to arrive, then embeds
+    the whole batch and hands each caller its vector. Callers arriving while a
+    batch is running are served by the same thread in the next batch. aembed
+    is the event-loop variant; sync and async callers share batches.
+    """
+
+    def __init__(self, embed_batch: Callable[[List[str]], List[List[float]]], window_ms: float, max_batch: int):
+        self._embed_batch = embed_batch
+        self._window = window_ms / 1000.0
+        self._max_batch = max_batch
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[str, Future]] = []
+        self._leader_active = False
+        self.batches = 0
+        self.queries = 0
+
+    def embed(self, query: str) -> List[float]:
+        future: Future = Future()
+        with self._lock:
+            self._pending.append((query, future))
+            leader = not self._leader_active
+            self._leader_active = True
+
+        if leader:
+            if self._window > 0:
+                time.sleep(self._window)
+            self._drain()
+        return future.result()
+
+    async def aembed(self, query: str) -> List[float]:
+        future: Future = Future()
+        with self._lock:
+            self._pending.append((query, future))
+            leader = not self._leader_active
+            self._leader_active = True
+
+        if leader:
+            try:
+                if self._window > 0:
+                    await asyncio.sleep(self._window)
+            finally:
+                # Drain even if this caller is cancelled, or the queries
+                # queued behind it would never be embedded
+                drain = asyncio.ensure_future(asyncio.to_thread(self._drain))
+            await asyncio.shield(drain)
+        # Shielded so a cancelled caller does not cancel the future the leader resolves
+        return await asyncio.shield(asyncio.wrap_future(future))
+
+    def _drain(self):
+        while True:
+            with self._lock:
+                batch = self._pending[:self._max_batch]
+                self._pending = self._pending[self._max_batch:]
+                if not batch:
+                    self._leader_active = False
+                    return
+
+            try:
+                embeddings = self._embed_batch([query for query, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.queries += len(batch)
+            for (_, future), embedding in zip(batch, embeddings):
+                future.set_result(embedding)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "queries": self.queries,
+            "avg_batch_size": self.queries / self.batches if self.batches else 0.0,
+        }
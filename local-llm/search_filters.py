@@ -0,0 +1,66 @@
+"""
+Search Filters - Metadata filters for retrieval (book, canto, chapter, language)
+"""
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from llama_index.core.vector_stores import FilterCondition, MetadataFilter, MetadataFilters
+
+# Languages a filter can select; "uk" keeps chunks indexed with Ukrainian text
+LANGUAGES = ("uk", "en")
+
+
+@dataclass(frozen=True)
+class SearchFilters:
+    """Restricts retrieval to part of the corpus"""
+    book_slug: Optional[str] = None
+    canto_number: Optional[int] = None
+    chapter_number: Optional[int] = None
+    language: Optional[str] = None
+
+    def __post_init__(self):
+        if self.language is not None and self.language not in LANGUAGES:
+            raise ValueError(f"Unsupported language filter: {self.language}")
+
+    @property
+    def is_empty(self) -> bool:
+        return self.key() == (None, None, None, None)
+
+    def key(self) -> Tuple:
+        """Hashable form for cache keys"""
+        return (self.book_slug, self.canto_number, self.chapter_number, self.language)
+
+    def to_metadata_filters(self) -> Optional[MetadataFilters]:
+        """Translate to LlamaIndex filters, which ChromaVectorStore pushes down as a `where` clause"""
+        filters = []
+        if self.book_slug is not None:
+            filters.append(MetadataFilter(key="book_slug", value=self.book_slug))
+        if self.canto_number is not None:
+            filters.append(MetadataFilter(key="canto_number", value=self.canto_number))
+        if self.chapter_number is not None:
+            filters.append(MetadataFilter(key="chapter_number", value=self.chapter_number))
+        if self.language is not None:
+            filters.append(MetadataFilter(key="has_ukrainian", value=self.language == "uk"))
+        if not filters:
+            return None
+        return MetadataFilters(filters=filters, condition=FilterCondition.AND)
+
+    def matches(self, metadata: dict) -> bool:
+        """Check a chunk's metadata against the filters"""
+        return self.matches_values(
+            metadata.get("book_slug"),
+            metadata.get("canto_number"),
+            metadata.get("chapter_number"),
+            metadata.get("has_ukrainian"),
+        )
+
+    def matches_values(self, book_slug, canto_number, chapter_number, has_ukrainian) -> bool:
+        if self.book_slug is not None and book_slug != self.book_slug:
+            return False
+        if self.canto_number is not None and canto_number != self.canto_number:
+            return False
+        if self.chapter_number is not None and chapter_number != self.chapter_number:
+            return False
+        if self.language is not None and bool(has_ukrainian) != (self.language == "uk"):
+            return False
+        return True
@@ -2,18 +2,23 @@
 FastAPI Server for Vedavoice Local LLM
 """
 import asyncio
-from typing import List, Optional
+import time
+from typing import Dict, List, Literal, Optional
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 
 from rich.console import Console
 
 from config import settings
-from rag_engine import get_rag_engine, VedavoiceRAG
+from metrics import ERRORS, REJECTED, REQUEST_SECONDS, render_metrics
+from scheduler import AdmissionScheduler, QueueFullError
+from rag_engine import VedavoiceRAG
+from snapshot import current_snapshot, snapshot_path
+from search_filters import SearchFilters
 
 console = Console()
 
@@ -24,7 +29,24 @@ class ChatMessage(BaseModel):
     content: str
 
 
-class ChatRequest(BaseModel):
+class FilterFields(BaseModel):
+    """Optional retrieval filters shared by /search and /chat"""
+    book_slug: Optional[str] = None
+    canto_number: Optional[int] = None
+    chapter_number: Optional[int] = None
+    language: Optional[Literal["uk", "en"]] = None
+
+    def to_filters(self) -> Optional[SearchFilters]:
+        filters = SearchFilters(
+            book_slug=self.book_slug,
+            canto_number=self.canto_number,
+            chapter_number=self.chapter_number,
+            language=self.language,
+        )
+        return None if filters.is_empty else filters
+
+
+class ChatRequest(FilterFields):
     message: str
     history: Optional[List[ChatMessage]] = None
     stream: bool = False
@@ -45,7 +67,7 @@ class ChatResponse(BaseModel):
     model: str
 
 
-class SearchRequest(BaseModel):
+class SearchRequest(FilterFields):
     query: str
     top_k: int = 5
 
@@ -60,31 +82,133 @@ class HealthResponse(BaseModel):
 # Global RAG engine
 rag_engine: Optional[VedavoiceRAG] = None
 
+# Admits /chat generations into a fixed number of slots
+scheduler: Optional[AdmissionScheduler] = None
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Initialize RAG engine on startup"""
-    global rag_engine
-    console.print("\n[bold blue]Starting Vedavoice Local LLM Server[/bold blue]\n")
+# Retrieval-only /search work has its own slots, so it is not queued behind generations
+search_scheduler: Optional[AdmissionScheduler] = None
+
+# Startup progress reported by /health/ready
+started_at = time.monotonic()
+startup_timings: Dict[str, float] = {}
+startup_error: Optional[str] = None
+
+# Snapshot swaps run one at a time; a snapshot that failed to load is not retried
+snapshot_lock: Optional[asyncio.Lock] = None
+failed_snapshot: Optional[str] = None
+
+
+def build_engine(snapshot_id: Optional[str]) -> VedavoiceRAG:
+    """Initialize an engine over a snapshot, or over the configured vector store"""
+    engine = VedavoiceRAG(snapshot_path(snapshot_id) if snapshot_id else None)
+    engine.initialize()
+    return engine
+
+
+async def start_engine():
+    """Initialize and warm up the RAG engine without blocking /health/live"""
+    global rag_engine, startup_error
+    loop = asyncio.get_event_loop()
 
     try:
         console.print("[cyan]Initializing RAG engine...[/cyan]")
-        rag_engine = get_rag_engine()
+        started = time.perf_counter()
+        engine = await loop.run_in_executor(None, build_engine, current_snapshot())
+        startup_timings["initialize_ms"] = (time.perf_counter() - started) * 1000
+        rag_engine = engine
         console.print("[green]RAG engine ready![/green]")
+        if engine.snapshot_id:
+            console.print(f"[dim]Snapshot: {engine.snapshot_id}[/dim]")
         console.print(f"[dim]LLM Model: {settings.llm_model}[/dim]")
         console.print(f"[dim]Embedding Model: {settings.embedding_model}[/dim]")
-        console.print(f"\n[bold green]Server ready at http://{settings.host}:{settings.port}[/bold green]\n")
     except Exception as e:
+        startup_error = f"Initialization failed: {e}"
         console.print(f"[red]Failed to initialize RAG engine: {e}[/red]")
         console.print("[yellow]Please ensure:[/yellow]")
         console.print("  1. Ollama is running (ollama serve)")
         console.print(f"  2. Models are pulled (ollama pull {settings.llm_model})")
         console.print("  3. Index exists (python indexer.py)")
-        raise
+        return
+
+    if settings.warmup_enabled:
+        try:
+            console.print("[cyan]Warming up models...[/cyan]")
+            startup_timings.update(await loop.run_in_executor(None, engine.warm_up))
+            console.print(f"[dim]Warm-up: {', '.join(f'{k}={v:.0f}' for k, v in startup_timings.items())}[/dim]")
+        except Exception as e:
+            startup_error = f"Warm-up failed: {e}"
+            console.print(f"[red]Warm-up failed: {e}[/red]")
+            return
+
+    console.print(f"\n[bold green]Server ready at http://{settings.host}:{settings.port}[/bold green]\n")
+
+
+async def swap_snapshot(snapshot_id: str) -> VedavoiceRAG:
+    """
+    Load a snapshot next to the serving engine and switch to it once it is warm
+
+    Requests keep going to the old engine until the new one is ready; the switch
+    is a single assignment, and requests already running finish on the old one.
+    If loading fails, the old engine stays in place.
+    """
+    global rag_engine, failed_snapshot
+    loop = asyncio.get_event_loop()
+
+    async with snapshot_lock:
+        if rag_engine is not None and rag_engine.snapshot_id == snapshot_id:
+            return rag_engine
+
+        console.print(f"[cyan]Loading snapshot {snapshot_id}...[/cyan]")
+        started = time.perf_counter()
+        try:
+            engine = await loop.run_in_executor(None, build_engine, snapshot_id)
+            if settings.warmup_enabled:
+                await loop.run_in_executor(None, engine.warm_up)
+        except Exception as e:
+            failed_snapshot = snapshot_id
+            console.print(f"[red]Snapshot {snapshot_id} failed to load, still serving the previous index: {e}[/red]")
+            raise
+
+        rag_engine = engine
+        console.print(f"[green]Now serving snapshot {snapshot_id} "
+                      f"(loaded in {time.perf_counter() - started:.1f}s)[/green]")
+        return engine
+
+
+async def watch_snapshots():
+    """Swap to a newly imported snapshot as soon as CURRENT points at it"""
+    while True:
+        await asyncio.sleep(settings.snapshot_poll_seconds)
+        snapshot_id = current_snapshot()
+        # Until the first engine is up, start_engine picks the current snapshot itself
+        if rag_engine is None or snapshot_id is None:
+            continue
+        if snapshot_id == rag_engine.snapshot_id or snapshot_id == failed_snapshot:
+            continue
+        try:
+            await swap_snapshot(snapshot_id)
+        except Exception:
+            pass
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start serving immediately; the RAG engine initializes and warms up in the background"""
+    global scheduler, search_scheduler, snapshot_lock
+    console.print("\n[bold blue]Starting Vedavoice Local LLM Server[/bold blue]\n")
+
+    scheduler = AdmissionScheduler(settings.max_concurrent_generations, settings.max_queued_requests)
+    search_scheduler = AdmissionScheduler(settings.max_concurrent_searches, settings.max_queued_requests)
+    snapshot_lock = asyncio.Lock()
+    tasks = [asyncio.create_task(start_engine())]
+    if settings.snapshot_poll_seconds > 0:
+        tasks.append(asyncio.create_task(watch_snapshots()))
 
     yield
 
     console.print("\n[yellow]Shutting down server...[/yellow]")
+    for task in tasks:
+        task.cancel()
 
 
 # Create FastAPI app
@@ -105,6 +229,16 @@ app.add_middleware(
 )
 
 
+def too_busy(endpoint: str, error: QueueFullError) -> HTTPException:
+    """429 telling the client when the queue is likely to have room again"""
+    REJECTED.labels(endpoint).inc()
+    return HTTPException(
+        status_code=429,
+        detail=str(error),
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
+
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """Check server health and model status"""
@@ -117,6 +251,58 @@ async def health_check():
     )
 
 
+@app.get("/health/live")
+async def health_live():
+    """Liveness probe: the process is up and serving HTTP"""
+    return {"status": "alive", "uptime_seconds": time.monotonic() - started_at}
+
+
+@app.get("/health/ready")
+async def health_ready():
+    """Readiness probe: 200 only once the engine is initialized and warmed up"""
+    global rag_engine
+    ready = rag_engine is not None and (rag_engine.warmed_up or not settings.warmup_enabled)
+    if ready:
+        status = "ready"
+    elif startup_error:
+        status = "failed"
+    else:
+        status = "starting"
+
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": status,
+            "timings_ms": startup_timings,
+            "error": startup_error,
+            "snapshot": rag_engine.snapshot_id if rag_engine else None,
+        },
+    )
+
+
+@app.post("/snapshot/reload")
+async def reload_snapshot():
+    """
+    Swap to the current snapshot now instead of waiting for the next poll
+
+    Returns once the new snapshot is serving. On failure the previous index
+    keeps serving and the error is returned.
+    """
+    if not rag_engine:
+        raise HTTPException(status_code=503, detail="RAG engine not initialized")
+
+    snapshot_id = current_snapshot()
+    if snapshot_id is None:
+        raise HTTPException(status_code=404, detail="No snapshot installed (run indexer.py import)")
+
+    previous = rag_engine.snapshot_id
+    try:
+        engine = await swap_snapshot(snapshot_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Snapshot {snapshot_id} failed to load: {e}")
+    return {"snapshot": engine.snapshot_id, "previous": previous, "swapped": previous != engine.snapshot_id}
+
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     """
@@ -130,18 +316,24 @@ async def chat(request: ChatRequest):
     if not rag_engine:
         raise HTTPException(status_code=503, detail="RAG engine not initialized")
 
+    started = time.perf_counter()
     try:
         # Convert history format
         history = None
         if request.history:
             history = [{"role": msg.role, "content": msg.content} for msg in request.history]
 
-        # Run query in thread pool to not block event loop
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            None,
-            lambda: rag_engine.query(request.message, history)
-        )
+        # Cached answers need no generation slot
+        filters = request.to_filters()
+        response = rag_engine.cached_answer(request.message, history, filters)
+        if response is None:
+            # Run query in thread pool to not block event loop
+            async with scheduler.slot():
+                loop = asyncio.get_event_loop()
+                response = await loop.run_in_executor(
+                    None,
+                    lambda: rag_engine.generate_answer(request.message, history, filters)
+                )
 
         return ChatResponse(
             answer=response.answer,
@@ -158,9 +350,14 @@ async def chat(request: ChatRequest):
             ],
             model=response.model,
         )
+    except QueueFullError as e:
+        raise too_busy("chat", e)
     except Exception as e:
+        ERRORS.labels("chat").inc()
         console.print(f"[red]Error in chat: {e}[/red]")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        REQUEST_SECONDS.labels("chat").observe(time.perf_counter() - started)
 
 
 @app.post("/chat/stream")
@@ -176,20 +373,45 @@ async def chat_stream(request: ChatRequest):
     if not rag_engine:
         raise HTTPException(status_code=503, detail="RAG engine not initialized")
 
-    async def generate():
-        try:
-            # Convert history format
-            history = None
-            if request.history:
-                history = [{"role": msg.role, "content": msg.content} for msg in request.history]
+    # Reject up front while a 429 can still be sent
+    try:
+        scheduler.check_admission()
+    except QueueFullError as e:
+        raise too_busy("chat_stream", e)
 
-            # Stream tokens
-            for token in rag_engine.query_stream(request.message, history):
-                yield f"data: {token}\n\n"
+    started = time.perf_counter()
 
-            yield "data: [DONE]\n\n"
-        except Exception as e:
-            console.print(f"[red]Error in stream: {e}[/red]")
+    async def generate():
+        # Waiting for a slot inside the generator means a client that leaves
+        # before streaming starts never holds one
+        try:
+            async with scheduler.slot():
+                # Convert history format
+                history = None
+                if request.history:
+                    history = [{"role": msg.role, "content": msg.content} for msg in request.history]
+
+                # Starlette cancels this generator when the client disconnects;
+                # closing the token stream then cancels the LLM generation
+                stream = rag_engine.aquery_stream(request.message, history, request.to_filters())
+                try:
+                    async for token in stream:
+                        yield f"data: {token}\n\n"
+
+                    yield "data: [DONE]\n\n"
+                except asyncio.CancelledError:
+                    console.print("[yellow]Client disconnected, generation cancelled[/yellow]")
+                    raise
+                except Exception as e:
+                    ERRORS.labels("chat_stream").inc()
+                    console.print(f"[red]Error in stream: {e}[/red]")
+                    yield f"data: [ERROR] {str(e)}\n\n"
+                finally:
+                    await stream.aclose()
+                    REQUEST_SECONDS.labels("chat_stream").observe(time.perf_counter() - started)
+        except QueueFullError as e:
+            # The queue filled up between the admission check and this point
+            REJECTED.labels("chat_stream").inc()
             yield f"data: [ERROR] {str(e)}\n\n"
 
     return StreamingResponse(
@@ -215,12 +437,15 @@ async def semantic_search(request: SearchRequest):
     if not rag_engine:
         raise HTTPException(status_code=503, detail="RAG engine not initialized")
 
+    started = time.perf_counter()
     try:
-        loop = asyncio.get_event_loop()
-        results = await loop.run_in_executor(
-            None,
-            lambda: rag_engine.get_similar_verses(request.query, request.top_k)
-        )
+        # Searches have their own slots so browsing stays responsive during generation
+        async with search_scheduler.slot():
+            loop = asyncio.get_event_loop()
+            results = await loop.run_in_executor(
+                None,
+                lambda: rag_engine.get_similar_verses(request.query, request.top_k, request.to_filters())
+            )
 
         return {
             "results": [
@@ -235,9 +460,36 @@ async def semantic_search(request: SearchRequest):
                 for r in results
             ]
         }
+    except QueueFullError as e:
+        raise too_busy("search", e)
     except Exception as e:
+        ERRORS.labels("search").inc()
         console.print(f"[red]Error in search: {e}[/red]")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        REQUEST_SECONDS.labels("search").observe(time.perf_counter() - started)
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters of the search, answer and embedding caches"""
+    global rag_engine
+
+    if not rag_engine:
+        raise HTTPException(status_code=503, detail="RAG engine not initialized")
+
+    return {
+        **rag_engine.cache_stats(),
+        "scheduler": scheduler.stats(),
+        "search_scheduler": search_scheduler.stats(),
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: stage latencies, time to first token, tokens/sec, cache hits, errors"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
 
 
 @app.get("/models")
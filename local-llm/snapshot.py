@@ -0,0 +1,309 @@
+"""
+Snapshot - Versioned, checksummed index snapshots for deploys
+
+A snapshot is a tar archive holding every collection of the index in the
+local store format, its BM25 indexes and a manifest with the embedding model,
+chunking, layout and the SHA-256 of every file. It is built once with
+`indexer.py export` and installed on each server with `indexer.py import`,
+which verifies the checksums while unpacking into SNAPSHOT_DIR/<id> and then
+points SNAPSHOT_DIR/CURRENT at it. A running server picks up the new CURRENT
+and swaps to it without a restart. Every file in a snapshot is plain data
+(JSON, JSONL, .npy and .npz read without pickle), so an archive cannot run
+code when it is loaded.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from config import settings
+from hybrid_retriever import LexicalIndex
+from language_routing import collection_name, index_languages, lexical_index_path
+from local_vector_store import LocalCollection, compact_collection, open_vector_client
+
+# 2: collection records in JSONL and BM25 indexes in .npz instead of pickles
+SNAPSHOT_FORMAT_VERSION = 2
+
+MANIFEST_FILE = "manifest.json"
+CURRENT_FILE = "CURRENT"
+COLLECTIONS_DIR = "collections"
+LEXICAL_DIR = "lexical"
+
+# Bytes hashed and copied per read
+_CHUNK_SIZE = 1 << 20
+
+# Snapshot ids and collection names become directory names
+_NAME_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+class SnapshotError(Exception):
+    """A snapshot is malformed, corrupted or built for another embedding model"""
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _export_collection(source, target_path: str, dtype: str, subvectors: Optional[int], keep_full: bool):
+    """Write one collection into the snapshot, copying local store files as-is when they already match"""
+    if isinstance(source, LocalCollection) and source.dtype == dtype and source.keep_full == keep_full:
+        shutil.copytree(source.path, target_path)
+        return LocalCollection.load(target_path)
+    return compact_collection(source, target_path, dtype, subvectors=subvectors, keep_full=keep_full)
+
+
+def export_snapshot(
+    output_path: str,
+    dtype: str = "int8",
+    subvectors: Optional[int] = None,
+    keep_full: bool = False,
+) -> dict:
+    """
+    Pack the configured index into a snapshot archive
+
+    Args:
+        output_path: Archive to write; replaced atomically if it exists
+        dtype: Vector encoding of the snapshot's local store collections
+        subvectors: PQ bytes per vector when dtype is "pq"
+        keep_full: Also store full-precision vectors for re-scoring
+
+    Returns:
+        The snapshot manifest
+    """
+    client = open_vector_client()
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(output_dir, exist_ok=True)
+
+    with tempfile.TemporaryDirectory(dir=output_dir, prefix=".snapshot-") as staging:
+        collections = []
+        source_metadata = {}
+        for language in index_languages():
+            name = collection_name(language)
+            source = client.get_collection(name)
+            source_metadata = source.metadata or {}
+            target = _export_collection(
+                source, os.path.join(staging, COLLECTIONS_DIR, name), dtype, subvectors, keep_full
+            )
+
+            # Ship the BM25 index too, so servers do not rebuild it on load
+            lexical_file = os.path.basename(lexical_index_path(language))
+            lexical_index = LexicalIndex.load(lexical_index_path(language), target.count())
+            if lexical_index is None:
+                lexical_index = LexicalIndex.from_collection(target)
+            os.makedirs(os.path.join(staging, LEXICAL_DIR), exist_ok=True)
+            lexical_index.save(os.path.join(staging, LEXICAL_DIR, lexical_file), target.count())
+
+            collections.append({
+                "name": name,
+                "language": language,
+                "count": target.count(),
+                "lexical_index": f"{LEXICAL_DIR}/{lexical_file}",
+            })
+
+        files: Dict[str, dict] = {}
+        for root, _, names in os.walk(staging):
+            for file_name in sorted(names):
+                path = os.path.join(root, file_name)
+                relative = os.path.relpath(path, staging).replace(os.sep, "/")
+                files[relative] = {"sha256": _file_sha256(path), "size": os.path.getsize(path)}
+
+        created_at = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+        content_digest = hashlib.sha256(json.dumps(files, sort_keys=True).encode("utf-8")).hexdigest()
+        manifest = {
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "id": f"{created_at}-{content_digest[:12]}",
+            "created_at": created_at,
+            # Recorded by the indexer on the collections it built
+            "embedding_model": source_metadata.get("embedding_model", settings.embedding_model),
+            "chunking": source_metadata.get("chunking"),
+            "collection_layout": settings.collection_layout,
+            "dtype": dtype,
+            "collections": collections,
+            "files": files,
+        }
+        manifest_path = os.path.join(staging, MANIFEST_FILE)
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        # The manifest goes first so import can check it before unpacking the rest
+        tmp_path = f"{output_path}.tmp"
+        with tarfile.open(tmp_path, "w") as archive:
+            archive.add(manifest_path, arcname=MANIFEST_FILE)
+            for relative in files:
+                archive.add(os.path.join(staging, relative), arcname=relative)
+        os.replace(tmp_path, output_path)
+
+    return manifest
+
+
+def _member_path(root: str, name: str) -> str:
+    """Path of a snapshot file under root; names that would escape root are rejected"""
+    parts = name.split("/")
+    if not name or name.startswith("/") or "\\" in name or any(part in ("", ".", "..") for part in parts):
+        raise SnapshotError(f"Invalid file name in snapshot: {name!r}")
+    path = os.path.join(root, *parts)
+    real_root = os.path.realpath(root)
+    if os.path.commonpath([real_root, os.path.realpath(path)]) != real_root:
+        raise SnapshotError(f"Invalid file name in snapshot: {name!r}")
+    return path
+
+
+def _check_manifest(manifest: dict, force: bool):
+    if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+        raise SnapshotError(
+            f"Snapshot format {manifest.get('format_version')} is not supported (expected {SNAPSHOT_FORMAT_VERSION})"
+        )
+    # The manifest comes from the archive, so every name that ends up in a path is checked
+    if not _NAME_RE.match(str(manifest.get("id", ""))):
+        raise SnapshotError(f"Invalid snapshot id: {manifest.get('id')!r}")
+    files = manifest.get("files") or {}
+    for name in files:
+        _member_path(".", name)
+    for entry in manifest.get("collections") or []:
+        if not _NAME_RE.match(str(entry.get("name", ""))):
+            raise SnapshotError(f"Invalid collection name: {entry.get('name')!r}")
+        if entry.get("lexical_index") not in files:
+            raise SnapshotError(f"Lexical index of {entry['name']} is not a snapshot file")
+    if manifest.get("embedding_model") != settings.embedding_model and not force:
+        # Query vectors from another model are not comparable with the snapshot's
+        raise SnapshotError(
+            f"Snapshot was built with {manifest.get('embedding_model')}, "
+            f"but EMBEDDING_MODEL is {settings.embedding_model}"
+        )
+
+
+def import_snapshot(archive_path: str, snapshot_dir: Optional[str] = None, force: bool = False) -> dict:
+    """
+    Verify and unpack a snapshot archive, then make it the current snapshot
+
+    Every file is checked against the manifest checksum as it is written; a
+    corrupted or incomplete archive leaves the current snapshot untouched.
+
+    Args:
+        archive_path: Archive written by export_snapshot
+        snapshot_dir: Directory of installed snapshots (default SNAPSHOT_DIR)
+        force: Install even if the embedding model differs from EMBEDDING_MODEL
+
+    Returns:
+        The snapshot manifest
+    """
+    snapshot_dir = snapshot_dir or settings.snapshot_dir
+    os.makedirs(snapshot_dir, exist_ok=True)
+
+    with tarfile.open(archive_path, "r") as archive:
+        first = archive.next()
+        if first is None or first.name != MANIFEST_FILE:
+            raise SnapshotError(f"{archive_path} does not start with {MANIFEST_FILE}")
+        manifest = json.load(archive.extractfile(first))
+        _check_manifest(manifest, force)
+
+        target = os.path.join(snapshot_dir, manifest["id"])
+        if os.path.exists(target):
+            raise SnapshotError(f"Snapshot {manifest['id']} is already installed")
+
+        expected = manifest["files"]
+        staging = tempfile.mkdtemp(dir=snapshot_dir, prefix=".incoming-")
+        try:
+            seen = set()
+            for member in archive:
+                if not member.isfile() or member.name == MANIFEST_FILE:
+                    continue
+                # Only files named in the manifest are unpacked, each resolved inside staging
+                if member.name not in expected:
+                    raise SnapshotError(f"Unexpected file in snapshot: {member.name}")
+
+                path = _member_path(staging, member.name)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                digest = hashlib.sha256()
+                source = archive.extractfile(member)
+                with open(path, "wb") as f:
+                    for chunk in iter(lambda: source.read(_CHUNK_SIZE), b""):
+                        digest.update(chunk)
+                        f.write(chunk)
+                if digest.hexdigest() != expected[member.name]["sha256"]:
+                    raise SnapshotError(f"Checksum mismatch for {member.name}")
+                seen.add(member.name)
+
+            missing = set(expected) - seen
+            if missing:
+                raise SnapshotError(f"Snapshot is missing {len(missing)} files, e.g. {sorted(missing)[0]}")
+
+            with open(os.path.join(staging, MANIFEST_FILE), "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+            os.rename(staging, target)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+    set_current_snapshot(manifest["id"], snapshot_dir)
+    prune_snapshots(snapshot_dir)
+    return manifest
+
+
+def set_current_snapshot(snapshot_id: str, snapshot_dir: Optional[str] = None):
+    """Atomically point CURRENT at an installed snapshot"""
+    snapshot_dir = snapshot_dir or settings.snapshot_dir
+    if not os.path.exists(os.path.join(snapshot_dir, snapshot_id, MANIFEST_FILE)):
+        raise SnapshotError(f"Snapshot {snapshot_id} is not installed in {snapshot_dir}")
+    tmp_path = os.path.join(snapshot_dir, f"{CURRENT_FILE}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(snapshot_id + "\n")
+    os.replace(tmp_path, os.path.join(snapshot_dir, CURRENT_FILE))
+
+
+def current_snapshot(snapshot_dir: Optional[str] = None) -> Optional[str]:
+    """Id of the current snapshot, or None if none is installed"""
+    snapshot_dir = snapshot_dir or settings.snapshot_dir
+    try:
+        with open(os.path.join(snapshot_dir, CURRENT_FILE), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def snapshot_path(snapshot_id: str, snapshot_dir: Optional[str] = None) -> str:
+    return os.path.join(snapshot_dir or settings.snapshot_dir, snapshot_id)
+
+
+def load_manifest(path: str) -> dict:
+    """Read and check the manifest of an installed snapshot"""
+    with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as f:
+        manifest = json.load(f)
+    _check_manifest(manifest, force=False)
+    return manifest
+
+
+def installed_snapshots(snapshot_dir: Optional[str] = None) -> List[str]:
+    """Installed snapshot ids, oldest first"""
+    snapshot_dir = snapshot_dir or settings.snapshot_dir
+    if not os.path.isdir(snapshot_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(snapshot_dir)
+        if os.path.exists(os.path.join(snapshot_dir, name, MANIFEST_FILE))
+    )
+
+
+def prune_snapshots(snapshot_dir: Optional[str] = None, keep: Optional[int] = None):
+    """
+    Delete old snapshots, keeping the newest `keep` (SNAPSHOT_KEEP) and the current one
+
+    The previous snapshot stays installed by default, since a server may still
+    be serving it until its swap completes.
+    """
+    snapshot_dir = snapshot_dir or settings.snapshot_dir
+    keep = settings.snapshot_keep if keep is None else keep
+    current = current_snapshot(snapshot_dir)
+    snapshots = installed_snapshots(snapshot_dir)
+    for snapshot_id in snapshots[:max(len(snapshots) - keep, 0)]:
+        if snapshot_id != current:
+            shutil.rmtree(os.path.join(snapshot_dir, snapshot_id), ignore_errors=True)
@@ -0,0 +1,122 @@
+"""
+Tests for VedavoiceRAG streaming - run with `python -m pytest`
+
+The engine runs over a small local index of the parsed books, built with the
+benchmark's hashing embedding, and an LLM that streams tokens until it is
+stopped, so no Ollama is needed.
+"""
+import asyncio
+from contextlib import contextmanager
+from typing import Any, Sequence
+
+from llama_index.core.llms import (
+    ChatMessage,
+    ChatResponse,
+    CompletionResponse,
+    CustomLLM,
+    LLMMetadata,
+    MessageRole,
+)
+from llama_index.core.llms.callbacks import llm_chat_callback, llm_completion_callback
+
+import benchmark
+from rag_engine import VedavoiceRAG
+
+# Verses indexed for the tests; enough for retrieval to return context
+CORPUS_VERSES = 40
+
+
+class EndlessLLM(CustomLLM):
+    """Chat model that streams a token every millisecond until its stream is closed"""
+
+    produced: int = 0
+    closed: bool = False
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        # Ollama is a chat model, so the chat engine streams through astream_chat
+        return LLMMetadata(is_chat_model=True)
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        return CompletionResponse(text="Крішна")
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any):
+        yield CompletionResponse(text="Крішна", delta="Крішна")
+
+    @llm_chat_callback()
+    async def astream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any):
+        async def gen():
+            text = ""
+            try:
+                while True:
+                    await asyncio.sleep(0.001)
+                    self.produced += 1
+                    text += "ом "
+                    yield ChatResponse(message=ChatMessage(role=MessageRole.ASSISTANT, content=text), delta="ом ")
+            finally:
+                self.closed = True
+
+        return gen()
+
+
+@contextmanager
+def rag_engine(tmp_path, llm):
+    with benchmark.override_settings(
+        vector_store_backend="local",
+        local_store_dir=str(tmp_path / "local_store"),
+        lexical_index_path=str(tmp_path / "lexical_index.npz"),
+        collection_layout="single",
+        answer_cache_enabled=False,
+    ):
+        embed_model = benchmark.HashingEmbedding()
+        benchmark.build_index(benchmark.load_corpus()[:CORPUS_VERSES], embed_model)
+        engine = VedavoiceRAG(llm=llm, embed_model=embed_model)
+        engine.initialize()
+        yield engine
+
+
+def test_closing_the_stream_stops_generation(tmp_path):
+    llm = EndlessLLM()
+    with rag_engine(tmp_path, llm) as engine:
+        async def disconnect_after_three_tokens():
+            stream = engine.aquery_stream("Чи народжується душа?")
+            async for _ in stream:
+                if llm.produced >= 3:
+                    break
+            await stream.aclose()
+            produced = llm.produced
+            await asyncio.sleep(0.05)
+            return produced
+
+        produced = asyncio.run(disconnect_after_three_tokens())
+
+        assert llm.closed
+        assert llm.produced == produced
+        pooled = list(engine._engine_pool._idle.queue)
+        assert len(pooled) == 1
+        assert pooled[0].chat_history == []
+
+
+def test_cancelling_the_consumer_stops_generation(tmp_path):
+    llm = EndlessLLM()
+    with rag_engine(tmp_path, llm) as engine:
+        async def cancel_mid_stream():
+            async def consume():
+                async for _ in engine.aquery_stream("Хто такий Крішна?"):
+                    pass
+
+            task = asyncio.create_task(consume())
+            while llm.produced < 3:
+                await asyncio.sleep(0.001)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            produced = llm.produced
+            await asyncio.sleep(0.05)
+            return produced
+
+        produced = asyncio.run(cancel_mid_stream())
+
+        assert llm.closed
+        assert llm.produced == produced
@@ -0,0 +1,282 @@
+"""
+Verse Lookup - Direct verse-reference parsing and exact lookup
+
+Queries like "БГ 2.14", "SB 1.2.6" or "ЧЧ Мадг'я 20.135" are resolved against
+an in-memory index of the reference metadata written by the indexer, so the
+exact verse is returned without embedding or ANN search.
+"""
+import asyncio
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import NodeWithScore, QueryBundle
+from llama_index.core.vector_stores.utils import metadata_dict_to_node
+
+from search_filters import SearchFilters
+
+# Page size for scanning collection metadata
+_SCAN_PAGE_SIZE = 5000
+
+# Book abbreviations (same as JumpToVerseDialog in the web app)
+BOOK_SLUGS: Dict[str, str] = {
+    # Ukrainian abbreviations
+    "бг": "bg",
+    "бґ": "bg",
+    "шб": "sb",
+    "чч": "cc",
+    "нн": "noi",
+    "ішо": "iso",
+    "нв": "nod",
+    # English abbreviations
+    "bg": "bg",
+    "sb": "sb",
+    "cc": "cc",
+    "noi": "noi",
+    "iso": "iso",
+    "nod": "nod",
+    # Full names (common)
+    "gita": "bg",
+    "bhagavatam": "sb",
+    "caitanya": "cc",
+}
+
+# Caitanya-caritamrta lila names -> canto number
+CC_CANTO_NAMES: Dict[str, int] = {
+    # Ukrainian
+    "аді": 1,
+    "ади": 1,
+    "мадг'я": 2,
+    "мадгя": 2,
+    "мадхя": 2,
+    "антя": 3,
+    "антья": 3,
+    # English
+    "adi": 1,
+    "madhya": 2,
+    "antya": 3,
+}
+
+# Books whose references carry a canto (or lila) number
+CANTO_BOOKS = {"sb", "cc", "scc", "saranagati", "td", "scb", "pp"}
+
+_APOSTROPHES_RE = re.compile(r"[’ʼ`']")
+
+_REFERENCE_RE = re.compile(
+    r"(?<![\w'])(?P<book>[a-zа-яіїєґ]+)\.?\s*"
+    r"(?:(?P<lila>[a-zа-яіїєґ']+)\.?\s*)?"
+    r"(?P<numbers>\d+(?:[.:]\d+){1,2}(?:-\d+)?)"
+)
+
+# Words that do not make a query more than a bare reference
+_FILLER_RE = re.compile(r"[\s\W]+")
+
+VerseKey = Tuple[str, Optional[int], int, str]
+
+
+@dataclass
+class VerseReference:
+    """A parsed verse reference"""
+    book_slug: str
+    canto_number: Optional[int]
+    chapter_number: int
+    verse_number: str
+    span: Tuple[int, int]
+
+    @property
+    def key(self) -> VerseKey:
+        return (self.book_slug, self.canto_number, self.chapter_number, self.verse_number)
+
+
+def _normalize(text: str) -> str:
+    return _APOSTROPHES_RE.sub("'", text.casefold())
+
+
+def parse_verse_reference(text: str) -> Optional[VerseReference]:
+    """Find the first verse reference in a query, or None"""
+    normalized = _normalize(text)
+    pos = 0
+
+    while True:
+        match = _REFERENCE_RE.search(normalized, pos)
+        if match is None:
+            return None
+        # Matches may overlap ("що означає бг 2.14"), so retry from the next word
+        pos = match.start() + 1
+
+        book_slug = BOOK_SLUGS.get(match.group("book"))
+        if not book_slug:
+            continue
+
+        numbers = [int(n) for n in re.split(r"[.:]", match.group("numbers").split("-")[0])]
+        lila = match.group("lila")
+        canto: Optional[int] = None
+
+        if lila:
+            if book_slug != "cc" or lila not in CC_CANTO_NAMES:
+                continue
+            canto = CC_CANTO_NAMES[lila]
+            if len(numbers) != 2:
+                continue
+        elif book_slug in CANTO_BOOKS:
+            if len(numbers) != 3:
+                continue
+            canto = numbers.pop(0)
+        elif len(numbers) != 2:
+            continue
+
+        return VerseReference(
+            book_slug=book_slug,
+            canto_number=canto,
+            chapter_number=numbers[0],
+            verse_number=str(numbers[1]),
+            span=match.span(),
+        )
+
+
+def is_bare_reference(text: str, reference: VerseReference) -> bool:
+    """True if the query is only the reference (plus punctuation)"""
+    normalized = _normalize(text)
+    rest = normalized[:reference.span[0]] + normalized[reference.span[1]:]
+    return not _FILLER_RE.sub("", rest)
+
+
+def fetch_nodes(collection, node_ids: List[str], scores: List[float]) -> List[NodeWithScore]:
+    """Load chunks from the collection by id, keeping the given order and scores"""
+    result = collection.get(ids=node_ids, include=["documents", "metadatas"])
+    loaded = {}
+    for node_id, text, metadata in zip(result["ids"], result["documents"], result["metadatas"]):
+        # Same reconstruction ChromaVectorStore.query uses
+        node = metadata_dict_to_node(metadata)
+        node.set_content(text)
+        loaded[node_id] = node
+    return [
+        NodeWithScore(node=loaded[node_id], score=score)
+        for node_id, score in zip(node_ids, scores)
+        if node_id in loaded
+    ]
+
+
+def _verse_numbers(verse_number: str) -> List[str]:
+    """Expand composite verse numbers like "265-266" to every verse they cover"""
+    parts = str(verse_number).split("-")
+    if len(parts) == 2 and parts[0].isdigit() and parts[1].isdigit():
+        start, end = int(parts[0]), int(parts[1])
+        if start <= end:
+            return [str(n) for n in range(start, end + 1)]
+    return [str(verse_number)]
+
+
+class VerseLookupIndex:
+    """In-memory map from (book, canto, chapter, verse) to the chunk ids of that verse"""
+
+    def __init__(self, collection):
+        self._collection = collection
+        self._ids: Dict[VerseKey, List[str]] = {}
+
+    @classmethod
+    def from_collection(cls, collection) -> "VerseLookupIndex":
+        index = cls(collection)
+        offset = 0
+        while True:
+            page = collection.get(include=["metadatas"], limit=_SCAN_PAGE_SIZE, offset=offset)
+            for node_id, metadata in zip(page["ids"], page.get("metadatas") or []):
+                if metadata:
+                    index.add(node_id, metadata)
+            if len(page["ids"]) < _SCAN_PAGE_SIZE:
+                return index
+            offset += _SCAN_PAGE_SIZE
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, node_id: str, metadata: dict):
+        book_slug = metadata.get("book_slug")
+        chapter = metadata.get("chapter_number")
+        if not book_slug or chapter is None:
+            return
+
+        canto = metadata.get("canto_number")
+        canto = int(canto) if canto not in (None, "") else None
+        for verse_number in _verse_numbers(metadata.get("verse_number", "")):
+            key = (book_slug, canto, int(chapter), verse_number)
+            self._ids.setdefault(key, []).append(node_id)
+
+    def lookup(self, reference: VerseReference) -> List[NodeWithScore]:
+        """Return every chunk of the referenced verse, in index order"""
+        node_ids = self._ids.get(reference.key)
+        if not node_ids:
+            return []
+
+        return fetch_nodes(self._collection, node_ids, [1.0] * len(node_ids))
+
+
+class ReferenceAwareRetriever(BaseRetriever):
+    """
+    Retriever that puts exact verse-reference matches first
+
+    A bare reference ("БГ 2.14") is answered from the lookup index alone;
+    otherwise the referenced verse is prepended to the vector results.
+    """
+
+    def __init__(
+        self,
+        retriever: BaseRetriever,
+        verse_index: VerseLookupIndex,
+        top_k: int,
+        filters: Optional[SearchFilters] = None,
+    ):
+        super().__init__()
+        self._retriever = retriever
+        self._verse_index = verse_index
+        self._top_k = top_k
+        self._filters = filters
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        reference = parse_verse_reference(query_bundle.query_str)
+        exact = self._lookup(reference) if reference else []
+        if exact and is_bare_reference(query_bundle.query_str, reference):
+            return exact
+        return self._merge(exact, self._retriever.retrieve(query_bundle))
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        reference = parse_verse_reference(query_bundle.query_str)
+        # The lookup reads the vector store synchronously
+        exact = await asyncio.to_thread(self._lookup, reference) if reference else []
+        if exact and is_bare_reference(query_bundle.query_str, reference):
+            return exact
+        return self._merge(exact, await self._retriever.aretrieve(query_bundle))
+
+    def _lookup(self, reference: VerseReference) -> List[NodeWithScore]:
+        exact = self._verse_index.lookup(reference)
+        if exact and self._filters is not None:
+            exact = [node for node in exact if self._filters.matches(node.node.metadata)]
+        return exact
+
+    def _merge(self, exact: List[NodeWithScore], nodes: List[NodeWithScore]) -> List[NodeWithScore]:
+        if not exact:
+            return nodes
+
+        # top_k counts verses, as ParentChildRetriever does, so a verse split
+        # into a parent and its children takes one slot, not several
+        exact_ids = {node.node.node_id for node in exact}
+        verses = {_verse_key(node) for node in exact}
+        budget = max(self._top_k, len(verses))
+        merged = list(exact)
+        for node in nodes:
+            if node.node.node_id in exact_ids:
+                continue
+            key = _verse_key(node)
+            if key not in verses:
+                if len(verses) >= budget:
+                    continue
+                verses.add(key)
+            merged.append(node)
+        return merged
+
+
+def _verse_key(node: NodeWithScore) -> str:
+    """Id of the verse a chunk belongs to"""
+    metadata = node.node.metadata
+    return metadata.get("verse_id") or metadata.get("parent_id") or node.node.node_id
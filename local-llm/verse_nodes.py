@@ -0,0 +1,181 @@
+"""
+Verse Nodes - Structure-aware chunking and parent-child retrieval
+
+Each verse document becomes one parent node (reference, Sanskrit,
+transliteration, synonyms and translation) plus child nodes holding groups of
+purport paragraphs, each prefixed with the verse reference. Retrieval matches
+any node and returns the verse node followed by the matching purport parts.
+"""
+import asyncio
+import re
+from typing import Any, Dict, List, Sequence
+
+from llama_index.core.bridge.pydantic import Field
+from llama_index.core.node_parser import NodeParser, SentenceSplitter
+from llama_index.core.node_parser.interface import IdFuncCallable
+from llama_index.core.node_parser.node_utils import build_nodes_from_splits
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import BaseNode, NodeRelationship, NodeWithScore, QueryBundle
+from llama_index.core.utils import get_tokenizer
+
+from verse_lookup import fetch_nodes
+
+# Labels verse_to_document puts in front of the purport
+PURPORT_LABELS = ("Коментар: ", "Purport: ")
+
+# Metadata that links children to their verse node - kept out of embeddings and prompts
+STRUCTURE_METADATA_KEYS = ["node_role", "parent_id"]
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n|\n")
+_HEADER_RE = re.compile(r"^(=== .+? ===)\n")
+
+
+def split_verse_text(text: str):
+    """Split a verse document into (verse part, purport label, purport text)"""
+    for label in PURPORT_LABELS:
+        marker = f"\n\n{label}"
+        position = text.find(marker)
+        if position != -1:
+            return text[:position], label, text[position + len(marker):]
+    return text, None, ""
+
+
+def verse_chunk_id(index: int, document: BaseNode) -> str:
+    """Chunk id from the verse id and position, so re-indexing a verse gives the same ids"""
+    return f"{document.node_id}#{index}"
+
+
+class VerseNodeParser(NodeParser):
+    """One node per verse + translation, purport paragraphs grouped into child nodes"""
+
+    chunk_size: int = 512
+    id_func: IdFuncCallable = Field(default=verse_chunk_id, description="Function to generate node IDs.")
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "VerseNodeParser"
+
+    def _group_paragraphs(self, purport: str, budget: int) -> List[str]:
+        """Pack consecutive paragraphs into groups of at most budget tokens"""
+        tokenizer = get_tokenizer()
+        splitter = SentenceSplitter(chunk_size=budget, chunk_overlap=0)
+
+        groups: List[str] = []
+        current: List[str] = []
+        current_tokens = 0
+        for paragraph in (p.strip() for p in _PARAGRAPH_RE.split(purport)):
+            if not paragraph:
+                continue
+            tokens = len(tokenizer(paragraph))
+            if current and current_tokens + tokens > budget:
+                groups.append("\n\n".join(current))
+                current, current_tokens = [], 0
+            if tokens > budget:
+                # A single huge paragraph still has to fit the embedding window
+                groups.extend(splitter.split_text(paragraph))
+                continue
+            current.append(paragraph)
+            current_tokens += tokens
+        if current:
+            groups.append("\n\n".join(current))
+        return groups
+
+    def _parse_nodes(self, nodes: Sequence[BaseNode], show_progress: bool = False, **kwargs: Any) -> List[BaseNode]:
+        all_nodes: List[BaseNode] = []
+        for document in nodes:
+            text = document.get_content()
+            verse_part, label, purport = split_verse_text(text)
+            header_match = _HEADER_RE.match(text)
+            header = header_match.group(1) if header_match else ""
+
+            prefix = f"{header}\n{label}" if header else label or ""
+            budget = max(self.chunk_size - len(get_tokenizer()(prefix)), 64)
+            child_texts = [f"{prefix}{group}" for group in self._group_paragraphs(purport, budget)] if label else []
+
+            split_nodes = build_nodes_from_splits([verse_part] + child_texts, document, id_func=self.id_func)
+            parent, children = split_nodes[0], split_nodes[1:]
+
+            for node in split_nodes:
+                # Splits may share the document's metadata dict and key lists
+                node.metadata = dict(node.metadata)
+                node.excluded_embed_metadata_keys = list(node.excluded_embed_metadata_keys) + STRUCTURE_METADATA_KEYS
+                node.excluded_llm_metadata_keys = list(node.excluded_llm_metadata_keys) + STRUCTURE_METADATA_KEYS
+
+            parent.metadata["node_role"] = "verse"
+
+            for child in children:
+                child.metadata["node_role"] = "purport"
+                child.metadata["parent_id"] = parent.node_id
+                child.relationships[NodeRelationship.PARENT] = parent.as_related_node_info()
+            if children:
+                parent.relationships[NodeRelationship.CHILD] = [child.as_related_node_info() for child in children]
+
+            all_nodes.extend(split_nodes)
+        return all_nodes
+
+
+class ParentChildRetriever(BaseRetriever):
+    """
+    Groups retrieved nodes by verse
+
+    A purport hit pulls in its verse node, so every verse in the result starts
+    with its translation and is followed by the purport parts that matched.
+    top_k counts verses, not chunks.
+    """
+
+    def __init__(self, retriever: BaseRetriever, collection, top_k: int):
+        super().__init__()
+        self._retriever = retriever
+        self._collection = collection
+        self._top_k = top_k
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        groups = self._group(self._retriever.retrieve(query_bundle))
+        missing = self._missing_parents(groups)
+        if missing:
+            self._attach_parents(groups, fetch_nodes(self._collection, missing, [None] * len(missing)))
+        return self._flatten(groups)
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        groups = self._group(await self._retriever.aretrieve(query_bundle))
+        missing = self._missing_parents(groups)
+        if missing:
+            # The collection client is synchronous
+            parents = await asyncio.to_thread(fetch_nodes, self._collection, missing, [None] * len(missing))
+            self._attach_parents(groups, parents)
+        return self._flatten(groups)
+
+    def _group(self, hits: List[NodeWithScore]) -> Dict[str, Dict[str, Any]]:
+        groups: Dict[str, Dict[str, Any]] = {}
+        for hit in hits:
+            metadata = hit.node.metadata
+            parent_id = metadata.get("parent_id") or hit.node.node_id
+            group = groups.get(parent_id)
+            if group is None:
+                if len(groups) >= self._top_k:
+                    continue
+                group = groups[parent_id] = {"score": hit.score, "parent": None, "children": []}
+            if metadata.get("node_role") == "purport":
+                group["children"].append(hit)
+            else:
+                group["parent"] = hit
+        return groups
+
+    @staticmethod
+    def _missing_parents(groups: Dict[str, Dict[str, Any]]) -> List[str]:
+        return [parent_id for parent_id, group in groups.items() if group["parent"] is None]
+
+    @staticmethod
+    def _attach_parents(groups: Dict[str, Dict[str, Any]], parents: List[NodeWithScore]):
+        for parent in parents:
+            group = groups[parent.node.node_id]
+            group["parent"] = NodeWithScore(node=parent.node, score=group["score"])
+
+    @staticmethod
+    def _flatten(groups: Dict[str, Dict[str, Any]]) -> List[NodeWithScore]:
+        results: List[NodeWithScore] = []
+        for group in groups.values():
+            if group["parent"] is not None:
+                results.append(group["parent"])
+            results.extend(group["children"])
+        return results
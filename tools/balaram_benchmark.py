@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Регресійний тест і бенчмарк Balaram-декодера на корпусі Бгаґавад-ґіти.
+
+Бере кожен Devanāgarī-блок (@d-uvaca, @d-anustubh, @deva, ...) з docs/UKBG*,
+розбиває на рядки й слова так само, як ventura_to_html.process_balaram_sanskrit,
+і декодує у всі три формати. Результат порівнюється зі збереженим еталоном
+(balaram_golden.json), а швидкість виводиться в символах Balaram за секунду
+для кожного формату.
+
+Будь-яка оптимізація декодера має проходити перевірку без розбіжностей.
+
+Usage:
+  python3 tools/balaram_benchmark.py                      # перевірка + бенчмарк
+  python3 tools/balaram_benchmark.py --decoder compiled   # лише один декодер
+  python3 tools/balaram_benchmark.py --update             # перезаписати еталон
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import balaram_decoder_compiled
+import balaram_decoder_v4_full
+from balaram_decoder_v4_full import OutputFormat
+from ventura_to_html import process_line_continuations
+
+TOOLS_DIR = Path(__file__).resolve().parent
+DEFAULT_DOCS = TOOLS_DIR.parent / 'docs'
+DEFAULT_GOLDEN = TOOLS_DIR / 'balaram_golden.json'
+
+DECODERS: Dict[str, Callable[[str, OutputFormat], str]] = {
+    'reference': balaram_decoder_v4_full.decode,
+    'compiled': balaram_decoder_compiled.decode,
+}
+
+# Теги Balaram-кодованого санскриту (@deva - таблиці алфавіту у вступі)
+DEVANAGARI_TAG_RE = re.compile(r'^@(?:d-[\w-]+|deva)$')
+# Назви тегів можуть містити пробіл (@pg cons = ...)
+TAG_RE = re.compile(r'^(@[\w-]+(?: [\w-]+)*)\s*=\s*(.*)')
+# <t22> - табуляція в таблицях, тобто межа слова
+TAB_RE = re.compile(r'<t[\d.]+>')
+
+
+def read_ventura(path: Path) -> str:
+    """Читає Ventura-файл: UTF-16 LE з BOM або UTF-8 (з BOM чи без)."""
+    content = path.read_bytes()
+    if content.startswith(b'\xff\xfe'):
+        return content.decode('utf-16')
+    return content.decode('utf-8-sig')
+
+
+def split_block(text: str) -> List[List[str]]:
+    """Рядки блоку як списки Balaram-слів (як у process_balaram_sanskrit)."""
+    text = process_line_continuations(text)
+    text = text.replace('<u003C>', '<')
+    text = re.sub(r'//[^/]*//', '', text)
+    text = TAB_RE.sub(' ', text)
+
+    lines = []
+    for part in re.split(r'\s*/<R>\s*', text):
+        words = re.sub(r'<[^>]*>', '', part.strip()).split()
+        if words:
+            lines.append(words)
+    return lines
+
+
+def load_blocks(docs_dir: Path) -> List[dict]:
+    """Усі Devanāgarī-блоки з docs/UKBG* (без .bak) у порядку файлів."""
+    blocks = []
+    for path in sorted(docs_dir.glob('UKBG*')):
+        if path.suffix == '.bak':
+            continue
+        tag, start, buffer = None, 0, []
+
+        def flush():
+            if tag and buffer:
+                lines = split_block('\n'.join(buffer))
+                if lines:
+                    blocks.append({'file': path.name, 'line': start, 'tag': tag, 'words': lines})
+
+        for number, line in enumerate(read_ventura(path).splitlines(), start=1):
+            match = TAG_RE.match(line)
+            if match:
+                flush()
+                tag = match.group(1) if DEVANAGARI_TAG_RE.match(match.group(1)) else None
+                start, buffer = number, ([match.group(2)] if match.group(2) else [])
+            elif tag and line:
+                buffer.append(line)
+        flush()
+    return blocks
+
+
+def decode_block(block: dict, decode: Callable[[str, OutputFormat], str], fmt: OutputFormat) -> List[str]:
+    """Декодує блок слово за словом, як при імпорті."""
+    return [' '.join(decode(word, fmt) for word in words) for words in block['words']]
+
+
+def build_golden(blocks: List[dict]) -> List[dict]:
+    """Еталон з референсного декодера balaram_decoder_v4_full."""
+    golden = []
+    for block in blocks:
+        entry = {
+            'file': block['file'],
+            'line': block['line'],
+            'tag': block['tag'],
+            'balaram': [' '.join(words) for words in block['words']],
+        }
+        for fmt in OutputFormat:
+            entry[fmt.value] = decode_block(block, balaram_decoder_v4_full.decode, fmt)
+        golden.append(entry)
+    return golden
+
+
+def check(blocks: List[dict], golden: List[dict], name: str, max_report: int) -> int:
+    """Порівнює декодер з еталоном, повертає кількість розбіжностей."""
+    decode = DECODERS[name]
+    source = [[' '.join(words) for words in block['words']] for block in blocks]
+    if source != [entry['balaram'] for entry in golden]:
+        print("  ✗ Корпус у docs/ не збігається з еталоном - запустіть з --update")
+        return 1
+
+    mismatches = 0
+    for block, expected in zip(blocks, golden):
+        for fmt in OutputFormat:
+            actual = decode_block(block, decode, fmt)
+            for balaram, exp_line, act_line in zip(expected['balaram'], expected[fmt.value], actual):
+                if exp_line != act_line:
+                    mismatches += 1
+                    if mismatches <= max_report:
+                        print(f"  ✗ {block['file']}:{block['line']} {fmt.value}")
+                        print(f"      balaram:  {balaram}")
+                        print(f"      expected: {exp_line}")
+                        print(f"      actual:   {act_line}")
+    return mismatches
+
+
+def benchmark(words: List[str], name: str, repeat: int) -> Dict[str, float]:
+    """Символів Balaram за секунду для кожного формату (найкращий з repeat)."""
+    decode = DECODERS[name]
+    chars = sum(len(word) for word in words)
+    rates = {}
+    for fmt in OutputFormat:
+        best = min(_timed(lambda: [decode(word, fmt) for word in words]) for _ in range(repeat))
+        rates[fmt.value] = chars / best
+    if name == 'compiled':
+        # Усі три формати зі спільним препроцесингом; decode_many ще й не повторює однакові слова
+        best = min(_timed(lambda: [balaram_decoder_compiled.decode_all(word) for word in words])
+                   for _ in range(repeat))
+        rates['decode_all'] = chars / best
+        best = min(_timed(lambda: balaram_decoder_compiled.decode_many(words)) for _ in range(repeat))
+        rates['decode_many'] = chars / best
+    return rates
+
+
+def _timed(fn: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    p = argparse.ArgumentParser(description='Balaram decoder golden-corpus regression and benchmark')
+    p.add_argument('--docs', type=Path, default=DEFAULT_DOCS, help='Тека з UKBG* файлами')
+    p.add_argument('--golden', type=Path, default=DEFAULT_GOLDEN, help='Файл еталону')
+    p.add_argument('--decoder', choices=[*DECODERS, 'all'], default='all')
+    p.add_argument('--repeat', type=int, default=3, help='Повторів заміру (береться найкращий)')
+    p.add_argument('--max-report', type=int, default=20, help='Скільки розбіжностей показати')
+    p.add_argument('--update', action='store_true', help='Перезаписати еталон референсним декодером')
+    args = p.parse_args()
+
+    blocks = load_blocks(args.docs)
+    words = [word for block in blocks for line in block['words'] for word in line]
+    print(f"Корпус: {len(blocks)} блоків, {len(words)} слів, {sum(map(len, words))} символів")
+
+    if args.update:
+        with open(args.golden, 'w', encoding='utf-8') as f:
+            json.dump(build_golden(blocks), f, ensure_ascii=False, indent=1)
+            f.write('\n')
+        print(f"Еталон записано: {args.golden}")
+        return
+
+    with open(args.golden, encoding='utf-8') as f:
+        golden = json.load(f)
+
+    names = list(DECODERS) if args.decoder == 'all' else [args.decoder]
+    failed = False
+    for name in names:
+        print(f"\n{name}:")
+        mismatches = check(blocks, golden, name, args.max_report)
+        if mismatches:
+            failed = True
+            print(f"  ✗ {mismatches} розбіжностей з еталоном")
+        else:
+            print("  ✓ збігається з еталоном")
+        for label, rate in benchmark(words, name, args.repeat).items():
+            print(f"  {label:<12} {rate:>12,.0f} символів/с")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,567 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BALARAM COMPILED DECODER
+
+Швидка версія balaram_decoder_v4_full.decode з ідентичним результатом.
+
+Таблиці (LIGATURES, CONSONANTS, VOWEL_FORMS, OUTPUT_MAPS) компілюються один
+раз при імпорті:
+- лігатури -> trie за першим символом (найдовший ключ першим);
+- для кожного формату всі лігатури, приголосні й голосні вже відрендерені;
+- символи, що завжди дають один і той самий рядок, - в одному dict.
+
+Декодування:
+1. Препроцесинг - ті самі правила в тому ж порядку, але з попередньо
+   скомпільованими regex; група правил пропускається, якщо в тексті немає
+   її символу-тригера ($, (, R, ...). Repha та i-реверсія - лінійні.
+2. Один прохід по тексту з trie/dict замість ланцюжка if.
+
+Usage:
+    from balaram_decoder_compiled import decode, decode_all, decode_many
+    decode('k{SNa', OutputFormat.IAST)      # -> 'kṛṣṇa'
+    decode_all('k{SNa')                     # -> {OutputFormat.DEVANAGARI: 'कृष्ण', ...}
+    decode_many(lines, processes=4)         # весь файл, усі формати
+
+    python balaram_decoder_compiled.py 'k{SNa'
+    python balaram_decoder_compiled.py --file verses.txt --processes 4
+"""
+
+import argparse
+import multiprocessing
+import re
+import sys
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from balaram_decoder_v4_full import (
+    CONSONANTS,
+    LIGATURES,
+    OUTPUT_MAPS,
+    VOWEL_FORMS,
+    Dev,
+    OutputFormat,
+    _render_cons,
+    _render_ligature,
+    _render_vowel_form,
+)
+
+# =============================================================================
+# CHARACTER CLASSES (як у balaram_decoder_v4_full)
+# =============================================================================
+
+_CONS = 'kKgGcCjJtTdDnpPbBmyrlvszZNSxXQfäh)'
+_LIGATURE_CHARS = "'" + '˜™‡‚‰‹•„ƒíîïºÁ·ãêìàâáæ÷ëöôòó»ÔªÀÜÚŸÃÂËÆµ¢œ"›Øñ'
+_KNOWN_MARKERS = frozenset(('CC', 'ST', 'TT', 'vII', 'RUU', 'RU', 'LL', 'BXA', 'AVA', 'NG'))
+# Маркери, після яких лігатура зберігає inherent 'a' (AVA сюди не входить)
+_COMPOUND_MARKERS = _KNOWN_MARKERS - {'AVA'}
+
+# Repha: R переноситься на початок кластера приголосних перед ним
+_REPHA_CLUSTER = frozenset(_CONS + _LIGATURE_CHARS)
+
+# i-реверсія: iC... -> C...§ (‖ перед кластером, що починається лігатурою)
+_IC_LIGATURES = re.escape(_LIGATURE_CHARS + 'ÉËÆÎÈÊÿ')
+_IC_CLUSTER = re.escape(_CONS) + _IC_LIGATURES + '®'
+_IC_LIGATURE_RE = re.compile(f'i([{_IC_LIGATURES}][{_IC_CLUSTER}]+)')
+_IC_RE = re.compile(f'i([{_IC_CLUSTER}]+)')
+
+# =============================================================================
+# PREPROCESSING REGEXES
+# =============================================================================
+
+_SARV_RE = re.compile(r's\$av(?![aAeEiIuU]*R)')
+_S_CLUSTER_RE = re.compile(r's\$([ptkTmnsvy])')
+_CONS_PATTERN = r'[kKgGcCjJtTdDnpPbBmyrlvzZNSxXQfh)]'
+_LIG_PATTERN = r'[˜™‡‚‰‹•„ƒíîïºÁ·ãêìàâáæ÷ëöôòó»ÔªÀÜÚŸÃÂËÆµ¢œ”›Øñ]'
+_INHERENT_DOLLAR_RE = re.compile(rf'({_CONS_PATTERN})(\$)({_CONS_PATTERN}|{_LIG_PATTERN})')
+_BOUNDARY_PAREN_RE = re.compile(r'([EIOUAeioua])(\()(?=[\s\|/]|$)')
+_CONS_PAREN_RE = re.compile(r'([kKgGcCjJtTdDnpPbBmyrlvszZNSxXQfäqh])\(')
+
+
+def _handle_repha(text: str) -> str:
+    """Repha за один прохід: R після кластера приголосних стає ® на його початку."""
+    result: List[str] = []
+    cluster_start = -1  # Початок кластера приголосних у кінці result, -1 якщо немає
+    for ch in text:
+        if ch == 'R':
+            if cluster_start >= 0:
+                result.insert(cluster_start, '®')
+                cluster_start += 1
+            else:
+                result.append('®')
+        else:
+            if ch in _REPHA_CLUSTER:
+                if cluster_start < 0:
+                    cluster_start = len(result)
+            else:
+                cluster_start = -1
+            result.append(ch)
+    return ''.join(result)
+
+
+def _preprocess(text: str) -> str:
+    """
+    Спільний для всіх форматів препроцесинг balaram_decoder_v4_full.decode.
+
+    Правила й порядок ті самі; групу пропускаємо, якщо в тексті немає її тригера.
+    """
+    if '<' in text:
+        text = text.replace('ATa<u003C>', 'ARTaM').replace('<u003C>', 'M')
+    if '$' in text:
+        text = _SARV_RE.sub('sarv', text)
+        text = text.replace('$a{', '{')
+    if '{' in text:
+        text = text.replace('A{', '{')
+    if '%' in text:
+        text = text.replace('q%', 'q(')
+    if '$' in text:
+        text = _S_CLUSTER_RE.sub(r's\1', text)
+        text = _INHERENT_DOLLAR_RE.sub(r'\1a\3', text)
+        text = text.replace('$', '')
+    # Заміна ’ не залежить від правил для ( - робимо її до них
+    if '’' in text:
+        text = text.replace('’', "'")
+    if '(' in text:
+        text = text.replace('{(', '{').replace('M(', 'aM')
+        text = _BOUNDARY_PAREN_RE.sub(r'\1', text)
+        text = text.replace("('", '§AVA§')
+        text = _CONS_PAREN_RE.sub(r'\1a', text)
+        text = text.replace('(', 'a')
+    if '=' in text:
+        text = text.replace('=', '')
+    if '"' in text:
+        text = text.replace('M"', 'aM')
+    if '~' in text:
+        text = text.replace('x.~', '§NG§')
+    if 'R' in text:
+        text = text.replace('iBayauR', 'iBaRyau')
+        if 'yaR' in text:
+            # Порядок голосних важливий: заміна для 'a' може створити збіг для 'i'
+            for v in 'aeiouAEIOUäâå':
+                text = text.replace(v + 'yaR', v + 'Rya')
+    if '*' in text:
+        text = text.replace('*é', '§LL§')
+    if '"' in text:
+        # '"aö' з оригіналу вже покрито заміною '"a'
+        text = text.replace('"a', '§BXA§')
+    if 'R' in text:
+        text = text.replace('wR', '§vII§')
+        text = text.replace('ayauR', 'aRyau').replace('ATaR', 'ARTa').replace('aAjaR', 'aARja')
+        text = _handle_repha(text)
+    if 'i' in text:
+        text = _IC_LIGATURE_RE.sub(r'‖\1§', text)
+        text = _IC_RE.sub(r'\1§', text)
+    if '"' in text:
+        text = text.replace('"', '')
+    if "'" in text:
+        # "Ae'" з оригіналу вже покрито заміною "e'"
+        text = text.replace("e'", 'e§AVA§')
+    if 'C' in text:
+        text = text.replace('cC', '§CC§')
+    if 'T' in text:
+        text = text.replace('sT', '§ST§').replace('tT', '§TT§')
+    if '&' in text:
+        text = text.replace('è&', '§RUU§').replace('ç&', '§RU§')
+    return text
+
+
+# =============================================================================
+# COMPILED DECODER
+# =============================================================================
+
+class CompiledDecoder:
+    """Декодер для одного формату з таблицями, відрендереними наперед."""
+
+    def __init__(self, fmt: OutputFormat):
+        self.fmt = fmt
+        out_map = OUTPUT_MAPS[fmt]
+        self._is_dev = fmt == OutputFormat.DEVANAGARI
+
+        self._a = out_map.get('A', 'a')
+        self._aa = out_map.get('AA', 'ā')
+        self._i = out_map.get('I', 'i')
+        self._halant = out_map.get('HALANT', '')
+        self._v_a = out_map.get('vA', 'a')
+        self._v_aa = out_map.get('vAA', 'ā')
+
+        # Приголосні: символ -> відрендерений рядок
+        self._consonants = {ch: _render_cons(cons, out_map, fmt) for ch, cons in CONSONANTS.items()}
+
+        # Лігатури: перший символ -> ((ключ, рядок, закінчується мātrā, не геміната), ...)
+        trie: Dict[str, List[Tuple[str, str, bool, bool]]] = {}
+        for key, lig in LIGATURES.items():
+            trie.setdefault(key[0], []).append((
+                key,
+                _render_ligature(lig, out_map, fmt),
+                lig[-1].startswith('m'),
+                len(lig) >= 2 and lig[0] != lig[1],
+            ))
+        self._ligatures = {
+            first: tuple(sorted(entries, key=lambda entry: len(entry[0]), reverse=True))
+            for first, entries in trie.items()
+        }
+
+        # Маркери §XX§ (CC та BXA залежать від контексту й обробляються окремо)
+        if self._is_dev:
+            ll, ava, repha = 'ल्ँ', 'ऽ', Dev.RA + Dev.H
+        else:
+            ll, ava = 'l̐', "'"
+            repha = 'р' if fmt == OutputFormat.UKRAINIAN else 'r'
+        dev_halant = self._halant if self._is_dev else ''
+        self._markers = {
+            'ST': _render_cons('S', out_map, fmt) + dev_halant + _render_cons('TH', out_map, fmt),
+            'TT': _render_cons('T', out_map, fmt) + dev_halant + _render_cons('TH', out_map, fmt),
+            'NG': _render_cons('NG', out_map, fmt) + dev_halant,
+            'vII': out_map.get('vII', 'ī'),
+            'RUU': _render_cons('R', out_map, fmt) + out_map.get('UU', 'ū'),
+            'RU': _render_cons('R', out_map, fmt) + out_map.get('U', 'u'),
+            'LL': ll,
+            'AVA': ava,
+        }
+        self._cc = _render_cons('C', out_map, fmt) + dev_halant + _render_cons('CH', out_map, fmt)
+        self._bxa = _render_ligature(('B', 'R'), out_map, fmt)
+
+        # Символи, що завжди дають той самий рядок, у порядку пріоритету оригіналу
+        simple = {'®': repha}
+        for ch, vf in VOWEL_FORMS.items():
+            simple[ch] = _render_vowel_form(vf, out_map, fmt)
+        for ch, key, default in (
+            ('W', 'vE', 'e'), ('w', 'vI', 'i'), ('[', 'vRI', 'ṛ'), ('o', 'vU', 'u'), ('O', 'vUU', 'ū'),
+            ('I', 'II', 'ī'), ('L', 'II', 'ī'), ('U', 'UU', 'ū'), ('&', 'UU', 'ū'),
+            ('E', 'AI', 'ai'), ('e', 'E', 'e'), ('{', 'RI', 'ṛ'), ('i', 'I', 'i'), ('u', 'U', 'u'),
+            ('M', 'AN', 'ṁ'), (':', 'VI', 'ḥ'), (',', 'HALANT', ''),
+        ):
+            simple.setdefault(ch, out_map.get(key, default))
+        # Лігатури й приголосні перевіряються раніше за ці правила
+        for ch in list(simple):
+            if ch in self._ligatures or ch in CONSONANTS:
+                del simple[ch]
+        self._simple = simple
+
+        # Мātrā з кількох символів: послідовність -> рядок
+        self._matra3 = dict.fromkeys(('aAe', 'AAe', '"Ae', '#Ae'), out_map.get('O', 'o'))
+        self._matra3.update(dict.fromkeys(('aAE', '"AE', '#AE', 'AAE'), out_map.get('AU', 'au')))
+        self._matra2 = {
+            **dict.fromkeys(('AA', 'aA', '"A', '#A'), self._aa),
+            **dict.fromkeys(('aI', 'AI'), out_map.get('II', 'ī')),
+            'aU': out_map.get('UU', 'ū'),
+            'Au': out_map.get('U', 'u'),
+            'AE': out_map.get('AU', 'au'),
+            'aE': out_map.get('AI', 'ai'),
+            'ae': out_map.get('E', 'e'),
+            'Ae': out_map.get('E', 'e'),
+            'ai': out_map.get('I', 'i'),
+            'au': out_map.get('U', 'u'),
+        }
+
+    def decode(self, text: str) -> str:
+        """Декодує Balaram-текст у формат цього декодера."""
+        return self._render(_preprocess(text))
+
+    def _render(self, text: str) -> str:
+        """Основний прохід по вже підготовленому тексті."""
+        is_dev = self._is_dev
+        a, aa, halant = self._a, self._aa, self._halant
+        simple = self._simple
+        consonants = self._consonants
+        ligatures = self._ligatures
+        matra3, matra2 = self._matra3, self._matra2
+
+        result: List[str] = []
+        append = result.append
+        i = 0
+        n = len(text)
+        in_ligature_cluster = False
+
+        while i < n:
+            ch = text[i]
+
+            rendered = simple.get(ch)
+            if rendered is not None:
+                append(rendered)
+                i += 1
+                continue
+
+            if ch == '‖':
+                in_ligature_cluster = True
+                i += 1
+                continue
+
+            if ch == '§':
+                end = text.find('§', i + 1)
+                if end > i:
+                    marker = text[i + 1:end]
+                    if marker in _KNOWN_MARKERS:
+                        if marker == 'CC':
+                            append(self._cc)
+                            if is_dev:
+                                pos = end + 1
+                                if pos < n and (text[pos] in _CONS or text[pos] in LIGATURES):
+                                    append(halant)
+                        elif marker == 'BXA':
+                            append(self._bxa)
+                            if not is_dev:
+                                next_idx = end + 1
+                                if next_idx >= n:
+                                    append(a)
+                                else:
+                                    next_ch = text[next_idx]
+                                    if next_ch in LIGATURES:
+                                        append(a)
+                                    elif next_ch in _CONS:
+                                        if next_idx + 1 < n and text[next_idx + 1] in 'AEIOU§':
+                                            append(a)
+                        else:
+                            append(self._markers[marker])
+                        i = end + 1
+                        continue
+                # i-мātrā з i-реверсії
+                append(self._i)
+                i += 1
+                in_ligature_cluster = False
+                if i < n and text[i] in 'aA':
+                    i += 1
+                continue
+
+            entries = ligatures.get(ch)
+            if entries is not None:
+                matched = None
+                for entry in entries:
+                    if text.startswith(entry[0], i):
+                        matched = entry
+                        break
+                if matched is not None:
+                    key, lig_text, ends_with_matra, non_geminated = matched
+                    append(lig_text)
+                    i += len(key)
+                    if len(key) > 1:
+                        if not is_dev and not ends_with_matra:
+                            if i >= n:
+                                append(a)
+                            elif text[i] in LIGATURES:
+                                append(a)
+                            elif text[i] in _CONS:
+                                if i + 1 < n and text[i + 1] in 'AEIOU§':
+                                    append(a)
+                    elif is_dev:
+                        if i < n:
+                            next_ch = text[i]
+                            if next_ch in _CONS or next_ch in LIGATURES:
+                                add_halant = True
+                                if not in_ligature_cluster and i + 1 < n and text[i + 1] == '§':
+                                    add_halant = False
+                                elif not in_ligature_cluster and i + 1 < n:
+                                    after_next = text[i + 1]
+                                    if after_next in 'AIUELO{&':
+                                        add_halant = False
+                                    elif after_next == 'a' and non_geminated:
+                                        add_halant = False
+                                if add_halant:
+                                    append(halant)
+                    elif not ends_with_matra:
+                        next_ch = text[i] if i < n else ''
+                        if in_ligature_cluster:
+                            pass
+                        elif next_ch == '"':
+                            if text[i:i + 2] != '"A':
+                                append(a)
+                        elif next_ch == '§':
+                            end = text.find('§', i + 1)
+                            if end > i and text[i + 1:end] in _COMPOUND_MARKERS:
+                                append(a)
+                        elif next_ch in _CONS or next_ch in LIGATURES:
+                            # '' теж "входить" у _CONS, тож у кінці тексту 'a' не додається
+                            if i + 1 < n and text[i + 1] in 'AEIOU':
+                                append(a)
+                        elif next_ch == ' ':
+                            append(a)
+                    continue
+
+            cons_text = consonants.get(ch)
+            if cons_text is not None:
+                append(cons_text)
+                i += 1
+                if is_dev and i < n:
+                    next_ch = text[i]
+                    if next_ch != '"' and (next_ch in CONSONANTS or next_ch in LIGATURES):
+                        append(halant)
+                continue
+
+            if ch == '@':
+                if i + 1 < n and text[i + 1] == 'A':
+                    append(self._v_aa)
+                    i += 2
+                else:
+                    append(self._v_a)
+                    i += 1
+                continue
+
+            if ch in 'aA"#':
+                rendered = matra3.get(text[i:i + 3])
+                if rendered is not None:
+                    append(rendered)
+                    i += 3
+                    continue
+                rendered = matra2.get(text[i:i + 2])
+                if rendered is not None:
+                    append(rendered)
+                    i += 2
+                    continue
+
+                if ch == 'A':
+                    if i == 0 or text[i - 1] in ' /|@':
+                        append(self._v_aa)
+                        i += 1
+                        continue
+                    next_ch = text[i + 1] if i + 1 < n else ''
+                    if next_ch == '®':
+                        append(aa)
+                    elif next_ch and (next_ch in _CONS or next_ch in LIGATURES):
+                        if text[i - 1] in LIGATURES or text[i - 2:i] in LIGATURES:
+                            append(aa)
+                        elif not is_dev:
+                            append(a)
+                    else:
+                        append(aa)
+                    i += 1
+                    continue
+
+                if ch == 'a':
+                    if i + 1 < n and text[i + 1] in ',{':
+                        i += 1
+                        continue
+                    if i == 0 or text[i - 1] in ' /|':
+                        append(self._v_a)
+                    elif not is_dev:
+                        append(a)
+                    i += 1
+                    continue
+
+                if ch == '"':
+                    if not is_dev:
+                        prev_ch = text[i - 1] if i > 0 else ''
+                        next_ch = text[i + 1] if i + 1 < n else ''
+                        if prev_ch in CONSONANTS:
+                            if (next_ch == '' or next_ch in ' /|,' or next_ch in ':M' or next_ch == '®'
+                                    or next_ch in CONSONANTS or next_ch in LIGATURES):
+                                append(a)
+                    i += 1
+                    continue
+
+            if ch == '/':
+                if i + 1 < n and text[i + 1] == '/':
+                    append('॥' if is_dev else '||')
+                    i += 2
+                else:
+                    append('।' if is_dev else '|')
+                    i += 1
+                continue
+
+            append(ch)
+            i += 1
+
+        output = ''.join(result)
+        if '#' in output:
+            output = output.replace('#', '')
+        return output
+
+
+DECODERS = {fmt: CompiledDecoder(fmt) for fmt in OutputFormat}
+ALL_FORMATS = tuple(OutputFormat)
+
+# Скільки рядків отримує один процес пулу за раз
+POOL_CHUNK_SIZE = 2000
+
+
+def decode(text: str, fmt: OutputFormat = OutputFormat.DEVANAGARI) -> str:
+    """
+    Декодує Balaram-текст у вибраний формат (те саме, що
+    balaram_decoder_v4_full.decode, але швидше).
+    """
+    return DECODERS[fmt].decode(text)
+
+
+def decode_all(text: str, formats: Sequence[OutputFormat] = ALL_FORMATS) -> Dict[OutputFormat, str]:
+    """
+    Декодує текст одразу в кілька форматів.
+
+    Препроцесинг (repha, i-реверсія тощо) не залежить від формату,
+    тож виконується один раз, а не для кожного формату.
+    """
+    prepared = _preprocess(text)
+    return {fmt: DECODERS[fmt]._render(prepared) for fmt in formats}
+
+
+def _decode_chunk(args: Tuple[List[str], Tuple[OutputFormat, ...]]) -> List[Dict[OutputFormat, str]]:
+    """Робота одного процесу пулу."""
+    texts, formats = args
+    return decode_many(texts, formats)
+
+
+def decode_many(
+    texts: Iterable[str],
+    formats: Sequence[OutputFormat] = ALL_FORMATS,
+    processes: Optional[int] = None,
+) -> List[Dict[OutputFormat, str]]:
+    """
+    Декодує пакет рядків у кілька форматів.
+
+    Однакові рядки (повторювані слова, рефрени) декодуються один раз.
+
+    Args:
+        texts: Balaram-кодовані рядки
+        formats: Потрібні формати (за замовчуванням усі три)
+        processes: Кількість процесів для великих файлів; None або 1 - без пулу
+
+    Returns:
+        Для кожного рядка - {формат: декодований текст}, у тому ж порядку
+    """
+    texts = list(texts)
+    formats = tuple(formats)
+
+    if processes and processes > 1 and len(texts) > POOL_CHUNK_SIZE:
+        chunks = [
+            (texts[start:start + POOL_CHUNK_SIZE], formats)
+            for start in range(0, len(texts), POOL_CHUNK_SIZE)
+        ]
+        results: List[Dict[OutputFormat, str]] = []
+        with multiprocessing.Pool(processes) as pool:
+            for decoded in pool.imap(_decode_chunk, chunks):
+                results.extend(decoded)
+        return results
+
+    cache: Dict[str, Dict[OutputFormat, str]] = {}
+    results = []
+    for text in texts:
+        decoded = cache.get(text)
+        if decoded is None:
+            decoded = cache[text] = decode_all(text, formats)
+        results.append(dict(decoded))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Balaram -> Devanāgarī / IAST / українська')
+    parser.add_argument('text', nargs='?', help="Balaram-текст, напр. 'k{SNa'")
+    parser.add_argument('--file', help='Файл Balaram-рядків (UTF-8), вивід - TSV по рядку')
+    parser.add_argument('--formats', default=','.join(fmt.value for fmt in ALL_FORMATS),
+                        help='Формати через кому (devanagari,iast,ukrainian)')
+    parser.add_argument('--processes', type=int, default=None, help='Процеси для великих файлів')
+    args = parser.parse_args()
+
+    formats = tuple(OutputFormat(value.strip()) for value in args.formats.split(','))
+
+    if args.file:
+        with open(args.file, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        for decoded in decode_many(lines, formats, args.processes):
+            print('\t'.join(decoded[fmt] for fmt in formats))
+    elif args.text:
+        for fmt, decoded in decode_all(args.text, formats).items():
+            print(f"{fmt.value:<11} {decoded}")
+    else:
+        parser.print_help()
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
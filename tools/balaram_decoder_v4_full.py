@@ -326,7 +326,7 @@ def decode(text: str, fmt: OutputFormat = OutputFormat.DEVANAGARI) -> str:
     # ( after vowel at word boundary = ignore (boundary marker)
     text = re.sub(r'([EIOUAeioua])(\()(?=[\s\|/]|$)', r'\1', text)  # Remove ( only at word boundary
     # Handle (' as avagraha BEFORE converting ( to 'a'
-    text = text.replace(''', "'")  # Normalize curly quote to straight
+    text = text.replace('\u2019', "'")  # Normalize curly quote to straight
     text = re.sub(r"\('", "§AVA§", text)  # (' → just avagraha (( is sandhi boundary)
     # ( after consonant = inherent 'a' for that consonant (syllable separator)
     # Pattern: C( → Ca (the ( marks the preceding consonant as having inherent 'a')
@@ -33,7 +33,7 @@ import re
 import sys
 from pathlib import Path
 
-from balaram_decoder_v4_full import decode, OutputFormat
+from balaram_decoder_compiled import decode, OutputFormat
 
 # === UKRAINIAN PUA DECODING ===
 UKRAINIAN_PUA_MAP = {